@@ -0,0 +1,502 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+import constantes as const
+from perfil import medir
+
+
+# Linhas lidas por vez quando as estruturas são construídas em blocos
+LINHAS_POR_BLOCO = 2_000_000
+
+
+def valores_coluna(df, coluna):
+    """Retorna os valores de uma coluna como array float64, com NaN nos valores ausentes."""
+    return df[coluna].to_numpy(dtype="float64", na_value=np.nan)
+
+
+class IndicePrefixo:
+    """
+    Somas acumuladas (prefixos) das colunas numéricas, construídas uma única vez,
+    que permitem obter contagem, soma, média e desvio padrão de qualquer intervalo
+    de linhas [inicio, fim) em tempo constante.
+
+    Os valores são deslocados pela média da coluna antes de acumular, o que reduz
+    a perda de precisão no cálculo da variância.
+    """
+    @medir()
+    def __init__(self, df, colunas=None):
+        """
+        Constrói os prefixos a partir de um DataFrame já ordenado.
+
+        Args:
+            df (pd.DataFrame): Os dados completos.
+            colunas (list, optional): As colunas indexadas. Padrão é `constantes.COLUNAS_NUMERICAS`.
+        """
+        colunas = const.COLUNAS_NUMERICAS if colunas is None else colunas
+        self.colunas = [col for col in colunas if col in df.columns]
+        self._deslocamentos = {}
+        self._contagens = {}
+        self._somas = {}
+        self._somas_quadrados = {}
+        for coluna in self.colunas:
+            valores = valores_coluna(df, coluna)
+            validos = ~np.isnan(valores)
+            deslocamento = float(valores[validos].mean()) if validos.any() else 0.0
+            centrados = np.where(validos, valores - deslocamento, 0.0)
+            self._deslocamentos[coluna] = deslocamento
+            self._contagens[coluna] = self._acumular(validos.astype(np.int64))
+            self._somas[coluna] = self._acumular(centrados)
+            self._somas_quadrados[coluna] = self._acumular(centrados * centrados)
+
+    @property
+    def deslocamentos(self):
+        """O valor subtraído de cada coluna antes de acumular."""
+        return dict(self._deslocamentos)
+
+    @classmethod
+    def em_blocos(cls, df, alocar=None, linhas_por_bloco=LINHAS_POR_BLOCO, colunas=None):
+        """
+        Constrói o índice percorrendo `df` em blocos de linhas, sem materializar
+        uma coluna inteira: adequado a dados mapeados em disco maiores que a memória.
+
+        Args:
+            df (pd.DataFrame): Os dados completos.
+            alocar (callable, optional): `alocar(nome, tamanho, tipo)` cria o array
+                de cada prefixo (por exemplo, um array mapeado em disco). Padrão é
+                um array em memória.
+            linhas_por_bloco (int, optional): Quantas linhas são lidas por vez.
+            colunas (list, optional): As colunas indexadas. Padrão é `constantes.COLUNAS_NUMERICAS`.
+        """
+        if alocar is None:
+            alocar = lambda nome, tamanho, tipo: np.empty(tamanho, dtype=tipo)
+        colunas = const.COLUNAS_NUMERICAS if colunas is None else colunas
+        colunas = [col for col in colunas if col in df.columns]
+        n = len(df)
+        blocos = [(i, min(i + linhas_por_bloco, n)) for i in range(0, n, linhas_por_bloco)]
+        deslocamentos, contagens, somas, somas_quadrados = {}, {}, {}, {}
+        for coluna in colunas:
+            soma, contagem = 0.0, 0
+            for i, j in blocos:
+                valores = valores_coluna(df.iloc[i:j], coluna)
+                validos = ~np.isnan(valores)
+                soma += float(valores[validos].sum())
+                contagem += int(validos.sum())
+            deslocamento = soma / contagem if contagem else 0.0
+            prefixos = (
+                alocar(f"{coluna}.contagens", n + 1, np.int64),
+                alocar(f"{coluna}.somas", n + 1, np.float64),
+                alocar(f"{coluna}.somas_quadrados", n + 1, np.float64),
+            )
+            for prefixo in prefixos:
+                prefixo[0] = 0
+            for i, j in blocos:
+                valores = valores_coluna(df.iloc[i:j], coluna)
+                validos = ~np.isnan(valores)
+                centrados = np.where(validos, valores - deslocamento, 0.0)
+                for prefixo, parcela in zip(prefixos, (validos.astype(np.int64), centrados, centrados * centrados)):
+                    prefixo[i + 1:j + 1] = prefixo[i] + np.cumsum(parcela)
+            deslocamentos[coluna] = deslocamento
+            contagens[coluna], somas[coluna], somas_quadrados[coluna] = prefixos
+        return cls.de_arrays(deslocamentos, contagens, somas, somas_quadrados)
+
+    @classmethod
+    def de_arrays(cls, deslocamentos, contagens, somas, somas_quadrados):
+        """Monta o índice a partir de prefixos já calculados (ver `em_blocos`), um dicionário por campo."""
+        indice = cls.__new__(cls)
+        indice.colunas = list(deslocamentos)
+        indice._deslocamentos = dict(deslocamentos)
+        indice._contagens = dict(contagens)
+        indice._somas = dict(somas)
+        indice._somas_quadrados = dict(somas_quadrados)
+        return indice
+
+    def anexar(self, df, posicao):
+        """
+        Retorna um novo índice para `df`, igual ao atual nas linhas anteriores a
+        `posicao` (as linhas novas entraram a partir dela). Só os prefixos de
+        `posicao` em diante são recalculados, com os mesmos deslocamentos; o índice
+        atual não é alterado.
+        """
+        novo = copy.copy(self)
+        novo._contagens, novo._somas, novo._somas_quadrados = {}, {}, {}
+        for coluna in self.colunas:
+            valores = valores_coluna(df.iloc[posicao:], coluna)
+            validos = ~np.isnan(valores)
+            centrados = np.where(validos, valores - self._deslocamentos[coluna], 0.0)
+            for destino, origem, parcela in (
+                (novo._contagens, self._contagens, validos.astype(np.int64)),
+                (novo._somas, self._somas, centrados),
+                (novo._somas_quadrados, self._somas_quadrados, centrados * centrados),
+            ):
+                anterior = origem[coluna][:posicao + 1]
+                destino[coluna] = np.concatenate((anterior, anterior[-1] + np.cumsum(parcela)))
+        return novo
+
+    @staticmethod
+    def _acumular(valores):
+        """Soma acumulada com um zero inicial, de modo que prefixo[j] - prefixo[i] cubra [i, j)."""
+        prefixo = np.zeros(len(valores) + 1, dtype=valores.dtype)
+        np.cumsum(valores, out=prefixo[1:])
+        return prefixo
+
+    def contagem(self, coluna, inicio, fim):
+        """Número de valores não nulos da coluna no intervalo [inicio, fim)."""
+        contagens = self._contagens[coluna]
+        return int(contagens[fim] - contagens[inicio])
+
+    def soma(self, coluna, inicio, fim):
+        """Soma dos valores não nulos da coluna no intervalo (0 se não houver valores)."""
+        n = self.contagem(coluna, inicio, fim)
+        somas = self._somas[coluna]
+        return float(somas[fim] - somas[inicio]) + n * self._deslocamentos[coluna]
+
+    def media(self, coluna, inicio, fim):
+        """Média dos valores não nulos da coluna no intervalo (NaN se não houver valores)."""
+        n = self.contagem(coluna, inicio, fim)
+        if n == 0:
+            return np.nan
+        somas = self._somas[coluna]
+        return float(somas[fim] - somas[inicio]) / n + self._deslocamentos[coluna]
+
+    def desvio_padrao(self, coluna, inicio, fim, ddof=0):
+        """Desvio padrão dos valores não nulos da coluna no intervalo (NaN se n <= ddof)."""
+        n = self.contagem(coluna, inicio, fim)
+        if n <= ddof:
+            return np.nan
+        somas_quadrados = self._somas_quadrados[coluna]
+        soma = float(self._somas[coluna][fim] - self._somas[coluna][inicio])
+        desvios_quadrados = float(somas_quadrados[fim] - somas_quadrados[inicio]) - soma * soma / n
+        # Abaixo do erro de arredondamento dos prefixos, a variância é tratada como zero
+        if desvios_quadrados <= 8 * np.finfo(np.float64).eps * float(somas_quadrados[fim]):
+            return 0.0
+        return float(np.sqrt(desvios_quadrados / (n - ddof)))
+
+
+ESTATISTICAS_NIVEL = ("contagem", "soma", "minimo", "maximo")
+
+
+def _ordinais_diarios(datas):
+    return datas.astype("datetime64[D]").astype(np.int64)
+
+
+def _ordinais_mensais(datas):
+    return datas.astype("datetime64[M]").astype(np.int64)
+
+
+def _ordinais_sazonais(datas):
+    # Estações meteorológicas (DJF, MAM, JJA, SON): dezembro pertence à estação do ano seguinte
+    return (_ordinais_mensais(datas) + 1) // 3
+
+
+def _ordinais_anuais(datas):
+    return datas.astype("datetime64[Y]").astype(np.int64)
+
+
+# Níveis da pirâmide, do mais fino para o mais grosso:
+# nome -> (função que gera o ordinal do balde, função que converte o ordinal na data de início)
+NIVEIS_PIRAMIDE = {
+    "diario": (_ordinais_diarios, lambda o: o.astype("datetime64[D]")),
+    "mensal": (_ordinais_mensais, lambda o: o.astype("datetime64[M]")),
+    "sazonal": (_ordinais_sazonais, lambda o: (o * 3 - 1).astype("datetime64[M]")),
+    "anual": (_ordinais_anuais, lambda o: o.astype("datetime64[Y]")),
+}
+
+
+def _agregado_vazio():
+    return {"contagem": 0, "soma": 0.0, "minimo": np.nan, "maximo": np.nan}
+
+
+def _combinar_agregados(*agregados):
+    """Combina agregados parciais (contagem, soma, mínimo e máximo) de uma coluna."""
+    combinado = _agregado_vazio()
+    for agregado in agregados:
+        combinado["contagem"] += agregado["contagem"]
+        combinado["soma"] += agregado["soma"]
+        combinado["minimo"] = np.fmin(combinado["minimo"], agregado["minimo"])
+        combinado["maximo"] = np.fmax(combinado["maximo"], agregado["maximo"])
+    return combinado
+
+
+class _NivelAgregado:
+    """
+    Um nível da pirâmide: um balde por dia/mês/estação/ano com dados, cada um
+    cobrindo o intervalo contíguo de linhas [linha_ini, linha_fim).
+    """
+    def __init__(self, ordinais, linha_ini, linha_fim, estatisticas):
+        self.ordinais = ordinais
+        self.linha_ini = linha_ini
+        self.linha_fim = linha_fim
+        self.estatisticas = estatisticas
+
+    def anexar(self, outro, deslocamento):
+        """
+        Retorna o nível com os baldes de `outro` (construído só com as linhas novas,
+        numeradas a partir de `deslocamento`) no final. Se o primeiro balde novo
+        continua o último balde atual, os dois são fundidos.
+        """
+        if len(outro.ordinais) == 0:
+            return self
+        linha_ini = outro.linha_ini + deslocamento
+        linha_fim = outro.linha_fim + deslocamento
+        estatisticas = {coluna: dict(stats) for coluna, stats in outro.estatisticas.items()}
+        n = len(self.ordinais)
+        if n and self.ordinais[-1] == outro.ordinais[0]:
+            n -= 1
+            linha_ini = linha_ini.copy()
+            linha_ini[0] = self.linha_ini[-1]
+            for coluna, stats in estatisticas.items():
+                atuais = self.estatisticas[coluna]
+                for nome, funcao in (("contagem", np.add), ("soma", np.add), ("minimo", np.fmin), ("maximo", np.fmax)):
+                    stats[nome] = stats[nome].copy()
+                    stats[nome][0] = funcao(stats[nome][0], atuais[nome][-1])
+        return _NivelAgregado(
+            np.concatenate((self.ordinais[:n], outro.ordinais)),
+            np.concatenate((self.linha_ini[:n], linha_ini)),
+            np.concatenate((self.linha_fim[:n], linha_fim)),
+            {
+                coluna: {nome: np.concatenate((self.estatisticas[coluna][nome][:n], stats[nome])) for nome in stats}
+                for coluna, stats in estatisticas.items()
+            },
+        )
+
+    def combinar(self, coluna, a, b):
+        """Combina os baldes [a, b) de uma coluna em um único agregado."""
+        stats = self.estatisticas[coluna]
+        if a >= b:
+            return _agregado_vazio()
+        with np.errstate(invalid="ignore"):
+            return {
+                "contagem": int(stats["contagem"][a:b].sum()),
+                "soma": float(stats["soma"][a:b].sum()),
+                "minimo": float(np.fmin.reduce(stats["minimo"][a:b])),
+                "maximo": float(np.fmax.reduce(stats["maximo"][a:b])),
+            }
+
+
+class PiramideAgregados:
+    """
+    Pirâmide de agregados pré-calculados (diário, mensal, sazonal e anual) com
+    contagem, soma, média, mínimo e máximo de cada coluna numérica.
+
+    Como os dados estão ordenados pela data, cada balde corresponde a um intervalo
+    contíguo de linhas. Uma consulta usa o nível mais grosso cujos baldes cabem
+    inteiros no intervalo e desce de nível apenas nas bordas parciais, chegando às
+    linhas brutas só no que sobrar de um dia incompleto.
+    """
+    @medir()
+    def __init__(self, df, n_linhas_validas, colunas=None):
+        """
+        Constrói todos os níveis a partir de um DataFrame ordenado pela data.
+
+        Args:
+            df (pd.DataFrame): Os dados completos, ordenados pela data.
+            n_linhas_validas (int): Quantas linhas iniciais têm data válida.
+            colunas (list, optional): As colunas agregadas. Padrão é `constantes.COLUNAS_NUMERICAS`.
+        """
+        colunas = const.COLUNAS_NUMERICAS if colunas is None else colunas
+        self.colunas = [col for col in colunas if col in df.columns]
+        self.n_linhas = n_linhas_validas
+        self._df = df
+        datas = df[const.COL_DATA].to_numpy()[:n_linhas_validas]
+        self._tipo_data = datas.dtype
+        valores = {col: valores_coluna(df.iloc[:n_linhas_validas], col) for col in self.colunas}
+        self.niveis = {
+            nome: self._construir_nivel(gerar_ordinais(datas), valores)
+            for nome, (gerar_ordinais, _) in NIVEIS_PIRAMIDE.items()
+        }
+        self._ordem_niveis = list(NIVEIS_PIRAMIDE)
+
+    def anexar(self, df, n_linhas_validas):
+        """
+        Retorna uma nova pirâmide para `df`, que acrescentou linhas com datas
+        posteriores logo após as `n_linhas` atuais. Apenas as linhas novas são
+        agregadas; em cada nível, o último balde atual é fundido com o primeiro
+        novo quando os dois são o mesmo dia/mês/estação/ano.
+
+        Args:
+            df (pd.DataFrame): Os dados completos, já com as linhas novas.
+            n_linhas_validas (int): Quantas linhas iniciais de `df` têm data válida.
+        """
+        novo = copy.copy(self)
+        novo._df = df
+        novo.n_linhas = n_linhas_validas
+        datas = df[const.COL_DATA].to_numpy()[self.n_linhas:n_linhas_validas]
+        trecho = df.iloc[self.n_linhas:n_linhas_validas]
+        valores = {col: valores_coluna(trecho, col) for col in self.colunas}
+        novo.niveis = {
+            nome: self.niveis[nome].anexar(self._construir_nivel(gerar_ordinais(datas), valores), self.n_linhas)
+            for nome, (gerar_ordinais, _) in NIVEIS_PIRAMIDE.items()
+        }
+        return novo
+
+    @classmethod
+    def em_blocos(cls, df, n_linhas_validas, linhas_por_bloco=LINHAS_POR_BLOCO, colunas=None):
+        """
+        Constrói a pirâmide agregando `linhas_por_bloco` linhas por vez (ver
+        `anexar`), sem materializar uma coluna inteira.
+        """
+        piramide = cls(df, 0, colunas)
+        for fim in range(linhas_por_bloco, n_linhas_validas + linhas_por_bloco, linhas_por_bloco):
+            piramide = piramide.anexar(df, min(fim, n_linhas_validas))
+        return piramide
+
+    def para_arrays(self):
+        """Os arrays de todos os níveis, em um dicionário plano ("nivel/campo" ou "nivel/coluna/estatística")."""
+        arrays = {}
+        for nome, nivel in self.niveis.items():
+            arrays[f"{nome}/ordinais"] = nivel.ordinais
+            arrays[f"{nome}/linha_ini"] = nivel.linha_ini
+            arrays[f"{nome}/linha_fim"] = nivel.linha_fim
+            for coluna, stats in nivel.estatisticas.items():
+                for estatistica, valores in stats.items():
+                    arrays[f"{nome}/{coluna}/{estatistica}"] = valores
+        return arrays
+
+    @classmethod
+    def de_arrays(cls, df, n_linhas_validas, arrays, colunas):
+        """Operação inversa de `para_arrays`, sobre os mesmos dados `df`."""
+        piramide = cls.__new__(cls)
+        piramide.colunas = list(colunas)
+        piramide.n_linhas = n_linhas_validas
+        piramide._df = df
+        piramide._tipo_data = df[const.COL_DATA].dtype
+        piramide.niveis = {
+            nome: _NivelAgregado(
+                arrays[f"{nome}/ordinais"], arrays[f"{nome}/linha_ini"], arrays[f"{nome}/linha_fim"],
+                {
+                    coluna: {estatistica: arrays[f"{nome}/{coluna}/{estatistica}"] for estatistica in ESTATISTICAS_NIVEL}
+                    for coluna in piramide.colunas
+                },
+            )
+            for nome in NIVEIS_PIRAMIDE
+        }
+        piramide._ordem_niveis = list(NIVEIS_PIRAMIDE)
+        return piramide
+
+    def _construir_nivel(self, ordinais_linhas, valores):
+        """Agrupa linhas consecutivas com o mesmo ordinal em baldes e calcula seus agregados."""
+        if len(ordinais_linhas) == 0:
+            vazio = np.array([], dtype=np.int64)
+            estatisticas = {
+                col: {
+                    "contagem": vazio,
+                    "soma": np.array([], dtype=np.float64),
+                    "minimo": np.array([], dtype=np.float64),
+                    "maximo": np.array([], dtype=np.float64),
+                }
+                for col in self.colunas
+            }
+            return _NivelAgregado(vazio, vazio, vazio, estatisticas)
+
+        linha_ini = np.concatenate(([0], np.flatnonzero(np.diff(ordinais_linhas)) + 1))
+        linha_fim = np.append(linha_ini[1:], len(ordinais_linhas))
+        estatisticas = {}
+        for coluna, valores_col in valores.items():
+            validos = ~np.isnan(valores_col)
+            estatisticas[coluna] = {
+                "contagem": np.add.reduceat(validos.astype(np.int64), linha_ini),
+                "soma": np.add.reduceat(np.where(validos, valores_col, 0.0), linha_ini),
+                "minimo": np.fmin.reduceat(valores_col, linha_ini),
+                "maximo": np.fmax.reduceat(valores_col, linha_ini),
+            }
+        return _NivelAgregado(ordinais_linhas[linha_ini], linha_ini, linha_fim, estatisticas)
+
+    def _agregar_bruto(self, coluna, inicio, fim):
+        """Agrega diretamente as linhas [inicio, fim) de uma coluna."""
+        if inicio >= fim:
+            return _agregado_vazio()
+        valores = valores_coluna(self._df.iloc[inicio:fim], coluna)
+        validos = valores[~np.isnan(valores)]
+        if validos.size == 0:
+            return _agregado_vazio()
+        return {
+            "contagem": int(validos.size),
+            "soma": float(validos.sum()),
+            "minimo": float(validos.min()),
+            "maximo": float(validos.max()),
+        }
+
+    def _agregar(self, coluna, inicio, fim, indice_nivel):
+        """Agrega [inicio, fim) usando o nível indicado e os mais finos apenas nas bordas."""
+        if inicio >= fim:
+            return _agregado_vazio()
+        if indice_nivel < 0:
+            return self._agregar_bruto(coluna, inicio, fim)
+        nivel = self.niveis[self._ordem_niveis[indice_nivel]]
+        a = int(np.searchsorted(nivel.linha_ini, inicio, side="left"))
+        b = int(np.searchsorted(nivel.linha_fim, fim, side="right"))
+        if a >= b:
+            return self._agregar(coluna, inicio, fim, indice_nivel - 1)
+        return _combinar_agregados(
+            self._agregar(coluna, inicio, int(nivel.linha_ini[a]), indice_nivel - 1),
+            nivel.combinar(coluna, a, b),
+            self._agregar(coluna, int(nivel.linha_fim[b - 1]), fim, indice_nivel - 1),
+        )
+
+    def agregar(self, inicio, fim):
+        """
+        Agrega o intervalo de linhas [inicio, fim) a partir do nível mais grosso possível.
+
+        Returns:
+            dict: coluna -> {"contagem", "soma", "media", "minimo", "maximo"}.
+        """
+        fim = min(fim, self.n_linhas)
+        resultado = {}
+        for coluna in self.colunas:
+            agregado = self._agregar(coluna, inicio, fim, len(self._ordem_niveis) - 1)
+            agregado["media"] = agregado["soma"] / agregado["contagem"] if agregado["contagem"] else np.nan
+            resultado[coluna] = agregado
+        return resultado
+
+    def agregar_por_nivel(self, nome_nivel, inicio, fim):
+        """
+        Agrega o intervalo de linhas [inicio, fim) em baldes de um nível
+        ("diario", "mensal", "sazonal" ou "anual"), incluindo os baldes vazios
+        entre o primeiro e o último, como faria um `resample`.
+
+        Os baldes inteiros vêm prontos da pirâmide; apenas os das bordas, se
+        estiverem incompletos, são recalculados a partir dos níveis mais finos.
+
+        Returns:
+            pd.DataFrame: Uma linha por balde, com a data de início do balde na
+            coluna de data e as colunas `<coluna>_<estatística>`.
+        """
+        fim = min(fim, self.n_linhas)
+        nivel = self.niveis[nome_nivel]
+        indice_nivel = self._ordem_niveis.index(nome_nivel)
+        a = int(np.searchsorted(nivel.linha_fim, inicio, side="right"))
+        b = int(np.searchsorted(nivel.linha_ini, fim, side="left"))
+        if inicio >= fim or a >= b:
+            return pd.DataFrame()
+
+        ordinais = np.arange(nivel.ordinais[a], nivel.ordinais[b - 1] + 1)
+        posicoes = nivel.ordinais[a:b] - nivel.ordinais[a]
+        _, para_data = NIVEIS_PIRAMIDE[nome_nivel]
+        resultado = {const.COL_DATA: para_data(ordinais).astype(self._tipo_data)}
+        for coluna in self.colunas:
+            stats = {nome: nivel.estatisticas[coluna][nome][a:b].copy() for nome in ESTATISTICAS_NIVEL}
+            # Bordas incompletas: recalculadas com os níveis mais finos
+            for k in {0, b - a - 1}:
+                ini_balde, fim_balde = int(nivel.linha_ini[a + k]), int(nivel.linha_fim[a + k])
+                if ini_balde < inicio or fim_balde > fim:
+                    parcial = self._agregar(coluna, max(ini_balde, inicio), min(fim_balde, fim), indice_nivel - 1)
+                    for nome in ESTATISTICAS_NIVEL:
+                        stats[nome][k] = parcial[nome]
+            contagem = np.zeros(len(ordinais), dtype=np.int64)
+            soma = np.zeros(len(ordinais))
+            minimo = np.full(len(ordinais), np.nan)
+            maximo = np.full(len(ordinais), np.nan)
+            contagem[posicoes] = stats["contagem"]
+            soma[posicoes] = stats["soma"]
+            minimo[posicoes] = stats["minimo"]
+            maximo[posicoes] = stats["maximo"]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                media = np.where(contagem > 0, soma / contagem, np.nan)
+            resultado[f"{coluna}_contagem"] = contagem
+            resultado[f"{coluna}_soma"] = soma
+            resultado[f"{coluna}_media"] = media
+            resultado[f"{coluna}_minimo"] = minimo
+            resultado[f"{coluna}_maximo"] = maximo
+        return pd.DataFrame(resultado)
@@ -0,0 +1,105 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from agregados import IndicePrefixo, PiramideAgregados
+import constantes as const
+
+
+def dados_horarios(n=24 * 120, inicio="2024-11-20", semente=0):
+    """Leituras horárias com valores ausentes, uma lacuna de dois dias e uma coluna constante."""
+    rng = np.random.default_rng(semente)
+    datas = pd.date_range(inicio, periods=n, freq="h")
+    df = pd.DataFrame({
+        const.COL_DATA: datas,
+        const.COL_TEMP: 25 + 5 * rng.standard_normal(n),
+        const.COL_UMIDADE: 70 + 10 * rng.standard_normal(n),
+        const.COL_VENTO: np.full(n, 12.5),
+        const.COL_PRECIP: rng.exponential(2.0, n),
+    })
+    df.loc[rng.random(n) < 0.05, const.COL_TEMP] = np.nan
+    df.loc[rng.random(n) < 0.05, const.COL_PRECIP] = np.nan
+    lacuna = (datas >= "2024-12-31") & (datas < "2025-01-02")
+    return df[~lacuna].reset_index(drop=True)
+
+
+class TestIndicePrefixo(unittest.TestCase):
+    def setUp(self):
+        self.df = dados_horarios()
+        self.indice = IndicePrefixo(self.df)
+        self.intervalos = [(0, len(self.df)), (0, 1), (100, 101), (37, 1500), (2000, len(self.df) - 5), (50, 50)]
+
+    def test_intervalos_iguais_ao_pandas(self):
+        for coluna in const.COLUNAS_NUMERICAS:
+            for inicio, fim in self.intervalos:
+                trecho = self.df[coluna].iloc[inicio:fim]
+                with self.subTest(coluna=coluna, inicio=inicio, fim=fim):
+                    self.assertEqual(self.indice.contagem(coluna, inicio, fim), trecho.count())
+                    self.assertAlmostEqual(self.indice.soma(coluna, inicio, fim), trecho.sum(), places=6)
+                    np.testing.assert_allclose(self.indice.media(coluna, inicio, fim), trecho.mean(), rtol=1e-9)
+                    np.testing.assert_allclose(self.indice.desvio_padrao(coluna, inicio, fim, ddof=1),
+                                               trecho.std(ddof=1), rtol=1e-7, atol=1e-9)
+
+    def test_coluna_constante_tem_desvio_zero(self):
+        self.assertEqual(self.indice.desvio_padrao(const.COL_VENTO, 10, 500), 0.0)
+
+    def test_anexar_igual_a_reconstruir(self):
+        posicao = 1000
+        anexado = IndicePrefixo(self.df.iloc[:posicao]).anexar(self.df, posicao)
+        for coluna in const.COLUNAS_NUMERICAS:
+            for inicio, fim in self.intervalos:
+                with self.subTest(coluna=coluna, inicio=inicio, fim=fim):
+                    self.assertEqual(anexado.contagem(coluna, inicio, fim), self.indice.contagem(coluna, inicio, fim))
+                    np.testing.assert_allclose(anexado.media(coluna, inicio, fim),
+                                               self.indice.media(coluna, inicio, fim), rtol=1e-9)
+
+
+class TestPiramideAgregados(unittest.TestCase):
+    REGRAS = {"diario": "D", "mensal": "MS", "sazonal": "QS-DEC", "anual": "YS"}
+
+    def setUp(self):
+        self.df = dados_horarios()
+        self.piramide = PiramideAgregados(self.df, len(self.df))
+
+    def _conferir_nivel(self, piramide, nivel, inicio, fim):
+        obtido = piramide.agregar_por_nivel(nivel, inicio, fim)
+        trecho = self.df.iloc[inicio:fim].set_index(const.COL_DATA)
+        esperado = trecho.resample(self.REGRAS[nivel])
+        for coluna in const.COLUNAS_NUMERICAS:
+            with self.subTest(nivel=nivel, coluna=coluna):
+                np.testing.assert_array_equal(obtido[const.COL_DATA], esperado[coluna].count().index)
+                np.testing.assert_array_equal(obtido[f"{coluna}_contagem"], esperado[coluna].count())
+                np.testing.assert_allclose(obtido[f"{coluna}_soma"], esperado[coluna].sum(), rtol=1e-9)
+                np.testing.assert_allclose(obtido[f"{coluna}_media"], esperado[coluna].mean(), rtol=1e-9)
+                np.testing.assert_array_equal(obtido[f"{coluna}_minimo"], esperado[coluna].min())
+                np.testing.assert_array_equal(obtido[f"{coluna}_maximo"], esperado[coluna].max())
+
+    def test_niveis_iguais_ao_resample(self):
+        for nivel in self.REGRAS:
+            self._conferir_nivel(self.piramide, nivel, 0, len(self.df))
+
+    def test_bordas_incompletas(self):
+        for nivel in self.REGRAS:
+            self._conferir_nivel(self.piramide, nivel, 13, len(self.df) - 7)
+
+    def test_agregar_igual_ao_pandas(self):
+        inicio, fim = 250, 2300
+        obtido = self.piramide.agregar(inicio, fim)
+        for coluna in const.COLUNAS_NUMERICAS:
+            trecho = self.df[coluna].iloc[inicio:fim]
+            with self.subTest(coluna=coluna):
+                self.assertEqual(obtido[coluna]["contagem"], trecho.count())
+                np.testing.assert_allclose(obtido[coluna]["media"], trecho.mean(), rtol=1e-9)
+                self.assertEqual(obtido[coluna]["minimo"], trecho.min())
+                self.assertEqual(obtido[coluna]["maximo"], trecho.max())
+
+    def test_anexar_no_meio_de_um_dia_igual_a_reconstruir(self):
+        posicao = 1000 + 5
+        piramide = PiramideAgregados(self.df.iloc[:posicao], posicao).anexar(self.df, len(self.df))
+        for nivel in self.REGRAS:
+            self._conferir_nivel(piramide, nivel, 0, len(self.df))
+
+
+if __name__ == "__main__":
+    unittest.main()
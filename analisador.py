@@ -1,21 +1,190 @@
+from concurrent.futures import CancelledError
+
 import pandas as pd
 import numpy as np
 from estacao import EstacaoMeteorologica
+from armazem import ArmazemColunar, eh_armazem
+from agregados import IndicePrefixo, PiramideAgregados, valores_coluna
+from quantis import EsbocoQuantis, EsbocosPorBalde
+from janelas import calcular_janelas, primeira_linha_janela
+from climatologia import Climatologia, caminho_climatologia, impressao_dados, normais_aproveitaveis
+from covariancia import CoMomentos, CoMomentosPorBalde
+from eventos import detectar_eventos
+from cache_resultados import CacheLRU, CAPACIDADE_PADRAO, copia_segura, memorizar
+from perfil import medir
 import constantes as const
 
+# Até este número de linhas, percentis são calculados de forma exata mesmo sem `exato=True`
+LIMITE_PERCENTIL_EXATO = 10_000
+
 
-def _filtrar_por_data_inicio(df, data_inicio):
-    """Função auxiliar para filtrar um DataFrame a partir de uma data de início."""
+def _posicao_data_inicio(datas, data_inicio):
+    """Função auxiliar que localiza, por busca binária, a primeira linha a partir de uma data de início."""
     if data_inicio is None:
-        return df
-    return df[df[const.COL_DATA] >= data_inicio]
+        return 0
+    return int(np.searchsorted(datas, pd.Timestamp(data_inicio).to_datetime64(), side="left"))
 
 
-def _filtrar_por_data_fim(df, data_fim):
-    """Função auxiliar para filtrar um DataFrame até uma data de fim."""
+def _posicao_data_fim(datas, data_fim):
+    """Função auxiliar que localiza, por busca binária, a posição logo após a última linha até uma data de fim."""
     if data_fim is None:
-        return df
-    return df[df[const.COL_DATA] <= data_fim]
+        return len(datas)
+    return int(np.searchsorted(datas, pd.Timestamp(data_fim).to_datetime64(), side="right"))
+
+
+def _concluir_etapa(tarefa, fracao):
+    """Informa o progresso da construção e a interrompe se a tarefa foi cancelada."""
+    if tarefa is None:
+        return
+    if tarefa.cancelada:
+        raise CancelledError()
+    tarefa.informar_progresso(fracao)
+
+
+def formatar_analise_mensal(analise):
+    """
+    Converte a agregação mensal da pirâmide (ver `gerar_analise_periodica`) no
+    formato da análise mensal: rótulo no último dia do mês, como no resample('ME'),
+    médias de temperatura e umidade e precipitação total.
+    """
+    if analise.empty:
+        return pd.DataFrame()
+
+    inicio_mes = analise[const.COL_DATA].to_numpy()
+    tipo_data = inicio_mes.dtype
+    fim_mes = (inicio_mes.astype("datetime64[M]") + 1).astype("datetime64[D]") - np.timedelta64(1, "D")
+
+    return pd.DataFrame({
+        const.COL_DATA: fim_mes.astype(tipo_data),
+        'temperatura_media': analise[f"{const.COL_TEMP}_media"],
+        'umidade_media': analise[f"{const.COL_UMIDADE}_media"],
+        'precipitacao_total': analise[f"{const.COL_PRECIP}_soma"],
+    })
+
+
+class _EstadoAnalise:
+    """
+    Os dados completos e as estruturas auxiliares derivadas deles, sempre
+    montados juntos e nunca modificados depois.
+
+    `AnalisadorClimatico.atualizar` monta um estado novo e o troca pelo atual em
+    uma única atribuição, e cada consulta lê o estado uma vez no início e usa só
+    ele: uma consulta feita durante a atualização nunca mistura os dados de uma
+    versão com os índices de outra. Os dados estão ordenados pela data, com as
+    datas inválidas (NaT) no final; `datas` guarda apenas as datas válidas.
+    """
+    def __init__(self, dados, datas, prefixos, piramide, quantis, comomentos, climatologia=None):
+        self.dados = dados
+        self.datas = datas
+        self.prefixos = prefixos
+        self.piramide = piramide
+        self.quantis = quantis
+        self.comomentos = comomentos
+        # Herdada do estado anterior ou obtida na primeira vez que for pedida (ver `obter_climatologia`)
+        self.climatologia = climatologia
+
+    def posicoes_periodo(self, data_inicio=None, data_fim=None):
+        """
+        Converte um período em um intervalo de linhas [inicio, fim) dos dados ordenados.
+
+        Sem datas, o intervalo cobre todas as linhas (inclusive as sem data válida).
+        """
+        if data_inicio is None and data_fim is None:
+            return 0, len(self.dados)
+        inicio = _posicao_data_inicio(self.datas, data_inicio)
+        fim = _posicao_data_fim(self.datas, data_fim)
+        return inicio, max(inicio, fim)
+
+    def esboco_periodo(self, coluna, inicio, fim):
+        """
+        Monta o esboço de quantis das linhas [inicio, fim): os meses inteiros vêm
+        dos esboços pré-calculados e as bordas incompletas entram como valores brutos.
+        """
+        meses = self.piramide.niveis["mensal"]
+        a = int(np.searchsorted(meses.linha_ini, inicio, side="left"))
+        b = int(np.searchsorted(meses.linha_fim, fim, side="right"))
+        if a >= b:
+            valores = valores_coluna(self.dados.iloc[inicio:fim], coluna)
+            return EsbocoQuantis.de_valores(valores)
+        bordas = np.concatenate((
+            valores_coluna(self.dados.iloc[inicio:int(meses.linha_ini[a])], coluna),
+            valores_coluna(self.dados.iloc[int(meses.linha_fim[b - 1]):fim], coluna),
+        ))
+        return self.quantis[coluna].esboco(a, b, bordas)
+
+    def comomentos_periodo(self, inicio, fim):
+        """
+        Monta os co-momentos das linhas [inicio, fim): os meses inteiros vêm dos
+        estados pré-calculados e as bordas incompletas são calculadas das linhas.
+        """
+        colunas = self.comomentos.colunas
+
+        def das_linhas(a, b):
+            trecho = self.dados.iloc[a:b]
+            return CoMomentos.de_valores(colunas, [valores_coluna(trecho, coluna) for coluna in colunas])
+
+        meses = self.piramide.niveis["mensal"]
+        a = int(np.searchsorted(meses.linha_ini, inicio, side="left"))
+        b = int(np.searchsorted(meses.linha_fim, fim, side="right"))
+        if a >= b:
+            return das_linhas(inicio, fim)
+        bordas = [das_linhas(inicio, int(meses.linha_ini[a])), das_linhas(int(meses.linha_fim[b - 1]), fim)]
+        return self.comomentos.periodo(a, b, bordas)
+
+    def calcular_percentis(self, coluna, percentis, inicio, fim, exato=False):
+        """Percentis das linhas [inicio, fim): exatos em períodos curtos ou quando pedido."""
+        if exato or fim - inicio <= LIMITE_PERCENTIL_EXATO:
+            valores = self.dados[coluna].iloc[inicio:fim].dropna().values
+            if valores.size == 0:
+                return np.full(len(percentis), np.nan)
+            return np.percentile(valores, percentis)
+        return self.esboco_periodo(coluna, inicio, fim).percentil(percentis)
+
+    def buscar_extremos(self, coluna, n, maiores, inicio=0, fim=None):
+        """
+        As N linhas com os maiores (ou menores) valores de uma coluna entre as
+        linhas [inicio, fim), na ordem e com o desempate de `nlargest`/`nsmallest`.
+
+        Os meses que tocam o intervalo são visitados do mais extremo para o menos
+        extremo, segundo o máximo (ou mínimo) guardado na pirâmide, e a busca para
+        quando o próximo mês não pode mais superar o N-ésimo valor encontrado: só
+        as linhas desses meses (recortadas ao intervalo) são lidas. Nos meses das
+        bordas o extremo do mês inteiro é apenas um limite, o que mantém a busca
+        exata. As linhas sem data entram como um último balde.
+        """
+        dados = self.dados
+        fim = len(dados) if fim is None else fim
+        meses = self.piramide.niveis["mensal"]
+        n_validas = len(self.datas)
+        linha_ini = np.append(meses.linha_ini, n_validas)
+        linha_fim = np.append(meses.linha_fim, len(dados))
+        sinal = -1.0 if maiores else 1.0
+        # Chaves crescentes: o balde mais promissor primeiro
+        extremos = meses.estatisticas[coluna]["maximo" if maiores else "minimo"] * sinal
+        restantes = valores_coluna(dados.iloc[max(n_validas, inicio):fim], coluna) * sinal
+        extremos = np.append(extremos, np.nanmin(restantes) if np.isfinite(restantes).any() else np.nan)
+        # Apenas os baldes que tocam o intervalo
+        primeiro = int(np.searchsorted(linha_fim, inicio, side="right"))
+        ultimo = int(np.searchsorted(linha_ini, fim, side="left"))
+        baldes = np.arange(primeiro, max(primeiro, ultimo))
+        baldes = baldes[linha_fim[baldes] > linha_ini[baldes]]
+
+        posicoes, chaves = np.array([], dtype=np.int64), np.array([])
+        for balde in baldes[np.argsort(extremos[baldes], kind="stable")]:
+            if n <= 0 or np.isnan(extremos[balde]):
+                break
+            # Empates com o N-ésimo só entram se vierem antes dele (desempate pela posição)
+            if len(chaves) >= n and (extremos[balde] > chaves[-1] or
+                                     (extremos[balde] == chaves[-1] and linha_ini[balde] > posicoes[-1])):
+                break
+            ini, fim_balde = max(int(linha_ini[balde]), inicio), min(int(linha_fim[balde]), fim)
+            valores = valores_coluna(dados.iloc[ini:fim_balde], coluna) * sinal
+            validos = np.flatnonzero(~np.isnan(valores))
+            posicoes = np.concatenate((posicoes, validos + ini))
+            chaves = np.concatenate((chaves, valores[validos]))
+            ordem = np.lexsort((posicoes, chaves))[:n]
+            posicoes, chaves = posicoes[ordem], chaves[ordem]
+        return dados.iloc[posicoes][[const.COL_DATA, coluna]]
 
 
 class AnalisadorClimatico:
@@ -23,24 +192,166 @@ class AnalisadorClimatico:
     Realiza análises complexas sobre os dados de uma EstacaoMeteorologica,
     incluindo estatísticas, filtragem e geração de resumos.
     """
-    def __init__(self, caminho_csv):
+    @medir()
+    def __init__(self, caminho_csv, tamanho_cache=CAPACIDADE_PADRAO, compacto=False, tarefa=None):
         """
         Inicializa o analisador.
 
         Args:
-            caminho_csv (str): O caminho para o arquivo CSV com os dados.
+            caminho_csv (str): O caminho para o arquivo CSV com os dados ou para a
+                pasta de um armazém colunar (ver `armazem`), aberto sem ler os dados.
+            tamanho_cache (int, optional): Quantos resultados de análises são
+                mantidos no cache LRU.
+            compacto (bool, optional): Guarda os dados em tipos menores (ver
+                `compacto.compactar_dataframe`).
+            tarefa (tarefas.Tarefa, optional): Recebe o progresso; se for cancelada,
+                a construção é interrompida entre as etapas.
+
+        Raises:
+            concurrent.futures.CancelledError: Se a tarefa foi cancelada.
         """
-        self.estacao = EstacaoMeteorologica(caminho_csv)
-        self.dados_completos = self.estacao.get_dados()
+        self._cache_resultados = CacheLRU(tamanho_cache)
         self.caminho_csv = caminho_csv
+        if eh_armazem(caminho_csv):
+            self.estacao = ArmazemColunar(caminho_csv)
+            self._estado = self._abrir_indices()
+        else:
+            self.estacao = EstacaoMeteorologica(caminho_csv, compacto=compacto)
+            _concluir_etapa(tarefa, 0.5)
+            self._estado = self._construir_indices(tarefa)
+
+    @property
+    def dados_completos(self):
+        """O DataFrame completo do estado atual (ver `_EstadoAnalise`)."""
+        return self._estado.dados
+
+    @medir()
+    def _construir_indices(self, tarefa=None):
+        """
+        Prepara as estruturas auxiliares derivadas dos dados da estação.
+
+        Args:
+            tarefa (tarefas.Tarefa, optional): Recebe o progresso e é consultada
+                sobre o cancelamento entre as estruturas.
+
+        Returns:
+            _EstadoAnalise: Os dados e as estruturas, prontos para as consultas.
+        """
+        dados = self.estacao.get_dados()
+        datas = dados[const.COL_DATA].to_numpy()
+        datas = datas[:len(datas) - int(np.isnat(datas).sum())]
+        prefixos = IndicePrefixo(dados)
+        _concluir_etapa(tarefa, 0.6)
+        piramide = PiramideAgregados(dados, len(datas))
+        _concluir_etapa(tarefa, 0.7)
+        meses = piramide.niveis["mensal"]
+        quantis = {}
+        for coluna in piramide.colunas:
+            quantis[coluna] = EsbocosPorBalde(valores_coluna(dados, coluna), meses.linha_ini, meses.linha_fim)
+        _concluir_etapa(tarefa, 0.9)
+        comomentos = CoMomentosPorBalde.de_valores(
+            piramide.colunas, [valores_coluna(dados, coluna) for coluna in piramide.colunas],
+            meses.linha_ini, meses.linha_fim,
+        )
+        return _EstadoAnalise(dados, datas, prefixos, piramide, quantis, comomentos)
+
+    def _abrir_indices(self):
+        """Usa as estruturas auxiliares já gravadas no armazém colunar, mapeadas em disco."""
+        dados = self.estacao.get_dados()
+        datas = dados[const.COL_DATA].to_numpy()[:self.estacao.n_linhas_validas]
+        return _EstadoAnalise(dados, datas, *self.estacao.carregar_indices())
+
+    @medir()
+    def atualizar(self):
+        """
+        Lê as linhas acrescentadas ao CSV desde a última carga (ver
+        `EstacaoMeteorologica.anexar_novas_linhas`) e atualiza as estruturas
+        auxiliares de forma incremental: os prefixos, a pirâmide e os esboços de
+        quantis só são recalculados a partir das linhas novas (e do último balde
+        de cada nível, que elas podem completar), e os co-momentos das linhas
+        novas são combinados aos do último mês. As normais climatológicas são
+        mantidas enquanto as linhas novas forem poucas em relação às usadas no
+        seu cálculo (ver `climatologia.normais_aproveitaveis`).
+
+        O novo estado é montado por inteiro e trocado pelo atual em uma única
+        atribuição (ver `_EstadoAnalise`); em seguida o cache de resultados é
+        esvaziado, e resultados de consultas que começaram antes da troca não
+        são guardados nele (ver `CacheLRU.geracao`).
+
+        Returns:
+            int: Quantas linhas novas foram incorporadas.
+
+        Raises:
+            ValueError: Se o CSV foi reescrito; nesse caso o analisador deve ser recriado.
+        """
+        novas, posicao = self.estacao.anexar_novas_linhas()
+        if novas == 0:
+            return 0
+        atual = self._estado
+        dados = self.estacao.get_dados()
+        n_validas = posicao + novas
+        prefixos = atual.prefixos.anexar(dados, posicao)
+        piramide = atual.piramide.anexar(dados, n_validas)
+        meses = piramide.niveis["mensal"]
+        balde = int(np.searchsorted(meses.linha_fim, posicao, side="right"))
+        inicio = int(meses.linha_ini[balde])
+        trecho = dados.iloc[inicio:n_validas]
+        quantis = {
+            coluna: esbocos.anexar(valores_coluna(trecho, coluna), meses.linha_ini, meses.linha_fim, balde)
+            for coluna, esbocos in atual.quantis.items()
+        }
+        novas_linhas = dados.iloc[posicao:n_validas]
+        comomentos = atual.comomentos.anexar(
+            [valores_coluna(novas_linhas, coluna) for coluna in atual.comomentos.colunas],
+            posicao, meses.linha_ini, meses.linha_fim,
+        )
+        datas = dados[const.COL_DATA].to_numpy()[:n_validas]
+        climatologia = atual.climatologia
+        if climatologia is not None and not normais_aproveitaveis(climatologia.impressao, prefixos, datas):
+            climatologia = None
+
+        self._estado = _EstadoAnalise(dados, datas, prefixos, piramide, quantis, comomentos, climatologia)
+        self._cache_resultados.limpar()
+        return novas
+
+    def obter_climatologia(self, estado=None):
+        """
+        As normais climatológicas dos dados (ver `climatologia`): lidas do disco se
+        já foram calculadas para estes dados (ou para eles antes de receberem
+        poucas linhas novas, ver `climatologia.normais_aproveitaveis`) ou
+        calculadas e gravadas na primeira vez que forem pedidas.
+
+        Args:
+            estado (_EstadoAnalise, optional): O estado cujas normais são pedidas.
+                Padrão é o atual.
+        """
+        estado = estado or self._estado
+        if estado.climatologia is None:
+            caminho = caminho_climatologia(self.caminho_csv)
+            climatologia = Climatologia.carregar(caminho)
+            if climatologia is None or not normais_aproveitaveis(climatologia.impressao, estado.prefixos, estado.datas):
+                impressao = impressao_dados(estado.prefixos, estado.datas)
+                climatologia = Climatologia.de_dados(estado.datas, estado.dados, impressao=impressao)
+                climatologia.salvar(caminho)
+            estado.climatologia = climatologia
+        return estado.climatologia
+
+    def estatisticas_cache(self):
+        """Retorna o tamanho e os contadores de acertos/falhas do cache de resultados."""
+        return self._cache_resultados.estatisticas()
 
     def get_dados_completos(self):
         """Retorna o DataFrame completo sem filtros."""
-        return self.dados_completos
+        return self._estado.dados
 
+    @medir()
     def get_dados_filtrados_para_plot(self, data_inicio=None, data_fim=None):
         """
-        Filtra os dados completos por um intervalo de datas usando um pipeline.
+        Filtra os dados completos por um intervalo de datas.
+
+        Como os dados estão ordenados pela data, o período vira uma fatia obtida
+        por busca binária, sem máscaras booleanas; a fatia pode ser modificada
+        por quem a recebe sem alterar os dados completos (ver `copia_segura`).
 
         Args:
             data_inicio (datetime, optional): Data de início do filtro.
@@ -49,20 +360,51 @@ class AnalisadorClimatico:
         Returns:
             pd.DataFrame: DataFrame com os dados filtrados.
         """
-        dados_para_plot = (
-            self.dados_completos.copy()
-            .pipe(_filtrar_por_data_inicio, data_inicio=data_inicio)
-            .pipe(_filtrar_por_data_fim, data_fim=data_fim)
-        )
-        return dados_para_plot
+        estado = self._estado
+        inicio, fim = estado.posicoes_periodo(data_inicio, data_fim)
+        return copia_segura(estado.dados.iloc[inicio:fim])
 
-    def gerar_estatisticas(self, data_inicio=None, data_fim=None):
+    @medir()
+    @memorizar
+    def gerar_estatisticas(self, data_inicio=None, data_fim=None, exato=False):
         """
         Calcula as principais estatísticas para um determinado período.
 
+        Médias, precipitação total e desvio padrão vêm do índice de somas
+        acumuladas (`agregados.IndicePrefixo`), em tempo constante para qualquer
+        período, e os percentis dos esboços de quantis mensais (ver `quantis`).
+        Com `exato=True`, todas as estatísticas são recalculadas diretamente
+        sobre os dados filtrados.
+
         Returns:
             tuple: Um dicionário com as estatísticas e o DataFrame filtrado.
         """
+        if exato:
+            return self._gerar_estatisticas_exatas(data_inicio, data_fim)
+
+        estado = self._estado
+        inicio, fim = estado.posicoes_periodo(data_inicio, data_fim)
+        dados_filtrados = copia_segura(estado.dados.iloc[inicio:fim])
+        prefixos = estado.prefixos
+
+        if dados_filtrados.empty or prefixos.contagem(const.COL_TEMP, inicio, fim) == 0:
+            return {}, dados_filtrados
+
+        percentil_25, percentil_75 = estado.calcular_percentis(const.COL_TEMP, [25, 75], inicio, fim)
+
+        estatisticas = {
+            "Temperatura Média (°C)": prefixos.media(const.COL_TEMP, inicio, fim),
+            "Umidade Média (%)": prefixos.media(const.COL_UMIDADE, inicio, fim),
+            "Velocidade Média do Vento (km/h)": prefixos.media(const.COL_VENTO, inicio, fim),
+            "Precipitação Total (mm)": prefixos.soma(const.COL_PRECIP, inicio, fim),
+            "Desvio Padrão Temp. (°C)": prefixos.desvio_padrao(const.COL_TEMP, inicio, fim),
+            "Temperatura (Percentil 25)": percentil_25,
+            "Temperatura (Percentil 75)": percentil_75,
+        }
+        return estatisticas, dados_filtrados
+
+    def _gerar_estatisticas_exatas(self, data_inicio=None, data_fim=None):
+        """Calcula as estatísticas do período percorrendo diretamente os dados filtrados."""
         dados_filtrados = self.get_dados_filtrados_para_plot(data_inicio, data_fim)
 
         if dados_filtrados.empty or dados_filtrados[const.COL_TEMP].isnull().all():
@@ -81,45 +423,267 @@ class AnalisadorClimatico:
         }
         return estatisticas, dados_filtrados
 
-    def buscar_maiores_indices(self, coluna, n=5):
-        """Busca os N dias com os maiores valores para uma coluna."""
-        return self.estacao.dias_com_maiores_indices(coluna, n)
+    @medir()
+    @memorizar
+    def gerar_percentis(self, coluna=const.COL_TEMP, percentis=(5, 25, 50, 75, 95, 99),
+                        data_inicio=None, data_fim=None, exato=False):
+        """
+        Calcula percentis de uma coluna no período.
+
+        Em períodos longos, os valores são aproximados pela fusão dos esboços de
+        quantis mensais, com erro de posição abaixo de ~π·sqrt(q(1-q))/δ (ver
+        `quantis.COMPRESSAO_PADRAO`); com `exato=True` usa `np.percentile`.
+
+        Returns:
+            dict: Percentil -> valor.
+        """
+        estado = self._estado
+        inicio, fim = estado.posicoes_periodo(data_inicio, data_fim)
+        valores = estado.calcular_percentis(coluna, list(percentis), inicio, fim, exato)
+        return dict(zip(percentis, (float(v) for v in valores)))
+
+    @medir()
+    def gerar_esboco_quantis(self, coluna=const.COL_TEMP, data_inicio=None, data_fim=None):
+        """
+        Retorna o esboço de quantis (`quantis.EsbocoQuantis`) de uma coluna no
+        período, que pode ser mesclado com esboços de outros períodos ou estações.
+        """
+        estado = self._estado
+        inicio, fim = estado.posicoes_periodo(data_inicio, data_fim)
+        return estado.esboco_periodo(coluna, inicio, fim)
+
+    @medir()
+    def gerar_momentos(self, data_inicio=None, data_fim=None):
+        """
+        Retorna contagem, soma, média e desvio padrão de cada coluna numérica no
+        período, a partir do índice de somas acumuladas. São os resumos parciais
+        usados para combinar estatísticas de várias estações.
+
+        Returns:
+            dict: coluna -> {"contagem", "soma", "media", "desvio_padrao"}.
+        """
+        estado = self._estado
+        inicio, fim = estado.posicoes_periodo(data_inicio, data_fim)
+        prefixos = estado.prefixos
+        return {
+            coluna: {
+                "contagem": prefixos.contagem(coluna, inicio, fim),
+                "soma": prefixos.soma(coluna, inicio, fim),
+                "media": prefixos.media(coluna, inicio, fim),
+                "desvio_padrao": prefixos.desvio_padrao(coluna, inicio, fim),
+            }
+            for coluna in prefixos.colunas
+        }
 
-    def buscar_menores_indices(self, coluna, n=5):
-        """Busca os N dias com os menores valores para uma coluna."""
-        return self.estacao.dias_com_menores_indices(coluna, n)
+    @medir()
+    def buscar_maiores_indices(self, coluna, n=5, data_inicio=None, data_fim=None):
+        """Busca os N dias com os maiores valores para uma coluna, no período ou em todos os dados."""
+        estado = self._estado
+        return estado.buscar_extremos(coluna, n, True, *estado.posicoes_periodo(data_inicio, data_fim))
 
-    def gerar_matriz_correlacao(self):
-        """Calcula a matriz de correlação para as colunas numéricas dos dados."""
-        colunas_numericas = self.dados_completos.select_dtypes(include=['number'])
-        return colunas_numericas.corr()
+    @medir()
+    def buscar_menores_indices(self, coluna, n=5, data_inicio=None, data_fim=None):
+        """Busca os N dias com os menores valores para uma coluna, no período ou em todos os dados."""
+        estado = self._estado
+        return estado.buscar_extremos(coluna, n, False, *estado.posicoes_periodo(data_inicio, data_fim))
+
+    @medir()
+    def buscar_extremos(self, colunas=None, n=5, maiores=True, data_inicio=None, data_fim=None):
+        """
+        Busca de uma vez os N maiores (ou menores) valores de várias colunas no período.
+
+        Args:
+            colunas (list, optional): As colunas. Padrão são as colunas numéricas indexadas.
+            n (int, optional): Quantas linhas por coluna. Padrão é 5.
+            maiores (bool, optional): Maiores (padrão) ou menores valores.
+            data_inicio (datetime, optional): Data de início do período.
+            data_fim (datetime, optional): Data de fim do período.
+
+        Returns:
+            dict: coluna -> DataFrame com a data e o valor das N linhas, do mais extremo ao menos extremo.
+        """
+        estado = self._estado
+        colunas = estado.piramide.colunas if colunas is None else colunas
+        inicio, fim = estado.posicoes_periodo(data_inicio, data_fim)
+        return {coluna: estado.buscar_extremos(coluna, n, maiores, inicio, fim) for coluna in colunas}
+
+    @medir()
+    @memorizar
+    def gerar_janelas_moveis(self, coluna=const.COL_TEMP, janelas=("24h",), estatisticas=("media",),
+                             data_inicio=None, data_fim=None, minimo_observacoes=None):
+        """
+        Calcula estatísticas móveis (média, soma, desvio padrão, mínimo e máximo)
+        de uma coluna em uma ou várias janelas de uma só vez (ver `janelas`).
+
+        As primeiras janelas do período incluem as leituras anteriores a ele que
+        couberem na janela, como se a série inteira tivesse sido calculada e
+        depois recortada. As linhas sem data válida não entram.
+
+        Args:
+            coluna (str, optional): A coluna numérica. Padrão é a temperatura.
+            janelas (list, optional): Quantidades de leituras (int) e/ou durações
+                ("24h", "7D"). Padrão é 24 horas.
+            estatisticas (list, optional): Entre "media", "soma", "desvio_padrao",
+                "minimo" e "maximo". Padrão é só a média.
+            data_inicio (datetime, optional): Data de início do período.
+            data_fim (datetime, optional): Data de fim do período.
+            minimo_observacoes (int, optional): Leituras necessárias para a janela
+                ter resultado (padrão como em `DataFrame.rolling`).
+
+        Returns:
+            pd.DataFrame: A data e uma coluna "<estatistica>_<janela>" por combinação.
+        """
+        estado = self._estado
+        inicio, fim = estado.posicoes_periodo(data_inicio, data_fim)
+        fim = min(fim, len(estado.datas))
+        inicio = min(inicio, fim)
+        recuo = inicio
+        if inicio < fim:
+            recuo = min(primeira_linha_janela(estado.datas, janela, inicio) for janela in janelas)
+        datas = estado.datas[recuo:fim]
+        valores = valores_coluna(estado.dados.iloc[recuo:fim], coluna)
+        resultado = calcular_janelas(datas, valores, list(janelas), estatisticas, minimo_observacoes)
+        resultado = resultado.iloc[inicio - recuo:].reset_index(drop=True)
+        resultado.insert(0, const.COL_DATA, datas[inicio - recuo:])
+        return resultado
+
+    @medir()
+    def gerar_normais(self, base="mes"):
+        """
+        Retorna a tabela das normais climatológicas.
 
+        Args:
+            base (str, optional): "mes" (uma linha por mês, 1 a 12) ou "dia" (uma
+                linha por dia do ano, 1 a 366, no calendário de um ano bissexto).
+
+        Returns:
+            pd.DataFrame: Colunas "<coluna>_<estatistica>" (contagem, media,
+            desvio_padrao e os percentis).
+        """
+        normais = self.obter_climatologia().normais[base]
+        tabela = pd.DataFrame({
+            f"{coluna}_{nome}": valores
+            for coluna, normal in normais.items()
+            for nome, valores in normal.items()
+        })
+        tabela.index = pd.RangeIndex(1, len(tabela) + 1, name=base)
+        return tabela
+
+    @medir()
+    @memorizar
+    def gerar_anomalias(self, colunas=None, data_inicio=None, data_fim=None):
+        """
+        Calcula, linha a linha, a anomalia (valor - normal do dia do ano) e o
+        z-score (anomalia / desvio padrão normal) das colunas no período.
+
+        Args:
+            colunas (list | str, optional): As colunas (ou uma só). Padrão são as colunas com normais.
+            data_inicio (datetime, optional): Data de início do período.
+            data_fim (datetime, optional): Data de fim do período.
+
+        Returns:
+            pd.DataFrame: A data e, por coluna, "<coluna>_anomalia" e "<coluna>_zscore".
+            As linhas sem data válida não entram.
+        """
+        estado = self._estado
+        climatologia = self.obter_climatologia(estado)
+        if colunas is None:
+            colunas = climatologia.colunas
+        elif isinstance(colunas, str):
+            colunas = [colunas]
+        inicio, fim = estado.posicoes_periodo(data_inicio, data_fim)
+        fim = min(fim, len(estado.datas))
+        inicio = min(inicio, fim)
+        datas = estado.datas[inicio:fim]
+        trecho = estado.dados.iloc[inicio:fim]
+        resultado = {const.COL_DATA: datas}
+        for coluna in colunas:
+            anomalia, zscore = climatologia.anomalias(coluna, datas, valores_coluna(trecho, coluna))
+            resultado[f"{coluna}_anomalia"] = anomalia
+            resultado[f"{coluna}_zscore"] = zscore
+        return pd.DataFrame(resultado)
+
+    @medir()
+    @memorizar
+    def gerar_eventos(self, tipos=None, data_inicio=None, data_fim=None, definicoes=None):
+        """
+        Detecta eventos de dias consecutivos no período: ondas de calor, períodos
+        secos, sequências chuvosas e de vento forte (ver `eventos`), a partir dos
+        agregados diários da pirâmide. Dias sem leituras interrompem os eventos.
+
+        Args:
+            tipos (list, optional): Nomes dos tipos de `eventos.TIPOS_EVENTO`. Padrão são todos.
+            data_inicio (datetime, optional): Data de início do período.
+            data_fim (datetime, optional): Data de fim do período.
+            definicoes (dict, optional): Ajustes de limiar, duração mínima etc. por
+                tipo, ou tipos novos (ver `eventos.resolver_definicoes`).
+
+        Returns:
+            pd.DataFrame: Um evento por linha com tipo, coluna, início, fim,
+            duração em dias, pico, dia do pico e média diária.
+        """
+        diario = self.gerar_analise_periodica("diario", data_inicio, data_fim)
+        return detectar_eventos(diario, tipos, definicoes)
+
+    def gerar_comomentos(self, data_inicio=None, data_fim=None):
+        """
+        Retorna os co-momentos (`covariancia.CoMomentos`) das colunas numéricas no
+        período, que podem ser combinados com os de outros períodos ou estações.
+        """
+        estado = self._estado
+        inicio, fim = estado.posicoes_periodo(data_inicio, data_fim)
+        return estado.comomentos_periodo(inicio, fim)
+
+    @medir()
+    @memorizar
+    def gerar_matriz_correlacao(self, data_inicio=None, data_fim=None):
+        """
+        Calcula a matriz de correlação das colunas numéricas no período (ou em
+        todos os dados), como `DataFrame.corr`, a partir dos co-momentos mensais
+        pré-calculados: só as linhas dos meses incompletos das bordas são lidas.
+        """
+        return self.gerar_comomentos(data_inicio, data_fim).correlacao()
+
+    @medir()
+    @memorizar
     def gerar_analise_mensal(self, data_inicio=None, data_fim=None):
         """
         Agrupa os dados do período por mês, calculando médias e somas para
         análise sazonal.
+
+        Os meses inteiros do período vêm prontos da pirâmide de agregados; só os
+        meses das bordas, se incompletos, são recalculados.
         """
-        dados_periodo = self.get_dados_filtrados_para_plot(data_inicio, data_fim)
-        if dados_periodo.empty:
-            return pd.DataFrame()
+        analise = self.gerar_analise_periodica("mensal", data_inicio, data_fim)
+        return formatar_analise_mensal(analise)
 
-        analise_mensal = dados_periodo.resample('ME', on=const.COL_DATA).agg({
-            const.COL_TEMP: 'mean',
-            const.COL_UMIDADE: 'mean',
-            const.COL_PRECIP: 'sum'
-        }).reset_index()
+    @medir()
+    @memorizar
+    def gerar_analise_periodica(self, nivel="mensal", data_inicio=None, data_fim=None):
+        """
+        Agrega os dados do período em baldes diários, mensais, sazonais (DJF, MAM,
+        JJA, SON) ou anuais, a partir da pirâmide de agregados.
 
-        analise_mensal = analise_mensal.rename(columns={
-            const.COL_TEMP: 'temperatura_media',
-            const.COL_UMIDADE: 'umidade_media',
-            const.COL_PRECIP: 'precipitacao_total'
-        })
+        Args:
+            nivel (str, optional): "diario", "mensal", "sazonal" ou "anual".
+            data_inicio (datetime, optional): Data de início do período.
+            data_fim (datetime, optional): Data de fim do período.
 
-        return analise_mensal
+        Returns:
+            pd.DataFrame: Uma linha por balde (data de início do balde) com
+            contagem, soma, média, mínimo e máximo de cada coluna numérica.
+        """
+        estado = self._estado
+        inicio, fim = estado.posicoes_periodo(data_inicio, data_fim)
+        return estado.piramide.agregar_por_nivel(nivel, inicio, fim)
 
+    @medir()
+    @memorizar
     def gerar_resumo_inteligente(self, data_inicio=None, data_fim=None):
         """
-        Gera um resumo comparando os dados do período com a média geral 
+        Gera um resumo comparando os dados do período com a normal climatológica
+        da época (ver `climatologia`): a média que cada medição teria se seguisse
+        a normal do dia do ano de cada leitura do período.
         """
         estatisticas, dados_filtrados = self.gerar_estatisticas(data_inicio, data_fim)
         if not estatisticas or dados_filtrados.empty:
@@ -130,35 +694,45 @@ class AnalisadorClimatico:
         umidade_periodo = estatisticas['Umidade Média (%)']
         vento_periodo = estatisticas['Velocidade Média do Vento (km/h)']
 
-        # Médias gerais (históricas)
-        media_geral_temp = self.dados_completos[const.COL_TEMP].mean()
-        media_geral_umidade = self.dados_completos[const.COL_UMIDADE].mean()
-        media_geral_vento = self.dados_completos[const.COL_VENTO].mean()
+        # Normais da época para as mesmas leituras (ou a média geral, se não houver normal)
+        estado = self._estado
+        climatologia = self.obter_climatologia(estado)
+        com_data = dados_filtrados[dados_filtrados[const.COL_DATA].notna()]
+        datas = com_data[const.COL_DATA].to_numpy()
+        total_linhas = len(estado.dados)
+
+        def normal_do_periodo(coluna):
+            normal = climatologia.media_normal(coluna, datas, valores_coluna(com_data, coluna))
+            return normal if np.isfinite(normal) else estado.prefixos.media(coluna, 0, total_linhas)
+
+        normal_temp = normal_do_periodo(const.COL_TEMP)
+        normal_umidade = normal_do_periodo(const.COL_UMIDADE)
+        normal_vento = normal_do_periodo(const.COL_VENTO)
 
         # Comparações de Temperatura
-        dif_temp = temp_periodo - media_geral_temp
+        dif_temp = temp_periodo - normal_temp
         if dif_temp > 1:
-            comp_temp = f"{abs(dif_temp):.1f}°C acima da média (mais quente que o normal)"
+            comp_temp = f"{abs(dif_temp):.1f}°C acima da normal da época (mais quente que o normal)"
         elif dif_temp < -1:
-            comp_temp = f"{abs(dif_temp):.1f}°C abaixo da média (mais frio que o normal)"
+            comp_temp = f"{abs(dif_temp):.1f}°C abaixo da normal da época (mais frio que o normal)"
         else:
             comp_temp = "dentro da normalidade"
 
         # Comparações de Umidade
-        dif_umidade = umidade_periodo - media_geral_umidade
+        dif_umidade = umidade_periodo - normal_umidade
         if dif_umidade > 5:
-            comp_umidade = "mais úmido que a média"
+            comp_umidade = "mais úmido que a normal da época"
         elif dif_umidade < -5:
-            comp_umidade = "mais seco que a média"
+            comp_umidade = "mais seco que a normal da época"
         else:
             comp_umidade = "dentro da normalidade"
 
         # Comparações de Vento
-        dif_vento = vento_periodo - media_geral_vento
+        dif_vento = vento_periodo - normal_vento
         if dif_vento > 2:
-            comp_vento = f"{abs(dif_vento):.1f} km/h acima da média (mais vento que o normal)"
+            comp_vento = f"{abs(dif_vento):.1f} km/h acima da normal da época (mais vento que o normal)"
         elif dif_vento < -2:
-            comp_vento = f"{abs(dif_vento):.1f} km/h abaixo da média (mais calmo que o normal)"
+            comp_vento = f"{abs(dif_vento):.1f} km/h abaixo da normal da época (mais calmo que o normal)"
         else:
             comp_vento = "dentro da normalidade"
 
@@ -171,7 +745,7 @@ class AnalisadorClimatico:
         resumo = (
             f"Análise do período de {data_inicio.strftime('%d/%m/%Y')} a {data_fim.strftime('%d/%m/%Y')}:\n\n"
             f" TEMPERATURA:\n"
-            f"  - A temperatura média foi de {temp_periodo:,.2f}°C, {comp_temp}.\n"
+            f"  - A temperatura média foi de {temp_periodo:,.2f}°C, {comp_temp}; a normal seria {normal_temp:,.2f}°C.\n"
             f"  - Extremos no período: {dia_mais_quente[const.COL_TEMP]:.1f}°C ({dia_mais_quente[const.COL_DATA].strftime('%d/%m')}) "
             f"e {dia_mais_frio[const.COL_TEMP]:.1f}°C ({dia_mais_frio[const.COL_DATA].strftime('%d/%m')}).\n\n"
             f" VENTO:\n"
@@ -1,6 +1,7 @@
 import customtkinter as ctk
 import pandas as pd
 import os
+from collections import OrderedDict
 import matplotlib.pyplot as plt
 from tkinter import filedialog, messagebox
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
@@ -9,6 +10,10 @@ from datetime import datetime
 
 from analisador import AnalisadorClimatico
 from visualizador import VisualizadorClimatico
+from tarefas import GerenciadorTarefas
+from tabela_virtual import TabelaVirtual
+import exportacao
+import perfil
 import constantes as const
 
 # --- Configurações Iniciais do CustomTkinter ---
@@ -38,6 +43,19 @@ class AppClima(ctk.CTk):
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
 
+        # Tarefas em segundo plano e a barra que mostra seu progresso
+        self.tarefas = GerenciadorTarefas(self, ao_mudar=self._atualizar_barra_tarefas)
+        self.barra_tarefas = ctk.CTkFrame(self)
+        self.rotulo_tarefas = ctk.CTkLabel(self.barra_tarefas, text="")
+        self.rotulo_tarefas.pack(side="left", padx=10, pady=5)
+        self.btn_cancelar_tarefas = ctk.CTkButton(self.barra_tarefas, text="Cancelar", width=80, command=self.tarefas.cancelar)
+        self.btn_cancelar_tarefas.pack(side="right", padx=10, pady=5)
+        self.progresso_tarefas = ctk.CTkProgressBar(self.barra_tarefas, mode="indeterminate")
+        self.progresso_tarefas.pack(side="left", fill="x", expand=True, padx=10, pady=5)
+        self._barra_tarefas_visivel = False
+        self._progresso_indeterminado = False
+        self.protocol("WM_DELETE_WINDOW", self._ao_fechar)
+
         self.frames = {}
         # Itera sobre as classes das páginas para criá-las
         for F in (StartPage, AnalysisPage, GraphOptionsPage):
@@ -56,6 +74,47 @@ class AppClima(ctk.CTk):
             frame.update_description()
         frame.tkraise()
 
+    def executar_tarefa(self, chave, funcao, *args, ao_concluir=None, ao_falhar=None,
+                        descricao="Processando...", **kwargs):
+        """
+        Executa uma função em segundo plano (ver `tarefas.GerenciadorTarefas`).
+        Cliques repetidos na mesma ação são ignorados enquanto ela não termina.
+        """
+        if ao_falhar is None:
+            ao_falhar = lambda e: messagebox.showerror("Erro", f"Não foi possível concluir a operação.\n\nErro: {e}")
+        return self.tarefas.executar(chave, funcao, *args, ao_concluir=ao_concluir, ao_falhar=ao_falhar,
+                                     descricao=descricao, **kwargs)
+
+    def _atualizar_barra_tarefas(self, tarefas):
+        """Mostra, atualiza ou esconde a barra de progresso das tarefas em segundo plano."""
+        if not tarefas:
+            self.progresso_tarefas.stop()
+            self._progresso_indeterminado = False
+            self.barra_tarefas.pack_forget()
+            self._barra_tarefas_visivel = False
+            return
+        if not self._barra_tarefas_visivel:
+            self.barra_tarefas.pack(side="bottom", fill="x", before=self.container)
+            self._barra_tarefas_visivel = True
+        self.rotulo_tarefas.configure(text=" | ".join(t.descricao for t in tarefas))
+        progressos = [t.progresso for t in tarefas if t.progresso is not None]
+        if len(progressos) == len(tarefas):
+            if self._progresso_indeterminado:
+                self.progresso_tarefas.stop()
+                self.progresso_tarefas.configure(mode="determinate")
+                self._progresso_indeterminado = False
+            self.progresso_tarefas.set(min(progressos))
+        elif not self._progresso_indeterminado:
+            self.progresso_tarefas.configure(mode="indeterminate")
+            self.progresso_tarefas.start()
+            self._progresso_indeterminado = True
+
+    def _ao_fechar(self):
+        # As tarefas que verificam o cancelamento (carga e exportação) param na
+        # próxima etapa; as demais terminam antes de o processo sair
+        self.tarefas.fechar()
+        self.destroy()
+
     def set_analisador(self, analisador_instance):
         self.analisador = analisador_instance
 
@@ -87,11 +146,21 @@ class AppClima(ctk.CTk):
 class GraphViewerWindow(ctk.CTkToplevel):
     """
     Janela Toplevel para exibir figuras do Matplotlib com navegação.
+
+    Aceita figuras prontas ou fábricas (funções sem argumentos que criam a
+    figura); uma fábrica só é executada quando sua página é exibida pela primeira
+    vez. As últimas páginas exibidas mantêm seu canvas (até `CANVAS_EM_CACHE`),
+    que é apenas escondido e reexibido ao navegar, sem redesenhar a figura.
     """
+    CANVAS_EM_CACHE = 4
+
     def __init__(self, master, figures):
         super().__init__(master)
-        self.figures = figures
+        self.figures = list(figures)
         self.current_figure_index = 0
+        self._canvas_por_pagina = OrderedDict()
+        self._pagina_visivel = None
+        self._paginas_com_tema = set()
 
         self.title("Visualizador de Gráficos")
         self.geometry("1000x700")
@@ -129,19 +198,58 @@ class GraphViewerWindow(ctk.CTkToplevel):
             if ax.get_legend() is not None:
                 plt.setp(ax.get_legend().get_texts(), color=text_color)
 
-    def _display_current_figure(self):
-        for widget in self.fig_canvas_frame.winfo_children():
-            widget.destroy()
-
-        fig_to_display = self.figures[self.current_figure_index]
-        self._apply_theme_to_figure(fig_to_display)
+    def _obter_figura(self, indice):
+        """Retorna a figura da página, criando-a e aplicando o tema apenas na primeira vez."""
+        figura = self.figures[indice]
+        if callable(figura):
+            figura = self.figures[indice] = figura()
+        if indice not in self._paginas_com_tema:
+            self._apply_theme_to_figure(figura)
+            self._paginas_com_tema.add(indice)
+        return figura
+
+    def _criar_canvas(self, indice):
+        """Cria o quadro da página com o canvas e a barra de ferramentas da figura."""
+        quadro = ctk.CTkFrame(self.fig_canvas_frame, fg_color="transparent")
+        try:
+            with perfil.intervalo("GraphViewerWindow.criar_figura", pagina=indice):
+                figura = self._obter_figura(indice)
+            canvas = FigureCanvasTkAgg(figura, master=quadro)
+            with perfil.intervalo("GraphViewerWindow.draw", pagina=indice):
+                canvas.draw()
+            toolbar = NavigationToolbar2Tk(canvas, quadro)
+            toolbar.update()
+        except Exception:
+            quadro.destroy()
+            raise
+        toolbar.pack(side=ctk.BOTTOM, fill=ctk.X)
+        canvas.get_tk_widget().pack(side=ctk.TOP, fill=ctk.BOTH, expand=True)
+        return quadro, canvas, toolbar
 
-        self.canvas = FigureCanvasTkAgg(fig_to_display, master=self.fig_canvas_frame)
-        self.canvas.draw()
-        self.toolbar = NavigationToolbar2Tk(self.canvas, self.fig_canvas_frame)
-        self.toolbar.update()
-        self.toolbar.pack(side=ctk.BOTTOM, fill=ctk.X)
-        self.canvas.get_tk_widget().pack(side=ctk.TOP, fill=ctk.BOTH, expand=True)
+    def _display_current_figure(self):
+        indice = self.current_figure_index
+        if indice in self._canvas_por_pagina:
+            self._canvas_por_pagina.move_to_end(indice)
+        else:
+            try:
+                pagina = self._criar_canvas(indice)
+            except Exception as e:
+                # A página anterior continua exibida; a fábrica é tentada de novo na próxima visita
+                if self._pagina_visivel is not None:
+                    self.current_figure_index = self._pagina_visivel
+                messagebox.showerror("Erro ao Gerar Gráfico",
+                                     f"Não foi possível exibir o gráfico {indice + 1}.\n\nErro: {e}", parent=self)
+                return
+            self._canvas_por_pagina[indice] = pagina
+            while len(self._canvas_por_pagina) > self.CANVAS_EM_CACHE:
+                _, (quadro, _, _) = self._canvas_por_pagina.popitem(last=False)
+                quadro.destroy()
+
+        if self._pagina_visivel is not None and self._pagina_visivel in self._canvas_por_pagina:
+            self._canvas_por_pagina[self._pagina_visivel][0].pack_forget()
+        quadro, self.canvas, self.toolbar = self._canvas_por_pagina[indice]
+        quadro.pack(fill=ctk.BOTH, expand=True)
+        self._pagina_visivel = indice
 
     def _show_prev_figure(self):
         self.current_figure_index = (self.current_figure_index - 1) % len(self.figures)
@@ -152,11 +260,71 @@ class GraphViewerWindow(ctk.CTkToplevel):
         self._display_current_figure()
 
     def _on_closing(self):
-        for fig in self.figures:
-            plt.close(fig)
+        self._canvas_por_pagina.clear()
+        self.figures = []
         self.destroy()
 
 
+class PerformanceWindow(ctk.CTkToplevel):
+    """
+    Painel de desempenho (disponível com CLIMA_PERFIL definido): tempos e
+    memória por trecho instrumentado, atualizados periodicamente, com exportação
+    para Chrome Trace e cProfile.
+    """
+    INTERVALO_ATUALIZACAO_MS = 1000
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Desempenho")
+        self.geometry("900x500")
+        self.transient(master)
+
+        botoes = ctk.CTkFrame(self, fg_color="transparent")
+        botoes.pack(side="bottom", fill="x", padx=10, pady=10)
+        ctk.CTkButton(botoes, text="Limpar", width=100, command=self._limpar).pack(side="left", padx=5)
+        ctk.CTkButton(botoes, text="Exportar Chrome Trace", command=self._exportar_chrome_trace).pack(side="right", padx=5)
+        ctk.CTkButton(botoes, text="Exportar cProfile", command=self._exportar_cprofile,
+                      state="normal" if perfil.COM_CPROFILE else "disabled").pack(side="right", padx=5)
+
+        self.texto = ctk.CTkTextbox(self, font=("monospace", 11), wrap="none")
+        self.texto.pack(fill="both", expand=True, padx=10, pady=(10, 0))
+        self._atualizacao = None
+        self._atualizar()
+
+    def _atualizar(self):
+        linhas = [f"{'Trecho':<48}{'Chamadas':>9}{'Total ms':>11}{'Próprio ms':>12}{'Média ms':>10}{'Máx ms':>10}{'Mem MB':>9}"]
+        for item in perfil.PERFILADOR.resumo():
+            linhas.append(
+                f"{item['nome'][:47]:<48}{item['chamadas']:>9}{item['total_ms']:>11.1f}{item['proprio_ms']:>12.1f}"
+                f"{item['media_ms']:>10.2f}{item['maximo_ms']:>10.1f}{item['memoria_max_mb']:>9.1f}"
+            )
+        self.texto.configure(state="normal")
+        self.texto.delete("1.0", "end")
+        self.texto.insert("1.0", "\n".join(linhas))
+        self.texto.configure(state="disabled")
+        self._atualizacao = self.after(self.INTERVALO_ATUALIZACAO_MS, self._atualizar)
+
+    def _limpar(self):
+        perfil.PERFILADOR.limpar()
+
+    def _exportar_chrome_trace(self):
+        caminho = filedialog.asksaveasfilename(parent=self, defaultextension=".json", initialfile="clima_trace.json",
+                                               filetypes=[("Chrome Trace", "*.json")])
+        if caminho:
+            perfil.PERFILADOR.exportar_chrome_trace(caminho)
+
+    def _exportar_cprofile(self):
+        caminho = filedialog.asksaveasfilename(parent=self, defaultextension=".prof", initialfile="clima.prof",
+                                               filetypes=[("cProfile", "*.prof")])
+        if caminho and not perfil.PERFILADOR.exportar_cprofile(caminho):
+            messagebox.showinfo("Sem Dados", "Nenhum perfil do cProfile foi registrado ainda.", parent=self)
+
+    def destroy(self):
+        if self._atualizacao is not None:
+            self.after_cancel(self._atualizacao)
+        super().destroy()
+
+
 class StartPage(ctk.CTkFrame):
     """
     Página inicial da aplicação para carregar o arquivo e selecionar o período.
@@ -227,21 +395,28 @@ class StartPage(ctk.CTkFrame):
         caminho = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
         if not caminho:
             return
-        try:
-            analisador = AnalisadorClimatico(caminho)
-            self.controller.set_analisador(analisador)
-            messagebox.showinfo("Sucesso", f"Arquivo '{os.path.basename(caminho)}' carregado.")
-            dados = analisador.get_dados_completos()
-            if not dados.empty:
-                self.data_inicio_entry.delete(0, ctk.END)
-                self.data_inicio_entry.insert(0, dados['data'].min().strftime('%Y-%m-%d'))
-                self.data_fim_entry.delete(0, ctk.END)
-                self.data_fim_entry.insert(0, dados['data'].max().strftime('%Y-%m-%d'))
-                self.btn_avancar.configure(state="normal")
-        except Exception as e:
-            messagebox.showerror("Erro ao Carregar", f"Não foi possível carregar ou processar o arquivo.\nVerifique o formato das colunas.\n\nErro: {e}")
-            self.controller.set_analisador(None)
-            self.btn_avancar.configure(state="disabled")
+        self.controller.executar_tarefa(
+            "carregar_csv", AnalisadorClimatico, caminho, com_tarefa=True,
+            ao_concluir=lambda analisador: self._csv_carregado(caminho, analisador),
+            ao_falhar=self._falha_ao_carregar,
+            descricao=f"Carregando '{os.path.basename(caminho)}'..."
+        )
+
+    def _csv_carregado(self, caminho, analisador):
+        self.controller.set_analisador(analisador)
+        messagebox.showinfo("Sucesso", f"Arquivo '{os.path.basename(caminho)}' carregado.")
+        dados = analisador.get_dados_completos()
+        if not dados.empty:
+            self.data_inicio_entry.delete(0, ctk.END)
+            self.data_inicio_entry.insert(0, dados['data'].min().strftime('%Y-%m-%d'))
+            self.data_fim_entry.delete(0, ctk.END)
+            self.data_fim_entry.insert(0, dados['data'].max().strftime('%Y-%m-%d'))
+            self.btn_avancar.configure(state="normal")
+
+    def _falha_ao_carregar(self, e):
+        messagebox.showerror("Erro ao Carregar", f"Não foi possível carregar ou processar o arquivo.\nVerifique o formato das colunas.\n\nErro: {e}")
+        self.controller.set_analisador(None)
+        self.btn_avancar.configure(state="disabled")
 
     def avancar_para_analise(self):
         data_inicio_str = self.data_inicio_entry.get()
@@ -274,6 +449,9 @@ class AnalysisPage(ctk.CTkFrame):
     """
     Página principal de análise, exibe resumos e oferece opções de visualização.
     """
+    # Intervalo entre as leituras das linhas acrescentadas ao CSV, quando acompanhado
+    INTERVALO_ACOMPANHAMENTO_MS = 30_000
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
@@ -288,6 +466,10 @@ class AnalysisPage(ctk.CTkFrame):
         self.period_info_label.pack()
         self.style_info_label = ctk.CTkLabel(info_frame, text="", font=ctk.CTkFont(size=14))
         self.style_info_label.pack(pady=(0,5))
+        self.acompanhar_switch = ctk.CTkSwitch(info_frame, text="Acompanhar novas linhas do arquivo",
+                                               command=self._alternar_acompanhamento)
+        self.acompanhar_switch.pack(pady=(0,5))
+        self._acompanhamento = None
 
         self.btn_mostrar_dados = ctk.CTkButton(self, text="Exibir Tabela de Dados do Período", command=self.mostrar_todos_dados)
         self.btn_mostrar_dados.grid(row=1, column=0, padx=20, pady=5, sticky="ew")
@@ -314,6 +496,47 @@ class AnalysisPage(ctk.CTkFrame):
         self.btn_exportar = ctk.CTkButton(botoes_finais_frame, text="Novo Recorte dos Dados para CSV", command=self.exportar_csv)
         self.btn_exportar.grid(row=0, column=1, padx=(5, 0), sticky="ew")
 
+        if perfil.ATIVO:
+            ctk.CTkButton(self, text="Painel de Desempenho", fg_color="gray50", hover_color="gray30",
+                          command=lambda: PerformanceWindow(self.controller)).grid(row=6, column=0, padx=20, pady=(0, 20), sticky="ew")
+
+    def _alternar_acompanhamento(self):
+        """Liga ou desliga a leitura periódica das linhas acrescentadas ao CSV."""
+        if self._acompanhamento is not None:
+            self.after_cancel(self._acompanhamento)
+            self._acompanhamento = None
+        if self.acompanhar_switch.get():
+            self._verificar_novas_linhas()
+
+    def _verificar_novas_linhas(self):
+        self._acompanhamento = None
+        analisador = self.controller.get_analisador()
+        if analisador is None or not self.acompanhar_switch.get():
+            return
+        self.controller.executar_tarefa(
+            "acompanhar", analisador.atualizar,
+            ao_concluir=self._novas_linhas_lidas, ao_falhar=self._falha_ao_acompanhar,
+            descricao="Lendo novas linhas..."
+        )
+        self._acompanhamento = self.after(self.INTERVALO_ACOMPANHAMENTO_MS, self._verificar_novas_linhas)
+
+    def _novas_linhas_lidas(self, novas):
+        """Atualiza o recorte e a descrição quando o CSV ganhou linhas."""
+        if not novas:
+            return
+        analisador = self.controller.get_analisador()
+        inicio, fim = self.controller.selected_start_date, self.controller.selected_end_date
+        self.controller.set_filtered_data(analisador.get_dados_filtrados_para_plot(inicio, fim), inicio, fim)
+        ultima = analisador.get_dados_completos()["data"].max()
+        self.csv_info_label.configure(
+            text=f"{self.controller.get_selected_csv_name()} (+{novas} linhas, até {ultima:%d/%m/%Y %H:%M})"
+        )
+
+    def _falha_ao_acompanhar(self, e):
+        self.acompanhar_switch.deselect()
+        self._alternar_acompanhamento()
+        messagebox.showerror("Erro ao Acompanhar", f"Não foi possível ler as novas linhas; recarregue o arquivo.\n\nErro: {e}")
+
     def update_description(self):
         self.csv_info_label.configure(text=self.controller.get_selected_csv_name())
         self.period_info_label.configure(text=self.controller.get_selected_period_str())
@@ -324,45 +547,66 @@ class AnalysisPage(ctk.CTkFrame):
         self.resumo_textbox.configure(state="disabled")
 
     def mostrar_estatisticas(self):
-        """Gera e exibe o dashboard híbrido de estatísticas."""
-        analisador = self.controller.get_analisador()
-        estatisticas, _ = analisador.gerar_estatisticas(
-            self.controller.selected_start_date, self.controller.selected_end_date
+        """Gera (em segundo plano) e exibe o dashboard híbrido de estatísticas."""
+        self.controller.executar_tarefa(
+            "estatisticas", self._criar_dashboard, self.controller.get_analisador(),
+            self.controller.selected_start_date, self.controller.selected_end_date,
+            ao_concluir=self._exibir_dashboard, descricao="Calculando estatísticas..."
         )
+
+    @staticmethod
+    def _criar_dashboard(analisador, data_inicio, data_fim):
+        estatisticas, _ = analisador.gerar_estatisticas(data_inicio, data_fim)
         if not estatisticas:
+            return None
+        visualizador = VisualizadorClimatico(None)
+        return visualizador.plotar_dashboard_hibrido(estatisticas)
+
+    def _exibir_dashboard(self, fig):
+        if fig is None:
             messagebox.showinfo("Sem Dados", "Nenhum dado disponível para gerar estatísticas.")
             return
-        visualizador = VisualizadorClimatico(None)
-        fig = visualizador.plotar_dashboard_hibrido(estatisticas)
-        if fig:
-            GraphViewerWindow(self.controller, [fig])
+        GraphViewerWindow(self.controller, [fig])
 
     def gerar_resumo(self):
         analisador = self.controller.get_analisador()
-        resumo = analisador.gerar_resumo_inteligente(self.controller.selected_start_date, self.controller.selected_end_date)
+        self.controller.executar_tarefa(
+            "resumo", analisador.gerar_resumo_inteligente,
+            self.controller.selected_start_date, self.controller.selected_end_date,
+            ao_concluir=self._exibir_resumo, descricao="Gerando resumo..."
+        )
+
+    def _exibir_resumo(self, resumo):
         self.resumo_textbox.configure(state="normal")
         self.resumo_textbox.delete("1.0", "end")
         self.resumo_textbox.insert("1.0", resumo)
         self.resumo_textbox.configure(state="disabled")
 
     def exportar_csv(self):
+        """Exporta o recorte do período em segundo plano, no formato escolhido (ver `exportacao`)."""
         dados_filtrados = self.controller.get_filtered_data()
         if dados_filtrados is None or dados_filtrados.empty:
             messagebox.showinfo("Sem Dados", "Não há dados para exportar.")
             return
         initial_filename = f"dados_filtrados_{self.controller.selected_start_date.strftime('%Y%m%d')}_{self.controller.selected_end_date.strftime('%Y%m%d')}.csv"
+        tipos = [(exportacao.FORMATOS[f][1], f"*{exportacao.FORMATOS[f][0]}") for f in exportacao.formatos_disponiveis()]
         filepath = filedialog.asksaveasfilename(
             initialfile=initial_filename,
             defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+            filetypes=tipos + [("All files", "*.*")]
         )
         if not filepath:
             return
         try:
-            dados_filtrados.to_csv(filepath, index=False)
-            messagebox.showinfo("Sucesso", f"Dados exportados com sucesso para:\n{filepath}")
-        except Exception as e:
-            messagebox.showerror("Erro ao Exportar", f"Não foi possível guardar o arquivo.\n\nErro: {e}")
+            formato = exportacao.formato_do_caminho(filepath)
+        except ValueError:
+            formato = "csv"
+        self.controller.executar_tarefa(
+            "exportar", exportacao.exportar, dados_filtrados, filepath, formato, com_tarefa=True,
+            ao_concluir=lambda caminho: messagebox.showinfo("Sucesso", f"Dados exportados com sucesso para:\n{caminho}"),
+            ao_falhar=lambda e: messagebox.showerror("Erro ao Exportar", f"Não foi possível guardar o arquivo.\n\nErro: {e}"),
+            descricao=f"Exportando '{os.path.basename(filepath)}'..."
+        )
 
     def mostrar_todos_dados(self):
         """Exibe os dados brutos do período selecionado em uma nova janela."""
@@ -375,15 +619,7 @@ class AnalysisPage(ctk.CTkFrame):
         top.geometry("850x500")
         top.transient(self.controller)
         top.after(20, top.grab_set)
-        text_widget = ctk.CTkTextbox(top, font=("monospace", 10), wrap="none", text_color=("gray10", "#DCE4EE"))
-        text_widget.pack(padx=10, pady=10, fill="both", expand=True)
-        try:
-            dados_str = dados.to_markdown(index=False)
-        except ImportError:
-            pd.options.display.float_format = '{:,.2f}'.format
-            dados_str = dados.to_string(index=False)
-        text_widget.insert("1.0", dados_str)
-        text_widget.configure(state="disabled")
+        TabelaVirtual(top, dados).pack(padx=10, pady=10, fill="both", expand=True)
 
 
 class GraphOptionsPage(ctk.CTkFrame):
@@ -399,16 +635,12 @@ class GraphOptionsPage(ctk.CTkFrame):
         sazonal_frame.pack(pady=5, padx=20, fill='x')
         ctk.CTkLabel(sazonal_frame, text="Análise Sazonal (Período Selecionado)", font=ctk.CTkFont(weight="bold")).pack(pady=5)
         ctk.CTkButton(sazonal_frame, text="Gerar Gráfico de Análise Mensal", command=self.gerar_grafico_mensal).pack(pady=5, fill='x')
+        ctk.CTkButton(sazonal_frame, text="Gerar Médias Móveis de Temperatura (24h e 7 dias)", command=self.gerar_grafico_janelas_moveis).pack(pady=5, fill='x')
 
         extremos_frame = ctk.CTkFrame(self)
         extremos_frame.pack(pady=5, padx=20, fill='x')
-        ctk.CTkLabel(extremos_frame, text="Análise de Dias Extremos (Dados Gerais)", font=ctk.CTkFont(weight="bold")).pack(pady=5)
-        self.metricas_map = {
-            "Temperatura": (const.COL_TEMP, "°C", "YlOrRd", "Blues_r"),
-            "Umidade": (const.COL_UMIDADE, "%", "Greens", "GnBu_r"),
-            "Vento": (const.COL_VENTO, " km/h", "Oranges", "Purples_r"),
-            "Precipitação": (const.COL_PRECIP, " mm", "Blues", "Reds_r")
-        }
+        ctk.CTkLabel(extremos_frame, text="Análise de Dias Extremos (Período Selecionado)", font=ctk.CTkFont(weight="bold")).pack(pady=5)
+        self.metricas_map = const.METRICAS_EXTREMOS
         self.metrica_selecionada = ctk.StringVar(value="Temperatura")
         self.tipo_extremo_selecionado = ctk.StringVar(value="Maiores Índices")
         ctk.CTkLabel(extremos_frame, text="Selecione a Métrica:").pack()
@@ -420,23 +652,53 @@ class GraphOptionsPage(ctk.CTkFrame):
         geral_frame = ctk.CTkFrame(self)
         geral_frame.pack(pady=10, padx=20, fill='x')
         ctk.CTkLabel(geral_frame, text="Análise Geral e Estatística (Dados Gerais)", font=ctk.CTkFont(weight="bold")).pack(pady=5)
-        ctk.CTkButton(geral_frame, text="Gerar Heatmap de Correlação", command=self.gerar_heatmap).pack(pady=5, fill='x')
+        ctk.CTkButton(geral_frame, text="Gerar Heatmap de Correlação (Período Selecionado)", command=self.gerar_heatmap).pack(pady=5, fill='x')
         ctk.CTkButton(geral_frame, text="Gerar Histograma de Temperatura", command=self.gerar_histograma_temperatura).pack(pady=5, fill='x')
-        ctk.CTkButton(geral_frame, text="Visualizar Gráficos Principais do Período", command=self.visualizar_graficos_periodo).pack(pady=5, fill='x')
+        ctk.CTkButton(geral_frame, text="Visualizar Gráficos Principais do Período (com Eventos)", command=self.visualizar_graficos_periodo).pack(pady=5, fill='x')
 
         self.btn_voltar = ctk.CTkButton(self, text="Voltar para Análise", height=40, command=lambda: self.controller.show_frame("AnalysisPage"))
         self.btn_voltar.pack(pady=20, padx=20, fill='x', side='bottom')
 
+    def _exibir_figuras(self, figuras, mensagem_sem_dados):
+        """Abre o visualizador com as figuras geradas em segundo plano (ou avisa se não houver)."""
+        if not figuras:
+            messagebox.showinfo("Sem Dados", mensagem_sem_dados)
+            return
+        GraphViewerWindow(self.controller, figuras)
+
     def gerar_grafico_mensal(self):
         analisador = self.controller.get_analisador()
-        dados_mensais = analisador.gerar_analise_mensal(self.controller.selected_start_date, self.controller.selected_end_date)
+        self.controller.executar_tarefa(
+            "grafico_mensal", self._criar_grafico_mensal, analisador,
+            self.controller.selected_start_date, self.controller.selected_end_date,
+            ao_concluir=lambda figuras: self._exibir_figuras(figuras, "Não há dados suficientes no período para a análise mensal."),
+            descricao="Gerando análise mensal..."
+        )
+
+    @staticmethod
+    def _criar_grafico_mensal(analisador, data_inicio, data_fim):
+        dados_mensais = analisador.gerar_analise_mensal(data_inicio, data_fim)
         if dados_mensais.empty:
-            messagebox.showinfo("Sem Dados", "Não há dados suficientes no período para a análise mensal.")
-            return
+            return []
         visualizador = VisualizadorClimatico(dados_mensais)
-        fig = visualizador.plotar_analise_mensal(dados_mensais)
-        if fig:
-            GraphViewerWindow(self.controller, [fig])
+        return [visualizador.plotar_analise_mensal(dados_mensais)]
+
+    def gerar_grafico_janelas_moveis(self):
+        analisador = self.controller.get_analisador()
+        self.controller.executar_tarefa(
+            "grafico_janelas_moveis", self._criar_grafico_janelas_moveis, analisador,
+            self.controller.selected_start_date, self.controller.selected_end_date,
+            ao_concluir=lambda figuras: self._exibir_figuras(figuras, "Não há dados no período para as médias móveis."),
+            descricao="Calculando médias móveis..."
+        )
+
+    @staticmethod
+    def _criar_grafico_janelas_moveis(analisador, data_inicio, data_fim):
+        janelas_moveis = analisador.gerar_janelas_moveis(const.COL_TEMP, ("24h", "7D"), ("media",), data_inicio, data_fim)
+        if janelas_moveis.empty:
+            return []
+        visualizador = VisualizadorClimatico(analisador.get_dados_filtrados_para_plot(data_inicio, data_fim))
+        return [visualizador.plotar_janelas_moveis(janelas_moveis, const.COL_TEMP, "Temperatura e Médias Móveis", "Temperatura (°C)")]
 
     def gerar_grafico_extremos(self):
         analisador = self.controller.get_analisador()
@@ -447,51 +709,81 @@ class GraphOptionsPage(ctk.CTkFrame):
         tipo_extremo = self.tipo_extremo_selecionado.get()
         coluna, unidade, paleta_maior, paleta_menor = self.metricas_map[metrica_nome]
         titulo = f"Top 5 Dias com {tipo_extremo} de {metrica_nome}"
-        if tipo_extremo == "Maiores Índices":
-            df_extremos = analisador.buscar_maiores_indices(coluna)
-            paleta = paleta_maior
+        maiores = tipo_extremo == "Maiores Índices"
+        paleta = paleta_maior if maiores else paleta_menor
+        self.controller.executar_tarefa(
+            "grafico_extremos", self._criar_grafico_extremos, analisador, coluna, maiores, titulo, paleta, unidade,
+            self.controller.selected_start_date, self.controller.selected_end_date,
+            ao_concluir=lambda figuras: self._exibir_figuras(figuras, f"Não foi possível encontrar dados para os extremos de {metrica_nome}."),
+            descricao="Gerando gráfico de extremos..."
+        )
+
+    @staticmethod
+    def _criar_grafico_extremos(analisador, coluna, maiores, titulo, paleta, unidade, data_inicio, data_fim):
+        if maiores:
+            df_extremos = analisador.buscar_maiores_indices(coluna, 5, data_inicio, data_fim)
         else:
-            df_extremos = analisador.buscar_menores_indices(coluna)
-            paleta = paleta_menor
+            df_extremos = analisador.buscar_menores_indices(coluna, 5, data_inicio, data_fim)
         if df_extremos.empty:
-            messagebox.showinfo("Sem Dados", f"Não foi possível encontrar dados para os extremos de {metrica_nome}.")
-            return
+            return []
         visualizador = VisualizadorClimatico(df_extremos)
-        fig = visualizador.plotar_dias_extremos(df_extremos, coluna, titulo, paleta, unidade)
-        if fig:
-            GraphViewerWindow(self.controller, [fig])
+        return [visualizador.plotar_dias_extremos(df_extremos, coluna, titulo, paleta, unidade)]
 
     def gerar_heatmap(self):
         analisador = self.controller.get_analisador()
         if not analisador:
             messagebox.showwarning("Atenção", "Nenhum arquivo CSV carregado.")
             return
-        matriz_corr = analisador.gerar_matriz_correlacao()
+        self.controller.executar_tarefa(
+            "heatmap", self._criar_heatmap, analisador,
+            self.controller.selected_start_date, self.controller.selected_end_date,
+            ao_concluir=lambda figuras: self._exibir_figuras(figuras, "Não há dados para a correlação."),
+            descricao="Calculando correlações..."
+        )
+
+    @staticmethod
+    def _criar_heatmap(analisador, data_inicio, data_fim):
+        matriz_corr = analisador.gerar_matriz_correlacao(data_inicio, data_fim)
         visualizador = VisualizadorClimatico(None)
-        fig = visualizador.plotar_heatmap_correlacao(matriz_corr)
-        if fig:
-            GraphViewerWindow(self.controller, [fig])
+        return [visualizador.plotar_heatmap_correlacao(matriz_corr)]
 
     def gerar_histograma_temperatura(self):
         analisador = self.controller.get_analisador()
         if not analisador:
             messagebox.showwarning("Atenção", "Nenhum arquivo .CSV carregado.")
             return
+        self.controller.executar_tarefa(
+            "histograma", self._criar_histograma_temperatura, analisador,
+            ao_concluir=lambda figuras: self._exibir_figuras(figuras, "Não há dados de temperatura."),
+            descricao="Gerando histograma..."
+        )
+
+    @staticmethod
+    def _criar_histograma_temperatura(analisador):
         dados_completos = analisador.get_dados_completos()
         visualizador = VisualizadorClimatico(dados_completos)
-        fig = visualizador.plotar_distribuicao(const.COL_TEMP, 'Temperatura')
-        if fig:
-            GraphViewerWindow(self.controller, [fig])
+        return [visualizador.plotar_distribuicao(const.COL_TEMP, 'Temperatura')]
 
     def visualizar_graficos_periodo(self):
         dados_filtrados = self.controller.get_filtered_data()
         if dados_filtrados is None or dados_filtrados.empty:
             messagebox.showinfo("Sem Dados", "Não há dados no período selecionado.")
             return
-        visualizador = VisualizadorClimatico(dados_filtrados)
-        figures = visualizador.plotar_graficos()
-        if figures:
-            GraphViewerWindow(self.controller, figures)
+        self.controller.executar_tarefa(
+            "graficos_periodo", self._criar_graficos_periodo, dados_filtrados, self.controller.get_analisador(),
+            self.controller.selected_start_date, self.controller.selected_end_date,
+            ao_concluir=lambda figuras: self._exibir_figuras(figuras, "Não há dados no período selecionado."),
+            descricao="Gerando gráficos do período..."
+        )
+
+    @staticmethod
+    def _criar_graficos_periodo(dados_filtrados, analisador, data_inicio, data_fim):
+        # Ondas de calor, períodos secos etc. sombreados nos gráficos das séries
+        eventos = analisador.gerar_eventos(None, data_inicio, data_fim)
+        # Só o primeiro gráfico é criado aqui; os demais, quando forem exibidos
+        paginas = VisualizadorClimatico(dados_filtrados).fabricas_graficos(eventos=eventos)
+        paginas[0] = paginas[0]()
+        return paginas
 
 
 # --- Bloco Principal ---
@@ -0,0 +1,307 @@
+"""
+Armazém colunar em disco para arquivos maiores que a memória.
+
+Uma pasta com um arquivo .npy por coluna (a data e as medições de
+`constantes.COLUNAS_NUMERICAS`), com as linhas ordenadas pela data, e as
+estruturas auxiliares do `AnalisadorClimatico` já calculadas: as somas
+acumuladas (também .npy), a pirâmide de agregados, os esboços de quantis e os
+co-momentos mensais.
+Tudo é aberto como arrays mapeados em memória (`np.load(mmap_mode="r")`), de
+modo que abrir o armazém não lê os dados e cada consulta só toca as páginas de
+que precisa: uma busca binária nas datas, duas posições dos prefixos, os
+baldes da pirâmide e as linhas das bordas do período.
+
+O armazém é uma cópia do CSV no momento da criação:
+
+    python armazem.py dados/historico.csv dados/historico.armazem
+
+    AnalisadorClimatico("dados/historico.armazem")
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import constantes as const
+import ingestao
+from agregados import LINHAS_POR_BLOCO, IndicePrefixo, PiramideAgregados, valores_coluna
+from climatologia import Climatologia, caminho_climatologia, impressao_dados
+from covariancia import CoMomentosPorBalde
+from perfil import medir
+from quantis import EsbocosPorBalde
+
+# Versão do formato gravado; muda sempre que a estrutura do armazém mudar.
+VERSAO_ARMAZEM = 2
+ARQUIVO_META = "armazem.json"
+PASTA_PREFIXOS = "prefixos"
+ARQUIVO_PIRAMIDE = "piramide.npz"
+ARQUIVO_QUANTIS = "quantis.npz"
+ARQUIVO_COMOMENTOS = "comomentos.npz"
+
+
+def eh_armazem(caminho):
+    """Indica se o caminho é a pasta de um armazém colunar."""
+    return os.path.isfile(os.path.join(caminho, ARQUIVO_META))
+
+
+def _caminho_coluna(pasta, coluna):
+    return os.path.join(pasta, f"{coluna}.npy")
+
+
+def _chaves_ordenacao(datas):
+    """Datas como inteiros, com as ausentes (NaT) depois de todas as válidas."""
+    chaves = datas.view(np.int64).copy()
+    chaves[np.isnat(datas)] = np.iinfo(np.int64).max
+    return chaves
+
+
+def _ordem_por_data(datas, linhas_por_bloco):
+    """
+    Verifica, em blocos, se as datas já estão ordenadas (com as ausentes no
+    final). Se estiverem, retorna None; senão, a permutação que as ordena, cujo
+    cálculo precisa de 16 bytes de memória por linha.
+    """
+    anterior = np.iinfo(np.int64).min
+    for i in range(0, len(datas), linhas_por_bloco):
+        chaves = _chaves_ordenacao(datas[i:i + linhas_por_bloco])
+        if chaves[0] < anterior or (np.diff(chaves) < 0).any():
+            return np.argsort(_chaves_ordenacao(datas), kind="stable")
+        anterior = chaves[-1]
+    return None
+
+
+def _escrever_colunas(caminho_csv, pasta, limite_memoria_mb, linhas_por_bloco):
+    """
+    Converte o CSV, bloco a bloco, em um .npy por coluna, ordenado pela data.
+
+    Returns:
+        tuple: (nomes das colunas, número de linhas).
+    """
+    temporaria = tempfile.mkdtemp(prefix=".brutos_", dir=pasta)
+    try:
+        brutos, tipos, n_linhas = {}, {}, 0
+        for bloco in ingestao.ler_em_blocos(caminho_csv, limite_memoria_mb):
+            if not brutos:
+                colunas = [const.COL_DATA] + [col for col in const.COLUNAS_NUMERICAS if col in bloco.columns]
+                tipos = {col: bloco[col].to_numpy().dtype for col in colunas}
+                brutos = {col: open(os.path.join(temporaria, f"{col}.bin"), "wb") for col in colunas}
+            for coluna, arquivo in brutos.items():
+                arquivo.write(np.ascontiguousarray(bloco[coluna].to_numpy().astype(tipos[coluna])).tobytes())
+            n_linhas += len(bloco)
+        for arquivo in brutos.values():
+            arquivo.close()
+        if not brutos:
+            raise ValueError(f"O arquivo '{caminho_csv}' não tem linhas de dados.")
+
+        def bruto(coluna):
+            return np.memmap(os.path.join(temporaria, f"{coluna}.bin"), dtype=tipos[coluna], mode="r", shape=(n_linhas,))
+
+        ordem = _ordem_por_data(bruto(const.COL_DATA), linhas_por_bloco)
+        for coluna in brutos:
+            origem = bruto(coluna)
+            destino = np.lib.format.open_memmap(_caminho_coluna(pasta, coluna), mode="w+",
+                                                dtype=tipos[coluna], shape=(n_linhas,))
+            for i in range(0, n_linhas, linhas_por_bloco):
+                fatia = slice(i, i + linhas_por_bloco)
+                destino[fatia] = origem[fatia] if ordem is None else origem[ordem[fatia]]
+            destino.flush()
+            del destino, origem
+        return list(brutos), n_linhas
+    finally:
+        shutil.rmtree(temporaria, ignore_errors=True)
+
+
+def _abrir_dados(pasta, colunas):
+    """DataFrame cujas colunas são os arrays mapeados do armazém (sem cópia)."""
+    return pd.DataFrame({col: np.load(_caminho_coluna(pasta, col), mmap_mode="r") for col in colunas}, copy=False)
+
+
+def _blocos_de_meses(meses, linhas_por_bloco):
+    """Agrupa meses consecutivos em blocos de cerca de `linhas_por_bloco` linhas: (a, b, inicio, fim)."""
+    a = 0
+    while a < len(meses.linha_ini):
+        inicio = int(meses.linha_ini[a])
+        b = max(a + 1, int(np.searchsorted(meses.linha_fim, inicio + linhas_por_bloco, side="right")))
+        yield a, b, inicio, int(meses.linha_fim[b - 1])
+        a = b
+
+
+def _contar_datas_validas(datas, linhas_por_bloco):
+    return sum(int((~np.isnat(datas[i:i + linhas_por_bloco])).sum()) for i in range(0, len(datas), linhas_por_bloco))
+
+
+@medir()
+def criar_armazem(caminho_csv, pasta, limite_memoria_mb=ingestao.LIMITE_MEMORIA_PADRAO_MB,
+                  linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Cria (ou recria) um armazém colunar a partir de um CSV, sem nunca carregar o
+    arquivo inteiro: o CSV é lido em blocos (ver `ingestao.ler_em_blocos`) e as
+    estruturas auxiliares, inclusive as normais climatológicas (ver
+    `climatologia`), são calculadas percorrendo os arrays mapeados em blocos.
+
+    Só a ordenação de um CSV fora de ordem precisa de memória proporcional ao
+    número de linhas (16 bytes por linha); um CSV já ordenado pela data não.
+
+    Args:
+        caminho_csv (str): O CSV de origem.
+        pasta (str): A pasta do armazém.
+        limite_memoria_mb (float, optional): Orçamento de memória de cada bloco do CSV.
+        linhas_por_bloco (int, optional): Linhas processadas por vez nos arrays mapeados.
+
+    Returns:
+        str: O caminho da pasta do armazém.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    # Sem o arquivo de metadados, um armazém incompleto nunca é aberto
+    if os.path.exists(os.path.join(pasta, ARQUIVO_META)):
+        os.remove(os.path.join(pasta, ARQUIVO_META))
+    colunas, n_linhas = _escrever_colunas(caminho_csv, pasta, limite_memoria_mb, linhas_por_bloco)
+    dados = _abrir_dados(pasta, colunas)
+    n_linhas_validas = _contar_datas_validas(dados[const.COL_DATA].to_numpy(), linhas_por_bloco)
+
+    pasta_prefixos = os.path.join(pasta, PASTA_PREFIXOS)
+    os.makedirs(pasta_prefixos, exist_ok=True)
+
+    mapeados = []
+
+    def alocar(nome, tamanho, tipo):
+        mapeados.append(np.lib.format.open_memmap(os.path.join(pasta_prefixos, f"{nome}.npy"), mode="w+",
+                                                  dtype=tipo, shape=(tamanho,)))
+        return mapeados[-1]
+
+    prefixos = IndicePrefixo.em_blocos(dados, alocar, linhas_por_bloco)
+    for array in mapeados:
+        array.flush()
+
+    piramide = PiramideAgregados.em_blocos(dados, n_linhas_validas, linhas_por_bloco)
+    np.savez(os.path.join(pasta, ARQUIVO_PIRAMIDE), **piramide.para_arrays())
+
+    meses = piramide.niveis["mensal"]
+    quantis = {}
+    for coluna in piramide.colunas:
+        partes = [
+            EsbocosPorBalde(valores_coluna(dados.iloc[inicio:fim], coluna),
+                            meses.linha_ini[a:b] - inicio, meses.linha_fim[a:b] - inicio)
+            for a, b, inicio, fim in _blocos_de_meses(meses, linhas_por_bloco)
+        ]
+        for campo, array in EsbocosPorBalde.concatenar(partes).para_arrays().items():
+            quantis[f"{coluna}/{campo}"] = array
+    np.savez(os.path.join(pasta, ARQUIVO_QUANTIS), **quantis)
+
+    partes = [
+        CoMomentosPorBalde.de_valores(piramide.colunas,
+                                      [valores_coluna(dados.iloc[inicio:fim], coluna) for coluna in piramide.colunas],
+                                      meses.linha_ini[a:b] - inicio, meses.linha_fim[a:b] - inicio)
+        for a, b, inicio, fim in _blocos_de_meses(meses, linhas_por_bloco)
+    ]
+    if partes:
+        comomentos = CoMomentosPorBalde.concatenar(partes)
+    else:
+        comomentos = CoMomentosPorBalde.de_valores(piramide.colunas, [np.empty(0)] * len(piramide.colunas), [], [])
+    np.savez(os.path.join(pasta, ARQUIVO_COMOMENTOS), **comomentos.para_arrays())
+
+    datas = dados[const.COL_DATA].to_numpy()[:n_linhas_validas]
+    climatologia = Climatologia.de_dados(datas, dados, impressao=impressao_dados(prefixos, datas),
+                                         linhas_por_bloco=linhas_por_bloco)
+    climatologia.salvar(caminho_climatologia(pasta))
+
+    meta = {
+        "versao": VERSAO_ARMAZEM,
+        "origem": os.path.abspath(caminho_csv),
+        "colunas": colunas,
+        "n_linhas": n_linhas,
+        "n_linhas_validas": n_linhas_validas,
+        "deslocamentos": prefixos.deslocamentos,
+        "colunas_agregadas": piramide.colunas,
+    }
+    with open(os.path.join(pasta, ARQUIVO_META), "w", encoding="utf-8") as arquivo:
+        json.dump(meta, arquivo, indent=2)
+    return pasta
+
+
+class ArmazemColunar:
+    """
+    Um armazém colunar aberto: os dados são um DataFrame sobre os arrays
+    mapeados, com a mesma interface de dados da `EstacaoMeteorologica`. É
+    somente leitura; para incorporar linhas novas do CSV, recrie o armazém.
+    """
+    @medir()
+    def __init__(self, pasta):
+        """
+        Abre o armazém sem ler os dados.
+
+        Raises:
+            ValueError: Se a pasta não contém um armazém desta versão.
+        """
+        if not eh_armazem(pasta):
+            raise ValueError(f"'{pasta}' não é um armazém colunar.")
+        with open(os.path.join(pasta, ARQUIVO_META), encoding="utf-8") as arquivo:
+            self._meta = json.load(arquivo)
+        if self._meta.get("versao") != VERSAO_ARMAZEM:
+            raise ValueError(f"O armazém '{pasta}' foi gravado em outra versão; recrie-o a partir do CSV.")
+        self.pasta = pasta
+        self.caminho_origem = self._meta["origem"]
+        self.n_linhas_validas = self._meta["n_linhas_validas"]
+        self.df = _abrir_dados(pasta, self._meta["colunas"])
+
+    def get_dados(self):
+        """Retorna o DataFrame (mapeado em disco) com todas as linhas."""
+        return self.df
+
+    def anexar_novas_linhas(self):
+        """O armazém não acompanha o CSV: nunca há linhas novas (ver `EstacaoMeteorologica`)."""
+        return 0, self.n_linhas_validas
+
+    @medir()
+    def carregar_indices(self):
+        """
+        Abre as estruturas auxiliares gravadas na criação do armazém.
+
+        Returns:
+            tuple: (IndicePrefixo, PiramideAgregados, {coluna: EsbocosPorBalde},
+            CoMomentosPorBalde).
+        """
+        pasta_prefixos = os.path.join(self.pasta, PASTA_PREFIXOS)
+        deslocamentos = self._meta["deslocamentos"]
+        campos = [
+            {col: np.load(os.path.join(pasta_prefixos, f"{col}.{campo}.npy"), mmap_mode="r") for col in deslocamentos}
+            for campo in ("contagens", "somas", "somas_quadrados")
+        ]
+        prefixos = IndicePrefixo.de_arrays(deslocamentos, *campos)
+
+        colunas = self._meta["colunas_agregadas"]
+        with np.load(os.path.join(self.pasta, ARQUIVO_PIRAMIDE)) as arquivo:
+            piramide = PiramideAgregados.de_arrays(self.df, self.n_linhas_validas, dict(arquivo), colunas)
+        with np.load(os.path.join(self.pasta, ARQUIVO_QUANTIS)) as arquivo:
+            arrays = dict(arquivo)
+        quantis = {
+            coluna: EsbocosPorBalde.de_arrays({
+                campo: arrays[f"{coluna}/{campo}"]
+                for campo in ("medias", "pesos", "deslocamentos", "minimos", "maximos")
+            })
+            for coluna in colunas
+        }
+        with np.load(os.path.join(self.pasta, ARQUIVO_COMOMENTOS)) as arquivo:
+            comomentos = CoMomentosPorBalde.de_arrays(colunas, dict(arquivo))
+        return prefixos, piramide, quantis, comomentos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cria um armazém colunar (mapeado em disco) a partir de um CSV.")
+    parser.add_argument("csv", help="O CSV de origem.")
+    parser.add_argument("pasta", help="A pasta do armazém (criada ou substituída).")
+    parser.add_argument("--memoria-mb", type=float, default=ingestao.LIMITE_MEMORIA_PADRAO_MB,
+                        help="Orçamento de memória de cada bloco lido do CSV.")
+    args = parser.parse_args(argv)
+    criar_armazem(args.csv, args.pasta, args.memoria_mb)
+    print(f"Armazém criado em '{args.pasta}'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""
+Benchmarks da carga, das análises e dos gráficos sobre dados sintéticos.
+
+Cada caso roda em um subprocesso novo (sem caches em memória de casos
+anteriores), que mede o tempo de parede e o pico de memória residente (RSS);
+uma segunda execução, com `tracemalloc`, mede o pico de alocações do Python.
+Os caches em disco (o colunar e o das normais, gravados ao lado do CSV) são
+criados ou apagados na preparação de cada caso, então o resultado não depende
+dos casos que rodaram antes.
+
+`referencia.json` foi gravada com o primeiro exemplo abaixo; a máquina, as
+versões e o comando usados estão na chave "_ambiente" do arquivo. Tempos de
+máquinas diferentes não são comparáveis: para procurar regressões, grave uma
+referência local antes da mudança e compare com ela.
+
+Exemplos:
+    python benchmarks/executar.py --linhas 1e3 1e5 1e6 --salvar benchmarks/referencia.json
+    python benchmarks/executar.py --linhas 1e3 1e5 1e6 --comparar benchmarks/referencia.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from gerar_dados import FORMATOS_DATA, data_inicial, gerar_estacoes  # noqa: E402
+
+TOLERANCIA_PADRAO = 0.25
+
+
+def _preparar_caches(caminho):
+    """Garante que o cache colunar e as normais climatológicas do CSV estejam gravados."""
+    from analisador import AnalisadorClimatico
+    AnalisadorClimatico(caminho).obter_climatologia()
+
+
+def _apagar_normais(caminho):
+    from climatologia import caminho_climatologia
+    if os.path.exists(caminho_climatologia(caminho)):
+        os.remove(caminho_climatologia(caminho))
+
+
+def _preparar_analisador(caminho):
+    """O analisador, construído com os caches em disco já gravados e as normais já carregadas."""
+    from analisador import AnalisadorClimatico
+    _preparar_caches(caminho)
+    analisador = AnalisadorClimatico(caminho)
+    analisador.obter_climatologia()
+    return analisador
+
+
+def _periodo(analisador):
+    """Um período de ~metade dos dados, que não coincide com meses inteiros."""
+    import constantes as const
+    datas = analisador.get_dados_completos()[const.COL_DATA].dropna()
+    inicio, fim = datas.iloc[0], datas.iloc[-1]
+    return inicio + (fim - inicio) * 0.2 + (fim - inicio) / 1000, inicio + (fim - inicio) * 0.7
+
+
+def _caso_analisador(metodo, *args, periodo=False):
+    def preparar(caminho):
+        analisador = _preparar_analisador(caminho)
+        extras = _periodo(analisador) if periodo else ()
+        return lambda: getattr(analisador, metodo)(*args, *extras)
+    return preparar
+
+
+def _caso_visualizador(metodo):
+    def preparar(caminho):
+        from visualizador import VisualizadorClimatico
+        import constantes as const
+        analisador = _preparar_analisador(caminho)
+        inicio, fim = _periodo(analisador)
+        dados = analisador.get_dados_filtrados_para_plot(inicio, fim)
+        visualizador = VisualizadorClimatico(dados)
+        argumentos = {
+            "plotar_graficos": lambda: (),
+            "plotar_estatisticas": lambda: (analisador.gerar_estatisticas(inicio, fim)[0],),
+            "plotar_dashboard_hibrido": lambda: (analisador.gerar_estatisticas(inicio, fim)[0],),
+            "plotar_dias_extremos": lambda: (analisador.buscar_maiores_indices(const.COL_TEMP), const.COL_TEMP,
+                                             "Top 5 Dias com Maiores Índices de Temperatura", "YlOrRd", "°C"),
+            "plotar_heatmap_correlacao": lambda: (analisador.gerar_matriz_correlacao(),),
+            "plotar_distribuicao": lambda: (const.COL_TEMP, "Temperatura"),
+            "plotar_analise_mensal": lambda: (analisador.gerar_analise_mensal(inicio, fim),),
+            "plotar_janelas_moveis": lambda: (
+                analisador.gerar_janelas_moveis(const.COL_TEMP, ("24h", "7D"), ("media",), inicio, fim),
+                const.COL_TEMP, "Temperatura e Médias Móveis", "Temperatura (°C)"),
+        }[metodo]()
+        return lambda: getattr(visualizador, metodo)(*argumentos)
+    return preparar
+
+
+def _caso_carga(usar_cache, em_blocos=False, compacto=False):
+    def preparar(caminho):
+        from estacao import EstacaoMeteorologica
+        import cache_dados
+        if os.path.exists(cache_dados.caminho_cache(caminho)):
+            os.remove(cache_dados.caminho_cache(caminho))
+        if usar_cache:
+            EstacaoMeteorologica(caminho, usar_cache=True)
+        return lambda: EstacaoMeteorologica(caminho, usar_cache=usar_cache, em_blocos=em_blocos, compacto=compacto)
+    return preparar
+
+
+def _caso_construir(caminho):
+    from analisador import AnalisadorClimatico
+    _preparar_caches(caminho)
+    return lambda: AnalisadorClimatico(caminho)
+
+
+def _caso_atualizar(caminho):
+    """
+    Mede `atualizar` sobre uma cópia do CSV (ao lado dele) que recebeu o último
+    1% das linhas depois de o analisador ter sido construído.
+    """
+    import cache_dados
+    copia = os.path.splitext(caminho)[0] + "_crescente.csv"
+    with open(caminho, "rb") as arquivo:
+        conteudo = arquivo.read()
+    corte = conteudo.rfind(b"\n", 0, int(len(conteudo) * 0.99)) + 1
+    with open(copia, "wb") as arquivo:
+        arquivo.write(conteudo[:corte])
+    if os.path.exists(cache_dados.caminho_cache(copia)):
+        os.remove(cache_dados.caminho_cache(copia))
+    _apagar_normais(copia)
+    analisador = _preparar_analisador(copia)
+    with open(copia, "ab") as arquivo:
+        arquivo.write(conteudo[corte:])
+    return analisador.atualizar
+
+
+def _caso_normais(caminho):
+    from analisador import AnalisadorClimatico
+    _preparar_caches(caminho)
+    _apagar_normais(caminho)
+    analisador = AnalisadorClimatico(caminho)
+    return analisador.obter_climatologia
+
+
+# Nome do caso -> função que recebe o CSV, faz a preparação (não medida) e
+# retorna a operação a medir.
+CASOS = {
+    "estacao.carregar_csv": _caso_carga(usar_cache=False),
+    "estacao.carregar_csv_em_blocos": _caso_carga(usar_cache=False, em_blocos=True),
+    "estacao.carregar_cache": _caso_carga(usar_cache=True),
+    "estacao.carregar_cache_compacto": _caso_carga(usar_cache=True, compacto=True),
+    "analisador.construir": _caso_construir,
+    "analisador.obter_climatologia": _caso_normais,
+    "analisador.atualizar": _caso_atualizar,
+    "analisador.gerar_estatisticas": _caso_analisador("gerar_estatisticas", periodo=True),
+    "analisador.gerar_percentis": _caso_analisador("gerar_percentis", periodo=False),
+    "analisador.gerar_matriz_correlacao": _caso_analisador("gerar_matriz_correlacao"),
+    "analisador.gerar_analise_mensal": _caso_analisador("gerar_analise_mensal", periodo=True),
+    "analisador.gerar_analise_periodica": _caso_analisador("gerar_analise_periodica", "sazonal", periodo=True),
+    "analisador.gerar_resumo_inteligente": _caso_analisador("gerar_resumo_inteligente", periodo=True),
+    "analisador.buscar_maiores_indices": _caso_analisador("buscar_maiores_indices", "temperatura_c"),
+    "analisador.buscar_menores_indices": _caso_analisador("buscar_menores_indices", "temperatura_c"),
+    "analisador.buscar_extremos": _caso_analisador("buscar_extremos", None, 5, True, periodo=True),
+    "analisador.gerar_momentos": _caso_analisador("gerar_momentos", periodo=True),
+    "analisador.gerar_comomentos": _caso_analisador("gerar_comomentos", periodo=True),
+    "analisador.gerar_esboco_quantis": _caso_analisador("gerar_esboco_quantis", "temperatura_c", periodo=True),
+    "analisador.gerar_normais": _caso_analisador("gerar_normais", "dia"),
+    "analisador.gerar_anomalias": _caso_analisador("gerar_anomalias", None, periodo=True),
+    "analisador.gerar_janelas_moveis": _caso_analisador(
+        "gerar_janelas_moveis", "temperatura_c", ("24h", "7D"), ("media", "minimo", "maximo"), periodo=True),
+    "analisador.gerar_eventos": _caso_analisador("gerar_eventos", None, periodo=True),
+    "analisador.get_dados_filtrados_para_plot": _caso_analisador("get_dados_filtrados_para_plot", periodo=True),
+    "visualizador.plotar_graficos": _caso_visualizador("plotar_graficos"),
+    "visualizador.plotar_estatisticas": _caso_visualizador("plotar_estatisticas"),
+    "visualizador.plotar_dashboard_hibrido": _caso_visualizador("plotar_dashboard_hibrido"),
+    "visualizador.plotar_dias_extremos": _caso_visualizador("plotar_dias_extremos"),
+    "visualizador.plotar_heatmap_correlacao": _caso_visualizador("plotar_heatmap_correlacao"),
+    "visualizador.plotar_distribuicao": _caso_visualizador("plotar_distribuicao"),
+    "visualizador.plotar_analise_mensal": _caso_visualizador("plotar_analise_mensal"),
+    "visualizador.plotar_janelas_moveis": _caso_visualizador("plotar_janelas_moveis"),
+}
+
+
+def _rss_pico_mb():
+    # ru_maxrss é dado em KiB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def medir_no_processo(caso, caminho, com_tracemalloc):
+    """Prepara e executa um caso no processo atual e retorna as medições."""
+    import matplotlib
+    matplotlib.use("Agg")
+    operacao = CASOS[caso](caminho)
+    rss_antes = _rss_pico_mb()
+    if com_tracemalloc:
+        tracemalloc.start()
+        operacao()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {"alocacoes_pico_mb": pico / (1024 * 1024)}
+    inicio = time.perf_counter()
+    operacao()
+    tempo = time.perf_counter() - inicio
+    rss_pico = _rss_pico_mb()
+    return {"tempo_s": tempo, "rss_pico_mb": rss_pico, "rss_aumento_mb": rss_pico - rss_antes}
+
+
+def medir(caso, caminho, repeticoes=3):
+    """
+    Mede um caso em subprocessos: o menor tempo e o maior RSS de `repeticoes`
+    execuções, e o pico de alocações de uma execução com `tracemalloc`.
+    """
+    def subprocesso(*extras):
+        comando = [sys.executable, os.path.abspath(__file__), "--interno", caso, caminho, *extras]
+        saida = subprocess.run(comando, check=True, capture_output=True, text=True).stdout
+        return json.loads(saida.strip().splitlines()[-1])
+
+    execucoes = [subprocesso() for _ in range(repeticoes)]
+    resultado = {
+        "tempo_s": min(e["tempo_s"] for e in execucoes),
+        "rss_pico_mb": max(e["rss_pico_mb"] for e in execucoes),
+        "rss_aumento_mb": max(e["rss_aumento_mb"] for e in execucoes),
+    }
+    resultado.update(subprocesso("--tracemalloc"))
+    return resultado
+
+
+def _ambiente(argv):
+    """Onde e como os resultados foram medidos (gravado junto com eles)."""
+    import matplotlib
+    import numpy
+    import pandas
+    return {
+        "comando": " ".join(["python", "benchmarks/executar.py", *argv]),
+        "data": time.strftime("%Y-%m-%d"),
+        "sistema": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "matplotlib": matplotlib.__version__,
+    }
+
+
+def comparar(resultados, referencia, tolerancia=TOLERANCIA_PADRAO):
+    """
+    Compara os resultados com a referência e retorna as regressões: as medidas que
+    ficaram mais de `tolerancia` (fração) acima da referência.
+
+    Returns:
+        list: (tamanho, caso, medida, referência, atual).
+    """
+    regressoes = []
+    for tamanho, casos in resultados.items():
+        for caso, medidas in casos.items():
+            base = referencia.get(tamanho, {}).get(caso)
+            if not base:
+                continue
+            for medida in ("tempo_s", "rss_pico_mb", "alocacoes_pico_mb"):
+                if medida in base and medidas[medida] > base[medida] * (1 + tolerancia):
+                    regressoes.append((tamanho, caso, medida, base[medida], medidas[medida]))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do projeto com dados sintéticos.")
+    parser.add_argument("--linhas", type=float, nargs="+", default=[1e3, 1e5],
+                        help="Tamanhos (linhas por arquivo) a medir; aceita 1e6.")
+    parser.add_argument("--frequencia", choices=sorted(FORMATOS_DATA), default="h",
+                        help="Intervalo entre medições dos CSVs; use \"min\" para mais de ~3 milhões de linhas.")
+    parser.add_argument("--casos", nargs="+", default=sorted(CASOS), choices=sorted(CASOS), metavar="CASO")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--dados", default=os.path.join(tempfile.gettempdir(), "clima_benchmarks"),
+                        help="Pasta dos CSVs sintéticos (reaproveitados entre execuções).")
+    parser.add_argument("--salvar", help="Grava os resultados em um JSON (a referência).")
+    parser.add_argument("--comparar", help="JSON de referência para detectar regressões.")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO,
+                        help="Aumento relativo aceito antes de acusar regressão (padrão: 0.25).")
+    parser.add_argument("--interno", nargs=2, metavar=("CASO", "CSV"), help=argparse.SUPPRESS)
+    parser.add_argument("--tracemalloc", action="store_true", help=argparse.SUPPRESS)
+    argv = sys.argv[1:] if argv is None else argv
+    args = parser.parse_args(argv)
+
+    if args.interno:
+        print(json.dumps(medir_no_processo(*args.interno, args.tracemalloc)))
+        return 0
+
+    for linhas in map(int, args.linhas):
+        try:
+            data_inicial(linhas, args.frequencia)
+        except ValueError as erro:
+            parser.error(str(erro))
+
+    resultados = {}
+    for linhas in map(int, args.linhas):
+        pasta = os.path.join(args.dados, f"{linhas}_{args.frequencia}")
+        caminho = gerar_estacoes(pasta, linhas, frequencia=args.frequencia)[0]
+        resultados[str(linhas)] = {}
+        for caso in args.casos:
+            medidas = medir(caso, caminho, args.repeticoes)
+            resultados[str(linhas)][caso] = medidas
+            print(f"{linhas:>12,} {caso:<45} {medidas['tempo_s']:>10.4f} s {medidas['rss_pico_mb']:>9.1f} MB RSS "
+                  f"{medidas['alocacoes_pico_mb']:>9.1f} MB alocados", flush=True)
+
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as arquivo:
+            json.dump({"_ambiente": _ambiente(argv), **resultados}, arquivo, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            regressoes = comparar(resultados, json.load(arquivo), args.tolerancia)
+        for tamanho, caso, medida, base, atual in regressoes:
+            print(f"REGRESSÃO {tamanho} {caso} {medida}: {base:.4f} -> {atual:.4f} ({atual / base - 1:+.0%})")
+        if regressoes:
+            return 1
+        print("Nenhuma regressão acima da tolerância.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
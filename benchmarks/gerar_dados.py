@@ -0,0 +1,173 @@
+"""
+Gerador de dados climáticos sintéticos no formato de `dados/clima.csv`, para
+medir o projeto em tamanhos de produção.
+
+As datas terminam no dia de hoje e recuam o necessário para caber as linhas
+pedidas; como o projeto guarda datas em nanossegundos em alguns pontos, elas
+precisam ficar entre 1677 e 2262 (cerca de 3 milhões de linhas horárias). Para
+tamanhos maiores, use `--frequencia min` ou mais estações.
+
+Exemplo:
+    python benchmarks/gerar_dados.py --linhas 1000000 --estacoes 4 --saida /tmp/dados_sinteticos
+    python benchmarks/gerar_dados.py --linhas 1e8 --frequencia min --saida /tmp/dados_sinteticos
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+LINHAS_POR_BLOCO = 1_000_000
+CABECALHO = ["Data", "Temperatura (°C)", "Umidade (%)", "Velocidade do Vento (km/h)", "Precipitação (mm)"]
+FORMATOS_DATA = {"D": "%Y-%m-%d", "h": "%Y-%m-%d %H:%M", "min": "%Y-%m-%d %H:%M"}
+SEGUNDOS_POR_PASSO = {"D": 86_400, "h": 3_600, "min": 60}
+DATA_MINIMA = pd.Timestamp.min.ceil("D")
+DATA_MAXIMA = pd.Timestamp.max.floor("D")
+DURACAO_MEDIA_LACUNA = 24
+
+
+def _gerar_bloco(rng, datas, deslocamento_temperatura, fracao_ausentes, fracao_outliers):
+    """Gera as medições de um bloco de datas, com sazonalidade anual e ciclo diário."""
+    n = len(datas)
+    dia_do_ano = datas.dayofyear.to_numpy()
+    hora = datas.hour.to_numpy() + datas.minute.to_numpy() / 60
+    anual = np.cos(2 * np.pi * (dia_do_ano - 15) / 365.25)
+    diario = np.cos(2 * np.pi * (hora - 15) / 24)
+
+    temperatura = 24 + deslocamento_temperatura + 6 * anual + 4 * diario + rng.normal(0, 1.5, n)
+    umidade = np.clip(70 - 2.5 * (temperatura - 24) + rng.normal(0, 8, n), 5, 100)
+    vento = rng.gamma(2.0, 5.0, n) * (1 + 0.2 * anual)
+    chove = rng.random(n) < 0.08 + 0.06 * anual
+    precipitacao = np.where(chove, rng.exponential(4.0, n), 0.0)
+
+    # Valores discrepantes (picos de sensor)
+    outliers = rng.random(n) < fracao_outliers
+    temperatura[outliers] += rng.choice([-25.0, 25.0], outliers.sum())
+    vento[rng.random(n) < fracao_outliers] *= 5
+    precipitacao[rng.random(n) < fracao_outliers] += 150
+
+    medicoes = np.column_stack((temperatura, umidade, vento, precipitacao))
+    medicoes[rng.random(medicoes.shape) < fracao_ausentes] = np.nan
+    return medicoes
+
+
+def _em_segundos(data):
+    return int(pd.Timestamp(data).as_unit("s").asm8.view("i8"))
+
+
+def data_inicial(n_linhas, frequencia="h", inicio=None):
+    """
+    Escolhe a data da primeira medição: `inicio`, se informado, ou a que faz a
+    última medição cair no dia de hoje.
+
+    Args:
+        n_linhas (int): Quantidade de instantes gerados.
+        frequencia (str, optional): "D" (diária), "h" (horária) ou "min".
+        inicio (str, optional): Data da primeira medição.
+
+    Returns:
+        pd.Timestamp: A data da primeira medição.
+
+    Raises:
+        ValueError: Se as medições não couberem entre DATA_MINIMA e DATA_MAXIMA.
+    """
+    duracao = SEGUNDOS_POR_PASSO[frequencia] * (n_linhas - 1)
+    if inicio is None:
+        primeira = _em_segundos(pd.Timestamp.today().normalize()) - duracao
+    else:
+        primeira = _em_segundos(inicio)
+    if primeira < _em_segundos(DATA_MINIMA) or primeira + duracao > _em_segundos(DATA_MAXIMA):
+        raise ValueError(f"{n_linhas:,} medições com frequência {frequencia!r} não cabem entre "
+                         f"{DATA_MINIMA:%Y-%m-%d} e {DATA_MAXIMA:%Y-%m-%d}; use medições mais "
+                         f"próximas (--frequencia min) ou divida as linhas entre mais estações.")
+    return pd.Timestamp(primeira, unit="s")
+
+
+def gerar_estacao(caminho, n_linhas, inicio=None, frequencia="h", semente=0,
+                  fracao_ausentes=0.01, fracao_lacunas=0.01, fracao_outliers=0.001):
+    """
+    Escreve um CSV sintético, em blocos, sem manter o arquivo inteiro em memória.
+
+    Args:
+        caminho (str): O arquivo a escrever.
+        n_linhas (int): Quantidade de instantes gerados (antes de remover as lacunas).
+        inicio (str, optional): Data da primeira medição. Por padrão, a que
+            faz a última cair no dia de hoje.
+        frequencia (str, optional): "D" (diária), "h" (horária) ou "min".
+        semente (int, optional): Semente do gerador aleatório.
+        fracao_ausentes (float, optional): Fração de valores vazios.
+        fracao_lacunas (float, optional): Fração de instantes removidos, em
+            lacunas de ~DURACAO_MEDIA_LACUNA medições seguidas.
+        fracao_outliers (float, optional): Fração de valores discrepantes por coluna.
+
+    Returns:
+        int: Quantidade de linhas escritas.
+
+    Raises:
+        ValueError: Se as medições não couberem entre DATA_MINIMA e DATA_MAXIMA.
+    """
+    # Em segundos: um Timedelta em nanossegundos transborda depois de ~292 anos
+    primeira = data_inicial(n_linhas, frequencia, inicio).as_unit("s").asm8
+    passo = np.timedelta64(SEGUNDOS_POR_PASSO[frequencia], "s")
+    rng = np.random.default_rng(semente)
+    deslocamento_temperatura = rng.normal(0, 3)
+    escritas = 0
+    with open(caminho, "w", encoding="utf-8", newline="") as arquivo:
+        arquivo.write(",".join(CABECALHO) + "\n")
+        for ini in range(0, n_linhas, LINHAS_POR_BLOCO):
+            fim = min(ini + LINHAS_POR_BLOCO, n_linhas)
+            datas = pd.DatetimeIndex(primeira + passo * np.arange(ini, fim))
+            medicoes = _gerar_bloco(rng, datas, deslocamento_temperatura, fracao_ausentes, fracao_outliers)
+
+            mantidas = np.ones(len(datas), dtype=bool)
+            n_lacunas = rng.binomial(len(datas), fracao_lacunas / DURACAO_MEDIA_LACUNA)
+            for inicio_lacuna in rng.integers(0, len(datas), n_lacunas):
+                mantidas[inicio_lacuna:inicio_lacuna + rng.integers(1, 2 * DURACAO_MEDIA_LACUNA)] = False
+
+            bloco = pd.DataFrame(medicoes[mantidas], columns=CABECALHO[1:])
+            bloco.insert(0, CABECALHO[0], datas[mantidas].strftime(FORMATOS_DATA[frequencia]))
+            bloco.to_csv(arquivo, header=False, index=False, float_format="%.1f")
+            escritas += len(bloco)
+    return escritas
+
+
+def gerar_estacoes(pasta, n_linhas, n_estacoes=1, frequencia="h", semente=0):
+    """
+    Gera várias estações (estacao_000.csv, estacao_001.csv, ...) em uma pasta,
+    reaproveitando os arquivos que já existem.
+
+    Returns:
+        list: Os caminhos dos arquivos.
+
+    Raises:
+        ValueError: Se as medições não couberem entre DATA_MINIMA e DATA_MAXIMA.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    caminhos = []
+    for i in range(n_estacoes):
+        caminho = os.path.join(pasta, f"estacao_{i:03d}.csv")
+        if not os.path.exists(caminho):
+            gerar_estacao(caminho, n_linhas, frequencia=frequencia, semente=semente + i)
+        caminhos.append(caminho)
+    return caminhos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera CSVs climáticos sintéticos no formato de dados/clima.csv.")
+    parser.add_argument("--linhas", type=float, default=1e5, help="Linhas por estação (aceita 1e6).")
+    parser.add_argument("--estacoes", type=int, default=1)
+    parser.add_argument("--frequencia", choices=sorted(FORMATOS_DATA), default="h",
+                        help="Intervalo entre medições; use \"min\" para mais de ~3 milhões de linhas.")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", default="dados_sinteticos")
+    args = parser.parse_args(argv)
+    try:
+        caminhos = gerar_estacoes(args.saida, int(args.linhas), args.estacoes, args.frequencia, args.semente)
+    except ValueError as erro:
+        parser.error(str(erro))
+    for caminho in caminhos:
+        print(caminho)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from perfil import medir
+
+# Versão do formato gravado; muda sempre que a estrutura do arquivo de cache mudar.
+VERSAO_CACHE = 2
+SUFIXO_CACHE = ".cache.npz"
+TAMANHO_BLOCO_HASH = 1 << 20
+
+
+def caminho_cache(caminho_csv):
+    """Retorna o caminho do cache colunar que acompanha um arquivo CSV."""
+    return f"{caminho_csv}{SUFIXO_CACHE}"
+
+
+def calcular_hash(caminho, limite=None):
+    """
+    Calcula o hash BLAKE2b do conteúdo de um arquivo, lendo-o em blocos.
+
+    Args:
+        caminho (str): O caminho do arquivo.
+        limite (int, optional): Considera apenas os primeiros `limite` bytes.
+
+    Returns:
+        str: O hash em hexadecimal.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    restante = float("inf") if limite is None else limite
+    with open(caminho, "rb") as arquivo:
+        while restante > 0:
+            bloco = arquivo.read(int(min(TAMANHO_BLOCO_HASH, restante)))
+            if not bloco:
+                break
+            h.update(bloco)
+            restante -= len(bloco)
+    return h.hexdigest()
+
+
+def assinatura_arquivo(caminho, tamanho=None):
+    """
+    Retorna a assinatura (tamanho, mtime e hash do conteúdo) de um arquivo ou,
+    com `tamanho`, apenas dos seus primeiros `tamanho` bytes.
+    """
+    info = os.stat(caminho)
+    tamanho = info.st_size if tamanho is None else tamanho
+    return {
+        "tamanho": tamanho,
+        "mtime_ns": info.st_mtime_ns,
+        "hash": calcular_hash(caminho, tamanho),
+    }
+
+
+def _assinatura_confere(caminho_csv, assinatura):
+    """
+    Verifica se o CSV ainda corresponde à assinatura gravada no cache.
+
+    O tamanho precisa ser idêntico. Se o mtime também for, o cache é aceito sem
+    reler o arquivo; caso contrário (arquivo copiado ou apenas "tocado"), o hash
+    do conteúdo decide.
+    """
+    info = os.stat(caminho_csv)
+    if info.st_size != assinatura["tamanho"]:
+        return False
+    if info.st_mtime_ns == assinatura["mtime_ns"]:
+        return True
+    return calcular_hash(caminho_csv) == assinatura["hash"]
+
+
+def _prefixo_confere(caminho_csv, assinatura):
+    """
+    Verifica se o CSV começa com o conteúdo gravado na assinatura, ou seja, se
+    desde então ele apenas recebeu linhas novas no final.
+    """
+    info = os.stat(caminho_csv)
+    if info.st_size < assinatura["tamanho"]:
+        return False
+    if info.st_size == assinatura["tamanho"] and info.st_mtime_ns == assinatura["mtime_ns"]:
+        return True
+    return calcular_hash(caminho_csv, assinatura["tamanho"]) == assinatura["hash"]
+
+
+def _codificar_coluna(serie):
+    """Converte uma coluna em um array NumPy gravável sem pickle."""
+    if isinstance(serie.dtype, np.dtype) and serie.dtype.kind == "M":
+        valores = serie.to_numpy()
+        return valores.view("int64"), str(valores.dtype)
+    if pd.api.types.is_bool_dtype(serie.dtype) or pd.api.types.is_numeric_dtype(serie.dtype):
+        valores = serie.to_numpy()
+        if valores.dtype == object:
+            return None, None
+        return valores, str(valores.dtype)
+    if pd.api.types.is_string_dtype(serie.dtype) or serie.dtype == object:
+        nulos = serie.isna().to_numpy()
+        textos = serie.astype(str).to_numpy(dtype=str)
+        return np.stack([textos, np.where(nulos, "1", "0")]), "texto"
+    return None, None
+
+
+def _decodificar_coluna(valores, tipo):
+    """Operação inversa de `_codificar_coluna`."""
+    if tipo.startswith("datetime64"):
+        return pd.Series(valores.view(tipo))
+    if tipo == "texto":
+        textos, nulos = valores
+        return pd.Series(textos, dtype=object).mask(nulos == "1")
+    return pd.Series(valores)
+
+
+@medir()
+def salvar_cache(caminho_csv, df, assinatura, variante="padrao"):
+    """
+    Grava uma cópia colunar binária (.npz) do DataFrame normalizado ao lado do CSV.
+
+    A gravação é atômica (arquivo temporário + rename) e silenciosa em caso de
+    falha: o cache é apenas uma otimização.
+
+    Args:
+        caminho_csv (str): O caminho do CSV de origem.
+        df (pd.DataFrame): O DataFrame já normalizado.
+        assinatura (dict): A assinatura do CSV obtida antes da leitura.
+        variante (str, optional): Identifica o modo de leitura que gerou o DataFrame.
+
+    Returns:
+        bool: True se o cache foi gravado.
+    """
+    arrays = {}
+    tipos = []
+    for i, coluna in enumerate(df.columns):
+        valores, tipo = _codificar_coluna(df[coluna])
+        if valores is None:
+            return False
+        arrays[f"col_{i}"] = valores
+        tipos.append(tipo)
+
+    meta = {
+        "versao": VERSAO_CACHE,
+        "colunas": list(df.columns),
+        "tipos": tipos,
+        "assinatura": assinatura,
+        "variante": variante,
+    }
+    destino = caminho_cache(caminho_csv)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    try:
+        with open(temporario, "wb") as arquivo:
+            np.savez(arquivo, __meta__=np.array(json.dumps(meta)), **arrays)
+        os.replace(temporario, destino)
+    except OSError:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return False
+    return True
+
+
+def _ler_cache(caminho_csv, variante, conferir):
+    """Lê o cache se ele existir, for desta versão e variante e `conferir` aceitar a assinatura."""
+    destino = caminho_cache(caminho_csv)
+    if not os.path.exists(destino):
+        return None, None
+    try:
+        with np.load(destino, allow_pickle=False) as arquivo:
+            meta = json.loads(str(arquivo["__meta__"]))
+            if meta.get("versao") != VERSAO_CACHE or meta.get("variante") != variante:
+                return None, None
+            if not conferir(caminho_csv, meta["assinatura"]):
+                return None, None
+            colunas = {
+                nome: _decodificar_coluna(arquivo[f"col_{i}"], tipo)
+                for i, (nome, tipo) in enumerate(zip(meta["colunas"], meta["tipos"]))
+            }
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None, None
+    return pd.DataFrame(colunas), meta
+
+
+@medir()
+def carregar_cache(caminho_csv, variante="padrao"):
+    """
+    Carrega o DataFrame do cache colunar, se ele existir e ainda for válido.
+
+    Args:
+        caminho_csv (str): O caminho do CSV de origem.
+        variante (str, optional): O modo de leitura esperado.
+
+    Returns:
+        pd.DataFrame | None: O DataFrame em cache ou None se não houver cache válido.
+    """
+    df, _ = _ler_cache(caminho_csv, variante, _assinatura_confere)
+    return df
+
+
+@medir()
+def carregar_cache_prefixo(caminho_csv, variante="padrao"):
+    """
+    Como `carregar_cache`, mas aceita também um CSV que cresceu desde a gravação
+    do cache (o início do arquivo continua idêntico): as linhas acrescentadas
+    podem então ser lidas a partir do byte indicado.
+
+    Returns:
+        tuple: (DataFrame em cache, bytes do CSV cobertos por ele) ou (None, 0).
+    """
+    df, meta = _ler_cache(caminho_csv, variante, _prefixo_confere)
+    if df is None:
+        return None, 0
+    return df, meta["assinatura"]["tamanho"]
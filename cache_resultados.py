@@ -0,0 +1,170 @@
+import datetime
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CAPACIDADE_PADRAO = 128
+
+
+class CacheLRU:
+    """
+    Cache limitado que descarta o item usado há mais tempo quando fica cheio,
+    com contadores de acertos e falhas. Pode ser usado por várias threads.
+
+    A geração conta as limpezas: um resultado calculado a partir de dados que
+    mudaram no meio do cálculo (e por isso levaram a uma limpeza) é recusado
+    por `guardar`, em vez de voltar ao cache depois dela.
+    """
+    def __init__(self, capacidade=CAPACIDADE_PADRAO):
+        """
+        Args:
+            capacidade (int, optional): Número máximo de resultados guardados.
+        """
+        self.capacidade = capacidade
+        self._itens = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+        self.geracao = 0
+        self._trava = threading.Lock()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def obter(self, chave):
+        """
+        Procura um resultado no cache, contabilizando acerto ou falha.
+
+        Returns:
+            tuple: (encontrado, valor).
+        """
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return True, self._itens[chave]
+            self.falhas += 1
+            return False, None
+
+    def guardar(self, chave, valor, geracao=None):
+        """
+        Guarda um resultado, descartando o mais antigo se a capacidade for excedida.
+
+        Args:
+            chave: A chave do resultado.
+            valor: O resultado.
+            geracao (int, optional): A `geracao` lida antes de o resultado ser
+                calculado; se o cache foi limpo desde então, nada é guardado.
+        """
+        with self._trava:
+            if geracao is not None and geracao != self.geracao:
+                return
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        """Descarta todos os resultados guardados (os contadores são mantidos) e avança a geração."""
+        with self._trava:
+            self._itens.clear()
+            self.geracao += 1
+
+    def estatisticas(self):
+        """Retorna o tamanho atual e os contadores de acertos e falhas."""
+        return {
+            "itens": len(self._itens),
+            "capacidade": self.capacidade,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+        }
+
+
+def normalizar_argumento(valor, nome=""):
+    """
+    Converte um argumento em uma chave de cache estável: datas de qualquer tipo
+    (inclusive texto, nos parâmetros `data_*`) viram o mesmo inteiro em
+    microssegundos e listas, arrays, índices e séries viram tuplas.
+    """
+    if nome.startswith("data_") and isinstance(valor, str):
+        valor = pd.Timestamp(valor)
+    if isinstance(valor, (pd.Timestamp, datetime.datetime, datetime.date, np.datetime64)):
+        data = pd.Timestamp(valor)
+        # Em microssegundos, que representam datas além de 2262 (o limite em nanossegundos)
+        return ("data", None) if pd.isna(data) else ("data", int(data.as_unit("us").asm8.view("i8")))
+    if isinstance(valor, (np.ndarray, pd.Index, pd.Series)):
+        valor = np.asarray(valor).tolist()
+    if isinstance(valor, (list, tuple)):
+        return tuple(normalizar_argumento(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, normalizar_argumento(v)) for k, v in valor.items()))
+    return valor
+
+
+def copia_na_escrita_ativa():
+    """Indica se o pandas usa Copy-on-Write (sempre, a partir do pandas 3)."""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.get_option("mode.copy_on_write") is True
+
+
+def copia_segura(dados):
+    """
+    Devolve uma cópia de um DataFrame ou Series que pode ser modificada sem
+    alterar o original. Com Copy-on-Write a cópia é rasa (os dados só são
+    duplicados se forem modificados); sem ele, é uma cópia completa.
+    """
+    return dados.copy(deep=not copia_na_escrita_ativa())
+
+
+def copiar_resultado(valor):
+    """
+    Devolve uma cópia de um resultado, para que alterações feitas por quem o
+    recebe não contaminem o cache (ver `copia_segura`).
+    """
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return copia_segura(valor)
+    if isinstance(valor, dict):
+        return dict(valor)
+    if isinstance(valor, tuple):
+        return tuple(copiar_resultado(v) for v in valor)
+    return valor
+
+
+def memorizar(metodo):
+    """
+    Decorador que guarda o resultado de um método no `CacheLRU` do objeto
+    (atributo `_cache_resultados`), usando como chave o nome do método e os
+    argumentos normalizados (inclusive os valores padrão).
+
+    A geração do cache é lida antes do cálculo: se o objeto limpar o cache
+    enquanto o método roda (porque os dados mudaram), o resultado é devolvido
+    mas não guardado.
+    """
+    assinatura = inspect.signature(metodo)
+
+    @functools.wraps(metodo)
+    def envoltorio(self, *args, **kwargs):
+        argumentos = assinatura.bind(self, *args, **kwargs)
+        argumentos.apply_defaults()
+        chave = (metodo.__name__,) + tuple(
+            (nome, normalizar_argumento(valor, nome))
+            for nome, valor in list(argumentos.arguments.items())[1:]
+        )
+        try:
+            hash(chave)
+        except TypeError:
+            # Argumento sem forma estável de chave: calcula sem passar pelo cache
+            return metodo(self, *args, **kwargs)
+        cache = self._cache_resultados
+        geracao = cache.geracao
+        encontrado, valor = cache.obter(chave)
+        if not encontrado:
+            valor = metodo(self, *args, **kwargs)
+            cache.guardar(chave, valor, geracao)
+        return copiar_resultado(valor)
+
+    return envoltorio
@@ -0,0 +1,396 @@
+"""
+Normais climatológicas de uma estação: para cada dia do ano e para cada mês, a
+média, o desvio padrão e uma faixa de percentis de cada medição, calculados uma
+única vez sobre todos os dados e gravados em disco (ao lado do CSV ou dentro do
+armazém colunar).
+
+Com as normais prontas, a anomalia (valor - normal) e o z-score ((valor -
+normal) / desvio) de qualquer linha saem de uma consulta vetorizada pelo dia
+do ano da sua data.
+
+Os dias do ano seguem o calendário de um ano bissexto (29/02 é o dia 60 e 01/03
+é sempre o dia 61), para que a mesma data caia no mesmo dia em todos os anos.
+Como cada dia do ano reúne poucas amostras (uma por ano e hora), as normais
+diárias são suavizadas com uma média móvel circular de `JANELA_SUAVIZACAO_DIAS`
+dias.
+"""
+import json
+import os
+import zipfile
+
+import numpy as np
+
+from agregados import LINHAS_POR_BLOCO, valores_coluna
+from perfil import medir
+import constantes as const
+
+VERSAO_CLIMATOLOGIA = 1
+SUFIXO_CLIMATOLOGIA = ".climatologia.npz"
+ARQUIVO_CLIMATOLOGIA = "climatologia.npz"
+PERCENTIS_NORMAIS = (10, 50, 90)
+JANELA_SUAVIZACAO_DIAS = 15
+# Base -> quantidade de grupos
+BASES = {"dia": 366, "mes": 12}
+# Fração de linhas acrescentadas (em relação às usadas no cálculo) até a qual as
+# normais continuam valendo, sem recálculo, para dados que só cresceram
+FRACAO_RECALCULO = 0.05
+
+
+def caminho_climatologia(caminho_dados):
+    """O arquivo das normais: ao lado do CSV ou dentro da pasta do armazém colunar."""
+    if os.path.isdir(caminho_dados):
+        return os.path.join(caminho_dados, ARQUIVO_CLIMATOLOGIA)
+    return f"{caminho_dados}{SUFIXO_CLIMATOLOGIA}"
+
+
+def indices_dia_do_ano(datas):
+    """
+    O dia do ano (0 a 365, no calendário de um ano bissexto) de cada data.
+
+    Args:
+        datas (np.ndarray): Datas datetime64, sem NaT.
+    """
+    dias = datas.astype("datetime64[D]")
+    anos = datas.astype("datetime64[Y]")
+    dia = (dias - anos.astype("datetime64[D]")).astype(np.int64)
+    ano = anos.astype(np.int64) + 1970
+    bissexto = (ano % 4 == 0) & ((ano % 100 != 0) | (ano % 400 == 0))
+    # Nos anos comuns, a partir de 01/03 (dia 59) pula-se o 29/02
+    return np.where(~bissexto & (dia >= 59), dia + 1, dia)
+
+
+def indices_mes(datas):
+    """O mês (0 a 11) de cada data."""
+    return datas.astype("datetime64[M]").astype(np.int64) % 12
+
+
+def _inicios_grupos(primeiro_ano, n_anos, base):
+    """
+    A data de início de cada grupo em cada ano: (n_anos, n_grupos + 1) datas
+    datetime64[D], em que a última coluna é o início do ano seguinte. Nos anos
+    comuns, o grupo do 29/02 começa e termina em 01/03 (fica vazio).
+    """
+    anos = np.arange(primeiro_ano, primeiro_ano + n_anos)
+    if base == "mes":
+        return ((anos[:, None] - 1970) * 12 + np.arange(13)).astype("datetime64[M]").astype("datetime64[D]")
+    inicio_ano = (anos - 1970).astype("datetime64[Y]").astype("datetime64[D]")
+    bissexto = (anos % 4 == 0) & ((anos % 100 != 0) | (anos % 400 == 0))
+    grupos = np.arange(BASES["dia"] + 1)
+    return inicio_ano[:, None] + np.where(~bissexto[:, None] & (grupos >= 60), grupos - 1, grupos)
+
+
+def _faixas_de_grupos(contagens, limite):
+    """Divide os grupos em faixas consecutivas [g0, g1) de até `limite` linhas (ao menos um grupo cada)."""
+    faixas, g0, acumulado = [], 0, 0
+    for g, contagem in enumerate(contagens):
+        if g > g0 and acumulado + contagem > limite:
+            faixas.append((g0, g))
+            g0, acumulado = g, 0
+        acumulado += contagem
+    faixas.append((g0, len(contagens)))
+    return faixas
+
+
+def _juntar_trechos(inicios, fins):
+    """Os trechos [inicio, fim) não vazios, com os adjacentes unidos em um só."""
+    trechos = []
+    for inicio, fim in zip(inicios.tolist(), fins.tolist()):
+        if fim <= inicio:
+            continue
+        if trechos and trechos[-1][1] == inicio:
+            trechos[-1] = (trechos[-1][0], fim)
+        else:
+            trechos.append((inicio, fim))
+    return trechos
+
+
+def _media_circular(valores, janela):
+    """Média móvel centrada e circular (o fim do ano encosta no começo), ignorando NaN."""
+    meia = janela // 2
+    estendidos = np.concatenate((valores[-meia:], valores, valores[:meia]))
+    validos = ~np.isnan(estendidos)
+    somas = np.concatenate(([0.0], np.cumsum(np.where(validos, estendidos, 0.0))))
+    contagens = np.concatenate(([0], np.cumsum(validos)))
+    n = len(valores)
+    with np.errstate(invalid="ignore"):
+        return (somas[janela:janela + n] - somas[:n]) / (contagens[janela:janela + n] - contagens[:n])
+
+
+def _percentis_por_grupo(valores, grupos, n_grupos, percentis):
+    """
+    Percentis (interpolação linear, como `np.percentile`) dos valores de cada
+    grupo.
+
+    Args:
+        valores (np.ndarray): Os valores, sem NaN.
+        grupos (np.ndarray): O grupo de cada valor (inteiros pequenos).
+
+    Returns:
+        np.ndarray: (n_grupos, len(percentis)), NaN nos grupos vazios.
+    """
+    # Ordenação estável pelo grupo (radix, em int16), e em cada grupo uma seleção
+    # parcial em vez da ordenação completa dos valores
+    valores = valores[np.argsort(grupos.astype(np.int16), kind="stable")]
+    limites = np.concatenate(([0], np.cumsum(np.bincount(grupos, minlength=n_grupos))))
+    resultado = np.full((n_grupos, len(percentis)), np.nan)
+    for grupo in np.flatnonzero(np.diff(limites)):
+        resultado[grupo] = np.percentile(valores[limites[grupo]:limites[grupo + 1]], percentis)
+    return resultado
+
+
+def _normal(base, contagem, soma, quadrados, percentis, deslocamento):
+    """As estatísticas de cada grupo a partir das somas (centradas em `deslocamento`) e dos percentis."""
+    if base == "dia":
+        # Somas suavizadas (não médias de médias): cada dia pesa pelo que tem de dados
+        janela = JANELA_SUAVIZACAO_DIAS
+        contagem, soma, quadrados = (_media_circular(x, janela) * janela for x in (contagem, soma, quadrados))
+        percentis = np.column_stack([_media_circular(p, janela) for p in percentis.T])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = soma / contagem
+        variancia = (quadrados - soma * media) / (contagem - 1)
+    normal = {
+        "contagem": contagem,
+        "media": np.where(contagem > 0, media + deslocamento, np.nan),
+        "desvio_padrao": np.where(contagem > 1, np.sqrt(np.maximum(variancia, 0.0)), np.nan),
+    }
+    for percentil, valores_percentil in zip(PERCENTIS_NORMAIS, percentis.T):
+        normal[f"p{percentil}"] = valores_percentil
+    return normal
+
+
+class Climatologia:
+    """
+    As normais de cada coluna por dia do ano ("dia") e por mês ("mes"): em
+    `normais[base][coluna]`, arrays com a contagem, a média, o desvio padrão e
+    os percentis de `PERCENTIS_NORMAIS` ("p10", "p50", ...) de cada grupo.
+    """
+    def __init__(self, normais, impressao=None):
+        self.normais = normais
+        self.impressao = impressao
+
+    @property
+    def colunas(self):
+        return list(self.normais["mes"])
+
+    @classmethod
+    @medir()
+    def de_dados(cls, datas, dados, colunas=None, impressao=None, linhas_por_bloco=LINHAS_POR_BLOCO):
+        """
+        Calcula as normais.
+
+        Como os dados estão ordenados pela data, as linhas de um grupo (um dia do
+        ano ou um mês) formam um trecho contíguo em cada ano, localizado por busca
+        binária. Os grupos são processados em faixas de até `linhas_por_bloco`
+        linhas e só as linhas de uma faixa ficam em memória por vez, de modo que
+        os dados podem ser arrays mapeados em disco (ver `armazem.criar_armazem`).
+
+        Args:
+            datas (np.ndarray): As datas válidas (sem NaT), das primeiras linhas de `dados`.
+            dados (pd.DataFrame): Os dados da estação.
+            colunas (list, optional): As colunas. Padrão são as colunas numéricas presentes.
+            impressao (dict, optional): Identifica os dados de origem (ver `impressao_dados`).
+            linhas_por_bloco (int, optional): Quantas linhas são lidas por vez.
+        """
+        if colunas is None:
+            colunas = [col for col in const.COLUNAS_NUMERICAS if col in dados.columns]
+        n_validas = len(datas)
+        # Deslocamento pela média, para a soma dos quadrados não perder precisão
+        deslocamentos = {}
+        for coluna in colunas:
+            soma, contagem = 0.0, 0
+            for i in range(0, n_validas, linhas_por_bloco):
+                valores = valores_coluna(dados.iloc[i:min(i + linhas_por_bloco, n_validas)], coluna)
+                validos = ~np.isnan(valores)
+                soma += float(valores[validos].sum())
+                contagem += int(validos.sum())
+            deslocamentos[coluna] = soma / contagem if contagem else 0.0
+        primeiro_ano, n_anos = 1970, 0
+        if n_validas:
+            primeiro_ano = int(datas[0].astype("datetime64[Y]").astype(np.int64)) + 1970
+            n_anos = int(datas[-1].astype("datetime64[Y]").astype(np.int64)) + 1971 - primeiro_ano
+
+        normais = {base: {} for base in BASES}
+        for base, n_grupos in BASES.items():
+            limites = np.searchsorted(datas, _inicios_grupos(primeiro_ano, n_anos, base).astype(datas.dtype))
+            tamanhos = np.diff(limites, axis=1)
+            somas = {
+                coluna: (np.zeros(n_grupos), np.zeros(n_grupos), np.zeros(n_grupos),
+                         np.full((n_grupos, len(PERCENTIS_NORMAIS)), np.nan))
+                for coluna in colunas
+            }
+            for g0, g1 in _faixas_de_grupos(tamanhos.sum(axis=0), linhas_por_bloco):
+                trechos = _juntar_trechos(limites[:, g0], limites[:, g1])
+                # O grupo (relativo a g0) de cada linha dos trechos, ano a ano
+                rotulos = np.repeat(np.tile(np.arange(g1 - g0, dtype=np.int16), n_anos), tamanhos[:, g0:g1].ravel())
+                for coluna in colunas:
+                    array = dados[coluna].array
+                    valores = np.concatenate(
+                        [array[a:b].to_numpy(dtype="float64", na_value=np.nan) for a, b in trechos] or [[]]
+                    )
+                    validos = ~np.isnan(valores)
+                    valores, grupos = valores[validos], rotulos[validos]
+                    contagem, soma, quadrados, percentis = somas[coluna]
+                    centrados = valores - deslocamentos[coluna]
+                    contagem[g0:g1] = np.bincount(grupos, minlength=g1 - g0)
+                    soma[g0:g1] = np.bincount(grupos, weights=centrados, minlength=g1 - g0)
+                    quadrados[g0:g1] = np.bincount(grupos, weights=centrados * centrados, minlength=g1 - g0)
+                    percentis[g0:g1] = _percentis_por_grupo(valores, grupos, g1 - g0, PERCENTIS_NORMAIS)
+            for coluna in colunas:
+                normais[base][coluna] = _normal(base, *somas[coluna], deslocamentos[coluna])
+        return cls(normais, impressao)
+
+    def normal(self, coluna, datas, estatistica="media"):
+        """
+        A normal de cada data: a do dia do ano ou, onde ela não existir (dias sem
+        dados na série), a do mês.
+
+        Args:
+            coluna (str): A coluna.
+            datas (np.ndarray): Datas datetime64, sem NaT.
+            estatistica (str, optional): "media", "desvio_padrao", "p10", "p50", ...
+        """
+        valores = self.normais["dia"][coluna][estatistica][indices_dia_do_ano(datas)]
+        faltando = np.isnan(valores)
+        if faltando.any():
+            valores[faltando] = self.normais["mes"][coluna][estatistica][indices_mes(datas[faltando])]
+        return valores
+
+    def anomalias(self, coluna, datas, valores):
+        """
+        As anomalias e os z-scores de cada valor em relação à normal da sua data.
+
+        Returns:
+            tuple: (anomalias, z-scores), arrays float64.
+        """
+        anomalia = np.asarray(valores, dtype=np.float64) - self.normal(coluna, datas)
+        desvio = self.normal(coluna, datas, "desvio_padrao")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            zscore = np.where(desvio > 0, anomalia / desvio, np.nan)
+        return anomalia, zscore
+
+    def media_normal(self, coluna, datas, valores):
+        """
+        A média que seria esperada para as mesmas linhas (as que têm valor) se
+        cada uma seguisse a normal da sua data: a referência sazonal de um período.
+        """
+        validos = ~np.isnan(np.asarray(valores, dtype=np.float64))
+        if not validos.any():
+            return np.nan
+        return float(np.nanmean(self.normal(coluna, datas[validos])))
+
+    def salvar(self, caminho):
+        """
+        Grava as normais (.npz, sem pickle) de forma atômica e silenciosa em caso
+        de falha, como o cache colunar: são apenas uma otimização.
+
+        Returns:
+            bool: True se o arquivo foi gravado.
+        """
+        arrays = {
+            f"{base}__{i}__{nome}": valores
+            for base, por_coluna in self.normais.items()
+            for i, normal in enumerate(por_coluna.values())
+            for nome, valores in normal.items()
+        }
+        meta = {
+            "versao": VERSAO_CLIMATOLOGIA,
+            "colunas": self.colunas,
+            "percentis": list(PERCENTIS_NORMAIS),
+            "janela_suavizacao": JANELA_SUAVIZACAO_DIAS,
+            "impressao": self.impressao,
+        }
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        try:
+            with open(temporario, "wb") as arquivo:
+                np.savez(arquivo, __meta__=np.array(json.dumps(meta)), **arrays)
+            os.replace(temporario, caminho)
+        except OSError:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            return False
+        return True
+
+    @classmethod
+    def carregar(cls, caminho, impressao=None):
+        """
+        Lê as normais gravadas, se existirem, forem desta versão e parâmetros e
+        (com `impressao`) vierem dos mesmos dados.
+
+        Returns:
+            Climatologia | None: As normais ou None se for preciso recalculá-las.
+        """
+        if not os.path.exists(caminho):
+            return None
+        try:
+            with np.load(caminho, allow_pickle=False) as arquivo:
+                meta = json.loads(str(arquivo["__meta__"]))
+                if (meta.get("versao") != VERSAO_CLIMATOLOGIA
+                        or meta.get("percentis") != list(PERCENTIS_NORMAIS)
+                        or meta.get("janela_suavizacao") != JANELA_SUAVIZACAO_DIAS):
+                    return None
+                if impressao is not None and meta.get("impressao") != impressao:
+                    return None
+                nomes = ["contagem", "media", "desvio_padrao"] + [f"p{p}" for p in PERCENTIS_NORMAIS]
+                normais = {
+                    base: {
+                        coluna: {nome: arquivo[f"{base}__{i}__{nome}"] for nome in nomes}
+                        for i, coluna in enumerate(meta["colunas"])
+                    }
+                    for base in BASES
+                }
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+        return cls(normais, meta.get("impressao"))
+
+
+def impressao_dados(prefixos, datas):
+    """
+    Identifica as linhas com data válida de um conjunto de dados (as que entram
+    nas normais) sem relê-las: quantidade, primeira e última data e, das somas
+    acumuladas já calculadas (`agregados.IndicePrefixo`), a contagem e a soma de
+    cada coluna. Qualquer mudança nessas linhas muda a impressão.
+    """
+    n = len(datas)
+    return {
+        "validas": int(n),
+        "primeira": int(datas[0].astype("datetime64[ns]").astype(np.int64)) if n else None,
+        "ultima": int(datas[-1].astype("datetime64[ns]").astype(np.int64)) if n else None,
+        "colunas": {
+            coluna: [prefixos.contagem(coluna, 0, n), float(prefixos.soma(coluna, 0, n))]
+            for coluna in prefixos.colunas
+        },
+    }
+
+
+def normais_aproveitaveis(impressao, prefixos, datas, fracao=FRACAO_RECALCULO):
+    """
+    Indica se as normais calculadas sobre os dados identificados por `impressao`
+    servem para os dados atuais: os mesmos dados ou eles com linhas acrescentadas
+    depois da última data, em número de até `fracao` das usadas no cálculo. Em
+    séries longas, algumas semanas a mais quase não mudam as normais, então elas
+    não são recalculadas a cada atualização.
+
+    Args:
+        impressao (dict): A impressão gravada com as normais (ver `impressao_dados`).
+        prefixos (agregados.IndicePrefixo): As somas acumuladas dos dados atuais.
+        datas (np.ndarray): As datas válidas dos dados atuais.
+        fracao (float, optional): Crescimento tolerado.
+    """
+    try:
+        n = int(impressao["validas"])
+        colunas = impressao["colunas"]
+    except (KeyError, TypeError, ValueError):
+        return False
+    if n > len(datas) or len(datas) - n > fracao * n:
+        return False
+    atual = impressao_dados(prefixos, datas[:n])
+    if (atual["primeira"], atual["ultima"]) != (impressao.get("primeira"), impressao.get("ultima")):
+        return False
+    if set(atual["colunas"]) != set(colunas):
+        return False
+    # As somas acumuladas de dados iguais podem diferir no arredondamento (outro deslocamento)
+    for coluna, (contagem, soma) in atual["colunas"].items():
+        contagem_normais, soma_normais = colunas[coluna]
+        if contagem != contagem_normais or not np.isclose(soma, soma_normais, rtol=1e-9, atol=1e-6 * max(contagem, 1)):
+            return False
+    return True
@@ -0,0 +1,281 @@
+"""
+Representações compactas dos dados de uma estação e o relatório de memória por
+coluna.
+
+Há dois níveis de compactação:
+
+* `compactar_dataframe`: continua sendo um DataFrame comum, usado por todo o
+  projeto (`EstacaoMeteorologica(caminho, compacto=True)`), com as medições em
+  float32 e a precipitação, quando é quase toda zero, em uma coluna esparsa.
+* `TabelaCompacta`: o formato mais denso, para manter muitas estações em
+  memória; as medições são inteiros de 16 bits em escala fixa (quando isso não
+  perde resolução), colunas quase todas zero guardam apenas os valores não
+  nulos e um eixo de tempo regular, sem lacunas, é guardado só como início e
+  passo. As colunas são reconstruídas sob demanda (`coluna`, `para_dataframe`).
+"""
+import numpy as np
+import pandas as pd
+
+import constantes as const
+
+# Resolução de cada medição guardada como int16 (valor = inteiro * escala)
+ESCALAS_INT16 = {
+    const.COL_TEMP: 0.1,
+    const.COL_UMIDADE: 0.1,
+    const.COL_VENTO: 0.1,
+    const.COL_PRECIP: 0.1,
+}
+# Valor int16 reservado para medições ausentes
+AUSENTE_INT16 = np.iinfo(np.int16).min
+# A partir desta fração de zeros, uma coluna guarda apenas os valores não nulos
+FRACAO_MINIMA_ZEROS = 0.5
+
+
+def _fracao_zeros(valores):
+    return float(np.count_nonzero(valores == 0)) / len(valores) if len(valores) else 0.0
+
+
+def compactar_dataframe(df):
+    """
+    Converte as medições para float32 e a precipitação, se for quase toda zero,
+    para uma coluna esparsa (`pd.SparseDtype`); as demais colunas e a ordem das
+    linhas são mantidas.
+
+    Args:
+        df (pd.DataFrame): Os dados normalizados de uma estação.
+
+    Returns:
+        pd.DataFrame: Os mesmos dados, em tipos menores.
+    """
+    tipos = {col: tipo for col, tipo in const.TIPOS_COLUNAS.items() if col in df.columns}
+    df = df.astype(tipos)
+    if const.COL_PRECIP in df.columns and not isinstance(df[const.COL_PRECIP].dtype, pd.SparseDtype):
+        if _fracao_zeros(df[const.COL_PRECIP].to_numpy()) >= FRACAO_MINIMA_ZEROS:
+            df[const.COL_PRECIP] = df[const.COL_PRECIP].astype(pd.SparseDtype("float32", 0.0))
+    return df
+
+
+class _EixoTempo:
+    """
+    As datas das linhas: apenas início e passo quando são regulares, sem lacunas;
+    senão, deslocamentos inteiros a partir da primeira data, em múltiplos do maior
+    passo comum (int32 quando cabem). Datas ausentes só são aceitas no final, como
+    os dados ficam depois de ordenados; nos demais casos as datas ficam como estão.
+    """
+    def __init__(self, datas):
+        self.tipo = datas.dtype
+        self.n = len(datas)
+        nulas = np.isnat(datas)
+        self.n_validas = self.n - int(nulas.sum())
+        self.inicio, self.passo, self.deslocamentos = 0, 1, None
+        inteiros = datas.view(np.int64)[:self.n_validas]
+        if nulas[:self.n_validas].any():
+            self.n_validas = self.n
+            self.deslocamentos = datas.view(np.int64).copy()
+            return
+        if self.n_validas == 0:
+            return
+        self.inicio = int(inteiros[0])
+        diferencas = np.diff(inteiros)
+        if self.n_validas == 1 or (diferencas[0] > 0 and (diferencas == diferencas[0]).all()):
+            self.passo = int(diferencas[0]) if self.n_validas > 1 else 1
+            return
+        self.passo = int(np.gcd.reduce(diferencas)) or 1
+        deslocamentos = (inteiros - self.inicio) // self.passo
+        if deslocamentos.min() >= 0 and deslocamentos.max() <= np.iinfo(np.int32).max:
+            self.deslocamentos = deslocamentos.astype(np.int32)
+        else:
+            self.inicio, self.passo, self.deslocamentos = 0, 1, inteiros.copy()
+
+    @property
+    def regular(self):
+        return self.deslocamentos is None
+
+    @property
+    def nbytes(self):
+        return 0 if self.regular else self.deslocamentos.nbytes
+
+    def formato(self):
+        if self.regular:
+            passo = pd.Timedelta(self.passo, unit=np.datetime_data(self.tipo)[0])
+            return f"regular (a cada {passo})"
+        if self.deslocamentos.dtype == np.int32:
+            return "deslocamentos int32"
+        return str(self.tipo)
+
+    def datas(self):
+        if self.regular:
+            inteiros = self.inicio + self.passo * np.arange(self.n_validas, dtype=np.int64)
+        else:
+            inteiros = self.inicio + self.passo * self.deslocamentos.astype(np.int64)
+        datas = np.full(self.n, np.datetime64("NaT"), dtype=self.tipo)
+        datas[:self.n_validas] = inteiros.view(self.tipo)
+        return datas
+
+
+class _ColunaCompacta:
+    """
+    Uma medição: int16 em escala fixa quando não perde resolução (senão float32),
+    e, se a coluna é quase toda zero, apenas as posições e os valores não nulos.
+    """
+    def __init__(self, valores, escala=None):
+        self.n = len(valores)
+        self.indices = None
+        if self.n and _fracao_zeros(valores) >= FRACAO_MINIMA_ZEROS:
+            self.indices = np.flatnonzero(valores != 0).astype(np.int32)
+            valores = valores[self.indices]
+        self.escala = None
+        if escala is not None:
+            nulos = np.isnan(valores)
+            inteiros = np.round(np.where(nulos, 0.0, valores) / escala)
+            sem_perda = np.abs(inteiros * escala - np.where(nulos, 0.0, valores)) <= escala * 1e-3
+            if sem_perda.all() and (np.abs(inteiros) <= np.iinfo(np.int16).max).all():
+                self.escala = escala
+                self.valores = np.where(nulos, AUSENTE_INT16, inteiros).astype(np.int16)
+                return
+        self.valores = valores.astype(np.float32)
+
+    @property
+    def nbytes(self):
+        return self.valores.nbytes + (0 if self.indices is None else self.indices.nbytes)
+
+    def formato(self):
+        formato = f"int16 x {self.escala:g}" if self.escala is not None else "float32"
+        if self.indices is not None:
+            formato = f"esparsa {formato} ({len(self.indices) / max(self.n, 1):.0%} não zeros)"
+        return formato
+
+    def valores_float(self):
+        """Os valores da coluna como float64, com NaN nas medições ausentes."""
+        if self.escala is not None:
+            valores = np.where(self.valores == AUSENTE_INT16, np.nan, self.valores * self.escala)
+        else:
+            valores = self.valores.astype(np.float64)
+        if self.indices is None:
+            return valores
+        completos = np.zeros(self.n)
+        completos[self.indices] = valores
+        return completos
+
+
+class TabelaCompacta:
+    """
+    Os dados de uma estação no formato mais denso (ver o início do módulo): de 7
+    a 11 bytes por linha em uma série horária (com eixo regular ou com lacunas),
+    contra 40 do DataFrame lido do CSV.
+    """
+    def __init__(self, eixo, colunas, outras):
+        self._eixo = eixo
+        self._colunas = colunas
+        self._outras = outras
+
+    @classmethod
+    def de_dataframe(cls, df, escalas=None):
+        """
+        Compacta um DataFrame normalizado de uma estação.
+
+        Args:
+            df (pd.DataFrame): Os dados, com a coluna de data e as medições.
+            escalas (dict, optional): Resolução de cada medição guardada como int16.
+                Padrão é `ESCALAS_INT16`; colunas sem escala ficam em float32.
+        """
+        escalas = ESCALAS_INT16 if escalas is None else escalas
+        eixo = _EixoTempo(df[const.COL_DATA].to_numpy()) if const.COL_DATA in df.columns else None
+        colunas, outras = {}, {}
+        for coluna in df.columns:
+            if coluna == const.COL_DATA:
+                continue
+            if pd.api.types.is_numeric_dtype(df[coluna].dtype):
+                valores = df[coluna].to_numpy(dtype="float64", na_value=np.nan)
+                colunas[coluna] = _ColunaCompacta(valores, escalas.get(coluna))
+            else:
+                outras[coluna] = df[coluna]
+        return cls(eixo, colunas, outras)
+
+    def __len__(self):
+        if self._eixo is not None:
+            return self._eixo.n
+        return next(iter(self._colunas.values())).n if self._colunas else 0
+
+    @property
+    def columns(self):
+        nomes = [const.COL_DATA] if self._eixo is not None else []
+        return nomes + list(self._colunas) + list(self._outras)
+
+    def datas(self):
+        """As datas das linhas (datetime64)."""
+        return self._eixo.datas()
+
+    def coluna(self, nome):
+        """Os valores de uma coluna: float64 (NaN nos ausentes) para as medições."""
+        if nome == const.COL_DATA:
+            return self.datas()
+        if nome in self._colunas:
+            return self._colunas[nome].valores_float()
+        return self._outras[nome].to_numpy()
+
+    def para_dataframe(self, compacto=True):
+        """
+        Reconstrói o DataFrame, no modo de `compactar_dataframe` (padrão) ou com as
+        medições em float64.
+        """
+        df = pd.DataFrame({nome: self.coluna(nome) for nome in self.columns})
+        return compactar_dataframe(df) if compacto else df
+
+    def memory_usage(self, deep=True):
+        """
+        Bytes ocupados por coluna, como `DataFrame.memory_usage`.
+
+        Args:
+            deep (bool, optional): Inclui o conteúdo das colunas de texto.
+
+        Returns:
+            pd.Series: coluna -> bytes.
+        """
+        uso = {}
+        if self._eixo is not None:
+            uso[const.COL_DATA] = self._eixo.nbytes
+        for nome, coluna in self._colunas.items():
+            uso[nome] = coluna.nbytes
+        for nome, serie in self._outras.items():
+            uso[nome] = int(serie.memory_usage(index=False, deep=deep))
+        return pd.Series(uso, dtype=np.int64)
+
+    def formatos(self):
+        """Como cada coluna está guardada (por exemplo, "int16 x 0.1")."""
+        formatos = {const.COL_DATA: self._eixo.formato()} if self._eixo is not None else {}
+        formatos.update({nome: coluna.formato() for nome, coluna in self._colunas.items()})
+        formatos.update({nome: str(serie.dtype) for nome, serie in self._outras.items()})
+        return pd.Series(formatos, dtype=object)
+
+
+def relatorio_memoria(dados, referencia=None):
+    """
+    Relatório de memória por coluna de um DataFrame ou de uma `TabelaCompacta`.
+
+    Args:
+        dados (pd.DataFrame | TabelaCompacta): Os dados a medir.
+        referencia (pd.DataFrame | TabelaCompacta, optional): Outra representação
+            dos mesmos dados; acrescenta os bytes dela e a razão entre as duas.
+
+    Returns:
+        pd.DataFrame: Uma linha por coluna e a linha "total", com o formato, os
+        bytes e os bytes por linha.
+    """
+    def medir(dados):
+        if isinstance(dados, TabelaCompacta):
+            return dados.formatos(), dados.memory_usage(deep=True)
+        formatos = dados.dtypes.astype(str)
+        return formatos, dados.memory_usage(index=False, deep=True)
+
+    formatos, uso = medir(dados)
+    n_linhas = max(len(dados), 1)
+    relatorio = pd.DataFrame({"formato": formatos, "bytes": uso})
+    relatorio.loc["total"] = ["", int(uso.sum())]
+    relatorio["bytes_por_linha"] = relatorio["bytes"] / n_linhas
+    if referencia is not None:
+        _, uso_referencia = medir(referencia)
+        relatorio["bytes_referencia"] = uso_referencia.reindex(relatorio.index)
+        relatorio.loc["total", "bytes_referencia"] = int(uso_referencia.sum())
+        relatorio["razao"] = relatorio["bytes_referencia"] / relatorio["bytes"].replace(0, np.nan)
+    return relatorio
@@ -2,4 +2,27 @@ COL_DATA = 'data'
 COL_TEMP = 'temperatura_c'
 COL_UMIDADE = 'umidade_%'
 COL_VENTO = 'velocidade_do_vento_km_h'
-COL_PRECIP = 'precipitacao_mm'
\ No newline at end of file
+COL_PRECIP = 'precipitacao_mm'
+
+# Colunas de medição e os tipos usados na ingestão em blocos
+COLUNAS_NUMERICAS = [COL_TEMP, COL_UMIDADE, COL_VENTO, COL_PRECIP]
+TIPOS_COLUNAS = {coluna: 'float32' for coluna in COLUNAS_NUMERICAS}
+
+# Formatos de data testados, em ordem, quando o formato não é informado
+FORMATOS_DATA = [
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%d/%m/%Y',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%Y/%m/%d',
+]
+
+# Métricas dos gráficos de extremos: nome -> (coluna, unidade, paleta dos maiores, paleta dos menores)
+METRICAS_EXTREMOS = {
+    "Temperatura": (COL_TEMP, "°C", "YlOrRd", "Blues_r"),
+    "Umidade": (COL_UMIDADE, "%", "Greens", "GnBu_r"),
+    "Vento": (COL_VENTO, " km/h", "Oranges", "Purples_r"),
+    "Precipitação": (COL_PRECIP, " mm", "Blues", "Reds_r")
+}
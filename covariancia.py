@@ -0,0 +1,243 @@
+"""
+Co-momentos combináveis das colunas numéricas, para montar matrizes de
+covariância e de correlação de qualquer período (ou conjunto de estações) sem
+reler as linhas.
+
+Como em `DataFrame.corr`, cada par de colunas usa apenas as linhas em que as
+duas têm valor (pairwise-complete). Por isso o estado de k colunas guarda
+matrizes k x k: para o par (i, j), a contagem dessas linhas, a média da coluna
+i nelas (`media[i, j]`; a da coluna j é `media[j, i]`), o co-momento
+Σ(xi - média)(xj - média) e o segundo momento de i, Σ(xi - média)².
+
+Dentro de cada balde os momentos são calculados em duas passadas (primeiro as
+médias, depois os desvios), e baldes e estados são combinados de forma exata
+pela fórmula de Chan generalizada (teorema dos eixos paralelos), sem somas de
+quadrados brutas que percam precisão.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _somas_por_trecho(valores, inicios, cheios):
+    """Soma de cada trecho de linhas consecutivas (0 nos trechos vazios)."""
+    somas = np.zeros(len(inicios))
+    if cheios.any():
+        # Só os trechos não vazios: o último deles vai até o fim do array
+        somas[cheios] = np.add.reduceat(valores, inicios[cheios])
+    return somas
+
+
+def _momentos_por_trecho(valores, tamanhos):
+    """
+    Contagens, médias e co-momentos pareados de trechos consecutivos de linhas.
+
+    Cada coluna é centrada uma vez na média do trecho (sobre as suas linhas com
+    valor), e os desvios somam zero em cada trecho. Para um par, basta então
+    descontar as linhas em que a outra coluna não tem valor (em geral poucas)
+    para corrigir a contagem, a média e os momentos para as linhas em comum.
+
+    Args:
+        valores (list): Um array float64 por coluna (NaN nos ausentes), todos do mesmo tamanho.
+        tamanhos (np.ndarray): Quantas linhas tem cada trecho, na ordem; somam o tamanho dos arrays.
+
+    Returns:
+        tuple: (contagem, media, comomento, momento2), arrays (trechos, k, k).
+    """
+    k, n_trechos = len(valores), len(tamanhos)
+    forma = (n_trechos, k, k)
+    contagem, media = np.zeros(forma), np.zeros(forma)
+    comomento, momento2 = np.zeros(forma), np.zeros(forma)
+    tamanhos = np.asarray(tamanhos, dtype=np.int64)
+    fins = np.cumsum(tamanhos)
+    inicios, cheios = fins - tamanhos, tamanhos > 0
+
+    def somar(array):
+        return _somas_por_trecho(array, inicios, cheios)
+
+    desvios, ausentes, trechos_ausentes = [], [], []
+    for c, v in enumerate(valores):
+        presente = ~np.isnan(v)
+        zerados = np.where(presente, v, 0.0)
+        n = somar(presente.astype(np.float64))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m = np.where(n > 0, somar(zerados) / n, 0.0)
+        desvio = np.where(presente, zerados - np.repeat(m, tamanhos), 0.0)
+        contagem[:, c, :], media[:, c, :] = n[:, None], m[:, None]
+        momento2[:, c, :] = somar(desvio * desvio)[:, None]
+        desvios.append(desvio)
+        ausentes.append(np.flatnonzero(~presente))
+        trechos_ausentes.append(np.searchsorted(fins, ausentes[-1], side="right"))
+    comomento[:, np.arange(k), np.arange(k)] = momento2[:, np.arange(k), np.arange(k)]
+
+    for i in range(k):
+        for j in range(i + 1, k):
+            produto = somar(desvios[i] * desvios[j])
+            somas = {}
+            # Cada coluna do par perde as linhas em que a outra não tem valor
+            for a, b in ((i, j), (j, i)):
+                def descontar(pesos):
+                    return np.bincount(trechos_ausentes[b], pesos, minlength=n_trechos)
+
+                removidos = desvios[a][ausentes[b]]
+                n = contagem[:, a, b] - descontar(~np.isnan(valores[a][ausentes[b]]))
+                soma = -descontar(removidos)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    correcao = np.where(n > 0, soma / n, 0.0)
+                contagem[:, a, b] = n
+                media[:, a, b] = np.where(n > 0, media[:, a, b] + correcao, 0.0)
+                momento2[:, a, b] = np.maximum(momento2[:, a, b] - descontar(removidos * removidos) - soma * correcao, 0.0)
+                somas[a] = (soma, correcao)
+            comomento[:, i, j] = comomento[:, j, i] = produto - somas[i][0] * somas[j][1]
+    return contagem, media, comomento, momento2
+
+
+def _reduzir(contagem, media, comomento, momento2):
+    """
+    Combina vários estados (eixo 0) em um: os momentos de cada parte mais a
+    dispersão das médias das partes em torno da média conjunta.
+    """
+    total = contagem.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media_total = np.where(total > 0, (contagem * media).sum(axis=0) / total, 0.0)
+    desvio = np.where(contagem > 0, media - media_total, 0.0)
+    cruzado = (contagem * desvio * desvio.transpose(0, 2, 1)).sum(axis=0)
+    quadrado = (contagem * desvio * desvio).sum(axis=0)
+    return total, media_total, comomento.sum(axis=0) + cruzado, momento2.sum(axis=0) + quadrado
+
+
+class CoMomentos:
+    """O estado combinável de um conjunto de linhas (ver o início do módulo)."""
+    def __init__(self, colunas, contagem, media, comomento, momento2):
+        self.colunas = list(colunas)
+        self.contagem = contagem
+        self.media = media
+        self.comomento = comomento
+        self.momento2 = momento2
+
+    @classmethod
+    def de_valores(cls, colunas, valores):
+        """
+        Calcula o estado de um conjunto de linhas.
+
+        Args:
+            colunas (list): Os nomes das colunas.
+            valores (list): Um array float64 por coluna.
+        """
+        n = len(valores[0]) if valores else 0
+        estado = _momentos_por_trecho(valores, np.array([n]))
+        return cls(colunas, *(array[0] for array in estado))
+
+    @classmethod
+    def combinar(cls, partes):
+        """
+        Combina estados das mesmas colunas (por exemplo, de períodos ou estações
+        diferentes) no estado do conjunto.
+        """
+        partes = list(partes)
+        campos = [np.stack([getattr(p, campo) for p in partes])
+                  for campo in ("contagem", "media", "comomento", "momento2")]
+        return cls(partes[0].colunas, *_reduzir(*campos))
+
+    def covariancia(self):
+        """Matriz de covariância amostral (ddof=1), como `DataFrame.cov`."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            matriz = np.where(self.contagem > 1, self.comomento / (self.contagem - 1), np.nan)
+        return pd.DataFrame(matriz, index=self.colunas, columns=self.colunas)
+
+    def correlacao(self):
+        """Matriz de correlação de Pearson, como `DataFrame.corr`."""
+        denominador = np.sqrt(self.momento2 * self.momento2.T)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            matriz = np.where((self.contagem > 1) & (denominador > 0), self.comomento / denominador, np.nan)
+        return pd.DataFrame(np.clip(matriz, -1.0, 1.0), index=self.colunas, columns=self.colunas)
+
+
+class CoMomentosPorBalde:
+    """
+    Os estados de cada balde de linhas consecutivas (os meses da pirâmide de
+    agregados), construídos uma vez. O estado de um intervalo de baldes sai da
+    combinação dos seus estados, sem reler as linhas.
+    """
+    CAMPOS = ("contagem", "media", "comomento", "momento2")
+
+    def __init__(self, colunas, contagem, media, comomento, momento2):
+        self.colunas = list(colunas)
+        self.contagem = contagem
+        self.media = media
+        self.comomento = comomento
+        self.momento2 = momento2
+
+    @classmethod
+    def de_valores(cls, colunas, valores, linha_ini, linha_fim):
+        """
+        Args:
+            colunas (list): Os nomes das colunas.
+            valores (list): Um array float64 por coluna, a partir da linha `linha_ini[0]`.
+            linha_ini (np.ndarray): Primeira linha de cada balde (baldes consecutivos).
+            linha_fim (np.ndarray): Linha seguinte à última de cada balde.
+        """
+        linha_ini, linha_fim = np.asarray(linha_ini, dtype=np.int64), np.asarray(linha_fim, dtype=np.int64)
+        deslocamento = int(linha_ini[0]) if len(linha_ini) else 0
+        tamanhos = linha_fim - linha_ini
+        trechos = [v[deslocamento:deslocamento + int(tamanhos.sum())] for v in valores]
+        return cls(colunas, *_momentos_por_trecho(trechos, tamanhos))
+
+    def __len__(self):
+        return len(self.contagem)
+
+    @classmethod
+    def concatenar(cls, partes):
+        """Junta os baldes de partes consecutivas (na ordem das linhas)."""
+        partes = list(partes)
+        return cls(partes[0].colunas, *(np.concatenate([getattr(p, campo) for p in partes])
+                                        for campo in cls.CAMPOS))
+
+    def _fatia(self, a, b):
+        return CoMomentosPorBalde(self.colunas, *(getattr(self, campo)[a:b] for campo in self.CAMPOS))
+
+    def periodo(self, a, b, bordas=()):
+        """
+        O estado dos baldes [a, b) combinado com estados avulsos (por exemplo,
+        das linhas das bordas de um período que não completam um balde).
+        """
+        partes = [self._fatia(a, b)] + [
+            CoMomentosPorBalde(p.colunas, *(getattr(p, campo)[None] for campo in self.CAMPOS)) for p in bordas
+        ]
+        juntos = self.concatenar(partes)
+        return CoMomentos(self.colunas, *_reduzir(*(getattr(juntos, campo) for campo in self.CAMPOS)))
+
+    def anexar(self, valores, posicao, linha_ini, linha_fim):
+        """
+        Incorpora linhas novas sem reler as antigas: o estado das linhas novas de
+        cada balde é combinado ao do balde (o último, que elas podem completar)
+        ou vira um balde novo. O custo depende só das linhas novas.
+
+        Args:
+            valores (list): Um array float64 por coluna, com as linhas novas (a partir de `posicao`).
+            posicao (int): A linha da primeira linha nova.
+            linha_ini (np.ndarray): Primeira linha de cada balde, já com as linhas novas.
+            linha_fim (np.ndarray): Linha seguinte à última de cada balde, já com as linhas novas.
+
+        Returns:
+            CoMomentosPorBalde: Os novos estados; este objeto não é alterado.
+        """
+        balde = int(np.searchsorted(linha_fim, posicao, side="right"))
+        inicios = np.maximum(np.asarray(linha_ini[balde:]), posicao) - posicao
+        fins = np.asarray(linha_fim[balde:]) - posicao
+        novos = CoMomentosPorBalde.de_valores(self.colunas, valores, inicios, fins)
+        if balde >= len(self):
+            return self.concatenar([self._fatia(0, balde), novos])
+        combinado = self._fatia(balde, balde + 1).periodo(0, 1, [
+            CoMomentos(self.colunas, *(getattr(novos, campo)[0] for campo in self.CAMPOS))
+        ])
+        meio = CoMomentosPorBalde(self.colunas, *(getattr(combinado, campo)[None] for campo in self.CAMPOS))
+        return self.concatenar([self._fatia(0, balde), meio, novos._fatia(1, len(novos))])
+
+    def para_arrays(self):
+        """Os arrays que descrevem os baldes, para gravação em disco."""
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
+
+    @classmethod
+    def de_arrays(cls, colunas, arrays):
+        """Operação inversa de `para_arrays`."""
+        return cls(colunas, *(arrays[campo] for campo in cls.CAMPOS))
@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from covariancia import CoMomentos, CoMomentosPorBalde
+
+COLUNAS = ["temperatura_c", "umidade_%", "velocidade_do_vento_km_h", "precipitacao_mm"]
+
+
+def dados_correlacionados(n=5000, semente=0):
+    """Colunas correlacionadas, com valores grandes (para testar a precisão), ausentes e um trecho constante."""
+    rng = np.random.default_rng(semente)
+    temperatura = 1e4 + 5 * rng.standard_normal(n)
+    df = pd.DataFrame({
+        COLUNAS[0]: temperatura,
+        COLUNAS[1]: 70 - 2 * (temperatura - 1e4) + 3 * rng.standard_normal(n),
+        COLUNAS[2]: rng.gamma(2.0, 5.0, n),
+        COLUNAS[3]: rng.exponential(2.0, n),
+    })
+    for coluna in COLUNAS:
+        df.loc[rng.random(n) < 0.1, coluna] = np.nan
+    df.loc[1000:1100, COLUNAS[2]] = 7.0
+    return df
+
+
+class TestCoMomentosPorBalde(unittest.TestCase):
+    def setUp(self):
+        self.df = dados_correlacionados()
+        self.limites = np.array([0, 400, 401, 1000, 1101, 2500, 2500, 4000, 5000])
+        self.baldes = CoMomentosPorBalde.de_valores(
+            COLUNAS, [self.df[c].to_numpy() for c in COLUNAS], self.limites[:-1], self.limites[1:])
+
+    def conferir(self, estado, trecho):
+        np.testing.assert_allclose(estado.correlacao(), trecho.corr(), rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(estado.covariancia(), trecho.cov(), rtol=1e-9, atol=1e-12)
+
+    def test_todos_os_baldes_iguais_ao_pandas(self):
+        self.conferir(self.baldes.periodo(0, len(self.baldes)), self.df[COLUNAS])
+
+    def test_periodo_com_bordas_igual_ao_pandas(self):
+        # Baldes [2, 7) = linhas [401, 4000) (o balde 5 é vazio), mais as bordas [350, 401) e [4000, 4321)
+        bordas = [CoMomentos.de_valores(COLUNAS, [self.df[c].to_numpy()[a:b] for c in COLUNAS])
+                  for a, b in ((350, 401), (4000, 4321))]
+        self.conferir(self.baldes.periodo(2, 7, bordas), self.df[COLUNAS].iloc[350:4321])
+
+    def test_trecho_constante_sem_correlacao(self):
+        estado = self.baldes.periodo(3, 4)
+        self.assertTrue(np.isnan(estado.correlacao().loc[COLUNAS[2], COLUNAS[0]]))
+        self.conferir(estado, self.df[COLUNAS].iloc[1000:1101])
+
+    def test_anexar_igual_a_reconstruir(self):
+        posicao = 3000
+        # Os mesmos baldes, com o último ainda incompleto
+        inicial = CoMomentosPorBalde.de_valores(
+            COLUNAS, [self.df[c].to_numpy()[:posicao] for c in COLUNAS], self.limites[:-2],
+            np.append(self.limites[1:-2], posicao))
+        anexado = inicial.anexar([self.df[c].to_numpy()[posicao:] for c in COLUNAS], posicao,
+                                 self.limites[:-1], self.limites[1:])
+        self.assertEqual(len(anexado), len(self.baldes))
+        self.conferir(anexado.periodo(0, len(anexado)), self.df[COLUNAS])
+        self.conferir(anexado.periodo(6, 7), self.df[COLUNAS].iloc[2500:4000])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import matplotlib.dates as mdates
+import numpy as np
+
+METODO_PADRAO = "minmax"
+
+
+def _como_numeros(x):
+    """Converte o eixo x (datas ou números) em float64, relativo ao primeiro ponto."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").view(np.int64)
+    x = x.astype(np.float64)
+    return x - x[0] if len(x) else x
+
+
+def indices_lttb(x, y, n_pontos):
+    """
+    Seleciona `n_pontos` pontos pelo método Largest-Triangle-Three-Buckets: o
+    primeiro e o último pontos são mantidos e, em cada balde intermediário, fica o
+    ponto que forma o maior triângulo com o ponto escolhido no balde anterior e a
+    média do balde seguinte, o que preserva o formato visual da série.
+
+    Args:
+        x (np.ndarray): Eixo x em ordem crescente (datas ou números), sem ausentes.
+        y (np.ndarray): Valores, sem ausentes.
+        n_pontos (int): Quantidade de pontos desejada.
+
+    Returns:
+        np.ndarray: Os índices dos pontos escolhidos, em ordem crescente.
+    """
+    n = len(x)
+    if n_pontos >= n or n_pontos < 3:
+        return np.arange(n)
+    x = _como_numeros(x)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n_pontos - 2 baldes cobrindo os pontos 1 .. n-2
+    bordas = np.linspace(1, n - 1, n_pontos - 1).astype(np.int64)
+    tamanhos = np.diff(bordas)
+    medias_x = np.append(np.add.reduceat(x[:n - 1], bordas[:-1]) / tamanhos, x[-1])
+    medias_y = np.append(np.add.reduceat(y[:n - 1], bordas[:-1]) / tamanhos, y[-1])
+
+    escolhidos = np.empty(n_pontos, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    anterior = 0
+    for i in range(n_pontos - 2):
+        ini, fim = bordas[i], bordas[i + 1]
+        ax_, ay_ = x[anterior], y[anterior]
+        areas = np.abs((ax_ - medias_x[i + 1]) * (y[ini:fim] - ay_) - (ax_ - x[ini:fim]) * (medias_y[i + 1] - ay_))
+        anterior = ini + int(np.argmax(areas))
+        escolhidos[i + 1] = anterior
+    return escolhidos
+
+
+def indices_min_max(x, y, n_baldes):
+    """
+    Divide o eixo x em `n_baldes` intervalos de mesma largura (um por pixel) e
+    mantém, em cada um, o ponto de menor e o de maior valor, além do primeiro e do
+    último pontos: picos e vales continuam exatamente visíveis.
+
+    Args:
+        x (np.ndarray): Eixo x em ordem crescente (datas ou números), sem ausentes.
+        y (np.ndarray): Valores, sem ausentes.
+        n_baldes (int): Quantidade de intervalos (até 2 pontos por intervalo).
+
+    Returns:
+        np.ndarray: Os índices dos pontos escolhidos, em ordem crescente.
+    """
+    n = len(x)
+    if 2 * n_baldes >= n or n_baldes < 1:
+        return np.arange(n)
+    x = _como_numeros(x)
+    y = np.asarray(y, dtype=np.float64)
+
+    if x[-1] > 0:
+        baldes = np.minimum((x * (n_baldes / x[-1])).astype(np.int64), n_baldes - 1)
+    else:
+        baldes = np.arange(n) * n_baldes // n
+    inicios = np.flatnonzero(np.diff(baldes, prepend=-1))
+    tamanhos = np.diff(np.append(inicios, n))
+
+    def primeiros_iguais(extremos):
+        candidatos = np.flatnonzero(y == np.repeat(extremos, tamanhos))
+        _, primeiros = np.unique(baldes[candidatos], return_index=True)
+        return candidatos[primeiros]
+
+    return np.unique(np.concatenate((
+        [0, n - 1],
+        primeiros_iguais(np.minimum.reduceat(y, inicios)),
+        primeiros_iguais(np.maximum.reduceat(y, inicios)),
+    )))
+
+
+def decimar(x, y, n_pontos, metodo=METODO_PADRAO):
+    """
+    Reduz uma série para cerca de `n_pontos` pontos, ignorando os ausentes.
+
+    Args:
+        x (np.ndarray): Eixo x em ordem crescente (datas ou números).
+        y (np.ndarray): Valores (NaN para ausentes).
+        n_pontos (int): Quantidade de pontos desejada (tipicamente a largura em pixels).
+        metodo (str, optional): "minmax" (envelope por pixel) ou "lttb".
+
+    Returns:
+        np.ndarray: Índices, em `x` e `y`, dos pontos a desenhar.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    validos = ~np.isnan(y)
+    if np.issubdtype(x.dtype, np.datetime64):
+        validos &= ~np.isnat(x)
+    posicoes = np.flatnonzero(validos)
+    if metodo == "lttb":
+        escolhidos = indices_lttb(x[posicoes], y[posicoes], n_pontos)
+    elif metodo == "minmax":
+        escolhidos = indices_min_max(x[posicoes], y[posicoes], max(n_pontos // 2, 1))
+    else:
+        raise ValueError(f"Método de decimação desconhecido: '{metodo}'.")
+    return posicoes[escolhidos]
+
+
+def largura_em_pixels(ax):
+    """Largura atual do eixo, em pixels."""
+    return max(int(ax.get_window_extent().width), 1)
+
+
+class LinhaDecimada:
+    """
+    Linha de série temporal desenhada a partir de uma versão reduzida dos dados,
+    com cerca de dois pontos por pixel de largura do eixo. Ao aproximar ou mover
+    o gráfico (por exemplo, com a barra de ferramentas do Matplotlib), o trecho
+    visível é reduzido de novo a partir dos dados completos.
+    """
+    def __init__(self, ax, x, y, metodo=METODO_PADRAO, **estilo):
+        """
+        Args:
+            ax: O eixo do Matplotlib.
+            x (array-like): Eixo x em ordem crescente (datas ou números).
+            y (array-like): Valores da série.
+            metodo (str, optional): "minmax" ou "lttb".
+            **estilo: Argumentos repassados a `ax.plot`.
+        """
+        self.ax = ax
+        self.x = np.asarray(x)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.metodo = metodo
+        if np.issubdtype(self.x.dtype, np.datetime64):
+            self._x_numerico = mdates.date2num(self.x)
+        else:
+            self._x_numerico = self.x.astype(np.float64)
+
+        indices = decimar(self.x, self.y, 2 * largura_em_pixels(ax), metodo)
+        (self.linha,) = ax.plot(self.x[indices], self.y[indices], **estilo)
+
+        # O registro de callbacks do Matplotlib guarda só referências fracas a
+        # métodos; a lista no próprio eixo mantém este objeto vivo com a figura.
+        if not hasattr(ax, "linhas_decimadas"):
+            ax.linhas_decimadas = []
+        ax.linhas_decimadas.append(self)
+        ax.callbacks.connect("xlim_changed", self._ao_mudar_limites)
+
+    def _ao_mudar_limites(self, ax):
+        """Redecima o trecho visível (mais um ponto de cada lado, para a linha chegar às bordas)."""
+        x_min, x_max = ax.get_xlim()
+        ini = max(int(np.searchsorted(self._x_numerico, x_min, side="left")) - 1, 0)
+        fim = min(int(np.searchsorted(self._x_numerico, x_max, side="right")) + 1, len(self.x))
+        indices = ini + decimar(self.x[ini:fim], self.y[ini:fim], 2 * largura_em_pixels(ax), self.metodo)
+        self.linha.set_data(self.x[indices], self.y[indices])
@@ -1,33 +1,179 @@
+import os
+
 import pandas as pd
-import unicodedata
+
+import cache_dados
+import ingestao
+from compacto import TabelaCompacta, compactar_dataframe, relatorio_memoria
+from perfil import medir
 
 class EstacaoMeteorologica:
     """
     Classe para carregar e analisar dados de uma estação meteorológica a partir de um arquivo CSV.
     """
-    def __init__(self, caminho_csv):
+    @medir()
+    def __init__(self, caminho_csv, usar_cache=True, em_blocos=False,
+                 limite_memoria_mb=ingestao.LIMITE_MEMORIA_PADRAO_MB, compacto=False):
         """
-        Inicializa a classe, carrega o DataFrame e normaliza os nomes das colunas.
+        Inicializa a classe, carrega o DataFrame, normaliza os nomes das colunas
+        e ordena as linhas pela data.
+
+        Quando `usar_cache` é verdadeiro, o DataFrame normalizado é lido de uma
+        cópia colunar binária gravada ao lado do CSV (ver `cache_dados`), desde
+        que o CSV não tenha mudado ou apenas tenha recebido linhas novas no final
+        (estas são lidas e anexadas); caso contrário o CSV é lido e o cache é refeito.
+        `deslocamento` guarda até que byte o CSV já foi lido (ver `anexar_novas_linhas`).
+        Se o CSV não termina em quebra de linha, ele aponta para o início da
+        última linha, já carregada, e `_linha_aberta` guarda o tamanho dela.
+
+        O formato da data é detectado nas primeiras linhas do CSV e guardado em
+        `formato_data`. As datas preenchidas que não seguem esse formato ficam
+        como NaT (no final dos dados) e são contadas em `datas_invalidas`, na
+        leitura do CSV.
 
         Args:
             caminho_csv (str): O caminho para o arquivo CSV com os dados.
+            usar_cache (bool, optional): Usa e mantém o cache colunar. Padrão é True.
+            em_blocos (bool, optional): Lê o CSV em blocos, com as medições em float32
+                (ver `ingestao.ler_em_blocos`). Indicado para arquivos muito grandes.
+            limite_memoria_mb (float, optional): Orçamento de memória de cada bloco.
+            compacto (bool, optional): Guarda as medições em float32 e a precipitação
+                em uma coluna esparsa (ver `compacto.compactar_dataframe`).
         """
+        self.caminho_csv = caminho_csv
+        self.carregado_do_cache = False
+        self.formato_data = None
+        self.datas_invalidas = 0
+        self.linhas_rejeitadas = 0
+        self._colunas_csv = None
+        self._linha_aberta = 0
+        self._carregar(caminho_csv, usar_cache, em_blocos, limite_memoria_mb)
+        if compacto:
+            self.df = compactar_dataframe(self.df)
+
+    def _carregar(self, caminho_csv, usar_cache, em_blocos, limite_memoria_mb):
+        """Lê o DataFrame do cache ou do CSV (ver `__init__`)."""
+        variante = "blocos" if em_blocos else "padrao"
+        if usar_cache:
+            df_cache, bytes_cobertos = cache_dados.carregar_cache_prefixo(caminho_csv, variante)
+            if df_cache is not None:
+                self.df = df_cache
+                self.carregado_do_cache = True
+                self.formato_data = ingestao.detectar_formato_csv(caminho_csv)
+                # Byte a partir do qual o CSV ainda não foi lido
+                self.deslocamento = ingestao.fim_ultima_linha(caminho_csv, bytes_cobertos)
+                self._linha_aberta = bytes_cobertos - self.deslocamento
+                if os.path.getsize(caminho_csv) > bytes_cobertos and self.anexar_novas_linhas()[0]:
+                    # O CSV cresceu: o cache passa a cobrir também as linhas novas
+                    assinatura = cache_dados.assinatura_arquivo(caminho_csv, self.deslocamento)
+                    cache_dados.salvar_cache(caminho_csv, self.df, assinatura, variante)
+                return
+            assinatura = cache_dados.assinatura_arquivo(caminho_csv)
+            tamanho = assinatura["tamanho"]
+        else:
+            tamanho = os.path.getsize(caminho_csv)
+
+        if em_blocos:
+            df, self.formato_data, self.datas_invalidas = ingestao.carregar_em_blocos(caminho_csv, limite_memoria_mb)
+        else:
+            df = self._ler_csv(caminho_csv)
+        self.df = self._ordenar_por_data(df)
+        self.deslocamento = ingestao.fim_ultima_linha(caminho_csv, tamanho)
+        self._linha_aberta = tamanho - self.deslocamento
+        if usar_cache:
+            cache_dados.salvar_cache(caminho_csv, self.df, assinatura, variante)
+
+    @medir()
+    def _ler_csv(self, caminho_csv):
+        """Lê o CSV e devolve o DataFrame com colunas normalizadas e datas convertidas."""
         df_original = pd.read_csv(caminho_csv)
         # Normaliza os nomes das colunas para um formato padrão
         df_original.columns = [self._normalizar(col) for col in df_original.columns]
-        # Converte a coluna 'data' para o tipo datetime
-        df_original["data"] = pd.to_datetime(df_original["data"], errors="coerce")
-        self.df = df_original
+        # Converte a coluna 'data' para o tipo datetime, com o formato detectado numa amostra
+        formato = ingestao.detectar_formato_data(df_original["data"].head(ingestao.LINHAS_AMOSTRA))
+        datas = ingestao.converter_datas(df_original["data"], formato)
+        self.datas_invalidas = int((datas.isna() & df_original["data"].notna()).sum())
+        df_original["data"] = datas
+        self.formato_data = formato
+        return df_original
+
+    @property
+    def n_linhas_validas(self):
+        """Quantas linhas iniciais do DataFrame têm data válida (as demais são NaT)."""
+        return len(self.df) - int(self.df["data"].isna().sum())
+
+    @medir()
+    def anexar_novas_linhas(self):
+        """
+        Lê apenas o que foi acrescentado ao CSV desde a última leitura e junta ao
+        DataFrame as linhas válidas: com data e posteriores à última data já
+        carregada. As demais são descartadas e contadas em `linhas_rejeitadas`.
+
+        As linhas novas entram logo após as linhas com data válida, antes das
+        linhas sem data, mantendo o DataFrame ordenado.
+
+        Returns:
+            tuple: (quantidade de linhas anexadas, posição da primeira delas).
+
+        Raises:
+            ValueError: Se o CSV foi reescrito (e não apenas acrescido) desde a última leitura.
+        """
+        if self._colunas_csv is None:
+            self._colunas_csv = ingestao.ler_cabecalho(self.caminho_csv)
+        novas, deslocamento = ingestao.ler_linhas_novas(
+            self.caminho_csv, self.deslocamento, self._colunas_csv, self.formato_data, self._linha_aberta
+        )
+        if deslocamento != self.deslocamento:
+            self._linha_aberta = 0
+        self.deslocamento = deslocamento
+        n_validas = self.n_linhas_validas
+        if novas.empty:
+            return 0, n_validas
+
+        datas = novas["data"]
+        aceitas = datas.notna()
+        if n_validas:
+            aceitas &= datas > self.df["data"].iloc[n_validas - 1]
+        self.linhas_rejeitadas += int((~aceitas).sum())
+        novas = novas[aceitas]
+        if novas.empty:
+            return 0, n_validas
+        novas = self._ordenar_por_data(novas.reset_index(drop=True))
+        novas = self._ajustar_tipos(novas)
+
+        partes = [self.df.iloc[:n_validas], novas]
+        if n_validas < len(self.df):
+            partes.append(self.df.iloc[n_validas:])
+        self.df = pd.concat(partes, ignore_index=True)
+        return len(novas), n_validas
+
+    def _ajustar_tipos(self, novas):
+        """Converte as linhas novas para os tipos das colunas já carregadas, quando possível."""
+        novas = novas.reindex(columns=self.df.columns)
+        for coluna, tipo in self.df.dtypes.items():
+            if novas[coluna].dtype == tipo or not pd.api.types.is_numeric_dtype(tipo):
+                continue
+            valores = pd.to_numeric(novas[coluna], errors="coerce")
+            if pd.api.types.is_float_dtype(tipo) or valores.notna().all():
+                valores = valores.astype(tipo)
+            novas[coluna] = valores
+        return novas
+
+    def _ordenar_por_data(self, df):
+        """
+        Ordena as linhas pela data (ordenação estável), deixando as datas inválidas
+        no final, para que períodos possam ser localizados por busca binária.
+        """
+        if df["data"].is_monotonic_increasing:
+            return df
+        return df.sort_values("data", kind="stable", na_position="last", ignore_index=True)
+
     def _normalizar(self, nome_coluna):
         """
         Normaliza uma string para um formato de nome de coluna Pythonico.
-        - Remove acentos e caracteres especiais.
-        - Converte para minúsculas.
-        - Substitui espaços e outros caracteres por underscores.
+        Ver `ingestao.normalizar_nome_coluna`.
         """
-        nome_coluna = nome_coluna.strip().lower()
-        nome_coluna = unicodedata.normalize('NFKD', nome_coluna).encode('ASCII', 'ignore').decode('utf-8')
-        return nome_coluna.replace(" ", "_").replace("(", "").replace(")", "").replace("/", "_")
+        return ingestao.normalizar_nome_coluna(nome_coluna)
 
     def get_dados(self):
         """
@@ -35,6 +181,18 @@ class EstacaoMeteorologica:
         """
         return self.df
 
+    def memory_usage(self, compacta=False):
+        """
+        Relatório de memória por coluna (ver `compacto.relatorio_memoria`).
+
+        Args:
+            compacta (bool, optional): Mede a `compacto.TabelaCompacta` equivalente,
+                comparada ao DataFrame atual, em vez do próprio DataFrame.
+        """
+        if compacta:
+            return relatorio_memoria(TabelaCompacta.de_dataframe(self.df), self.df)
+        return relatorio_memoria(self.df)
+
     # --- MÉTODOS DE ANÁLISE DE EXTREMOS ---
 
     def dias_com_maiores_indices(self, coluna, n=5):
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from estacao import EstacaoMeteorologica
+
+CABECALHO = "Data,Temperatura (°C),Umidade (%),Velocidade do Vento (km/h),Precipitação (mm)"
+
+
+def linha(dia, hora, temperatura):
+    return f"2025-01-{dia:02d} {hora:02d}:00,{temperatura},70.0,10.0,0.0"
+
+
+class TestAnexarNovasLinhas(unittest.TestCase):
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        self.caminho = os.path.join(self.pasta.name, "estacao.csv")
+
+    def tearDown(self):
+        self.pasta.cleanup()
+
+    def escrever(self, texto, modo="a"):
+        with open(self.caminho, modo, encoding="utf-8", newline="") as arquivo:
+            arquivo.write(texto)
+
+    def conferir_com_pandas(self, estacao):
+        """Os dados da estação devem ser os do CSV completo lido pelo pandas."""
+        esperado = pd.read_csv(self.caminho)
+        esperado["Data"] = pd.to_datetime(esperado["Data"], format="%Y-%m-%d %H:%M")
+        obtido = estacao.df
+        self.assertEqual(len(obtido), len(esperado))
+        self.assertEqual(list(obtido["data"]), list(esperado["Data"]))
+        self.assertEqual(list(obtido["temperatura_c"]), list(esperado["Temperatura (°C)"]))
+
+    def test_linha_parcial_fica_para_a_proxima_leitura(self):
+        for quebra in ("\n", "\r\n"):
+            for usar_cache in (False, True):
+                with self.subTest(quebra=repr(quebra), usar_cache=usar_cache):
+                    self.escrever(quebra.join([CABECALHO, linha(1, 0, 20.0), linha(1, 1, 21.0)]) + quebra, "w")
+                    estacao = EstacaoMeteorologica(self.caminho, usar_cache=usar_cache)
+
+                    parcial = linha(1, 2, 22.5)
+                    self.escrever(parcial[:12])
+                    self.assertEqual(estacao.anexar_novas_linhas(), (0, 2))
+                    self.escrever(parcial[12:] + quebra + linha(1, 3, 23.0) + quebra)
+                    self.assertEqual(estacao.anexar_novas_linhas(), (2, 2))
+
+                    self.assertEqual(estacao.linhas_rejeitadas, 0)
+                    self.conferir_com_pandas(estacao)
+
+    def test_ultima_linha_sem_quebra_nao_e_lida_de_novo(self):
+        for quebra in ("\n", "\r\n"):
+            for usar_cache in (False, True):
+                with self.subTest(quebra=repr(quebra), usar_cache=usar_cache):
+                    self.escrever(quebra.join([CABECALHO, linha(1, 0, 20.0), linha(1, 1, 21.0)]), "w")
+                    estacao = EstacaoMeteorologica(self.caminho, usar_cache=usar_cache)
+                    self.assertEqual(len(estacao.df), 2)
+
+                    self.escrever(quebra + linha(1, 2, 22.0) + quebra)
+                    self.assertEqual(estacao.anexar_novas_linhas(), (1, 2))
+                    self.assertEqual(estacao.linhas_rejeitadas, 0)
+                    self.conferir_com_pandas(estacao)
+
+    def test_ultima_linha_estendida_e_reescrita(self):
+        self.escrever("\n".join([CABECALHO, linha(1, 0, 20.0), linha(1, 1, 21.0)]), "w")
+        estacao = EstacaoMeteorologica(self.caminho, usar_cache=False)
+        self.escrever("5\n")
+        with self.assertRaises(ValueError):
+            estacao.anexar_novas_linhas()
+
+    def test_linhas_antigas_ou_sem_data_sao_rejeitadas(self):
+        self.escrever("\n".join([CABECALHO, linha(1, 0, 20.0), linha(1, 5, 21.0)]) + "\n", "w")
+        estacao = EstacaoMeteorologica(self.caminho, usar_cache=False)
+        self.escrever("\n".join([linha(1, 3, 19.0), "data ruim,1,2,3,4", linha(1, 6, 22.0)]) + "\n")
+        self.assertEqual(estacao.anexar_novas_linhas(), (1, 2))
+        self.assertEqual(estacao.linhas_rejeitadas, 2)
+        self.assertEqual(list(estacao.df["temperatura_c"]), [20.0, 21.0, 22.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Detecção de eventos de dias consecutivos (ondas de calor, períodos secos,
+sequências chuvosas e de vento forte) sobre os agregados diários.
+
+Cada tipo de evento é uma condição sobre uma estatística diária de uma coluna
+(por exemplo, o máximo diário da temperatura >= 32 °C) que precisa valer por
+um número mínimo de dias seguidos. A condição é avaliada de uma vez para todos
+os dias e as sequências saem de uma codificação por comprimento de sequência
+(run-length) vetorizada: um dia continua a sequência do anterior só se os dois
+atendem a condição e são dias consecutivos, então dias sem dados interrompem a
+sequência. O custo é linear no número de dias, e os agregados diários já vêm
+prontos da pirâmide (`agregados.PiramideAgregados`).
+"""
+import numpy as np
+import pandas as pd
+
+import constantes as const
+
+OPERADORES = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal}
+CAMPOS_DEFINICAO = ("coluna", "estatistica", "operador", "limiar", "duracao_minima")
+
+# Tipos de evento: nome -> condição diária e duração mínima (em dias)
+TIPOS_EVENTO = {
+    "onda_de_calor": {
+        "rotulo": "Onda de calor", "coluna": const.COL_TEMP, "estatistica": "maximo",
+        "operador": ">=", "limiar": 32.0, "duracao_minima": 3,
+    },
+    "periodo_seco": {
+        "rotulo": "Período seco", "coluna": const.COL_PRECIP, "estatistica": "soma",
+        "operador": "<", "limiar": 1.0, "duracao_minima": 5,
+    },
+    "sequencia_chuvosa": {
+        "rotulo": "Sequência chuvosa", "coluna": const.COL_PRECIP, "estatistica": "soma",
+        "operador": ">=", "limiar": 1.0, "duracao_minima": 3,
+    },
+    "sequencia_de_vento": {
+        "rotulo": "Vento forte", "coluna": const.COL_VENTO, "estatistica": "maximo",
+        "operador": ">=", "limiar": 40.0, "duracao_minima": 2,
+    },
+}
+COLUNAS_EVENTOS = ["tipo", "coluna", "inicio", "fim", "duracao_dias", "pico", "data_pico", "media"]
+
+
+def resolver_definicoes(tipos=None, definicoes=None):
+    """
+    Monta as definições dos tipos pedidos, com os ajustes informados.
+
+    Args:
+        tipos (list, optional): Nomes dos tipos. Padrão são todos os de
+            `TIPOS_EVENTO` e os novos de `definicoes`.
+        definicoes (dict, optional): Nome -> campos que substituem os padrões
+            (por exemplo, {"onda_de_calor": {"limiar": 35}}). Um nome novo precisa
+            de todos os campos (`CAMPOS_DEFINICAO`).
+
+    Returns:
+        dict: Nome -> definição completa.
+
+    Raises:
+        ValueError: Se um tipo for desconhecido, faltar um campo ou o operador for inválido.
+    """
+    definicoes = definicoes or {}
+    if tipos is None:
+        tipos = list(TIPOS_EVENTO) + [nome for nome in definicoes if nome not in TIPOS_EVENTO]
+    resolvidas = {}
+    for nome in tipos:
+        if nome not in TIPOS_EVENTO and nome not in definicoes:
+            raise ValueError(f"Tipo de evento desconhecido: '{nome}'. Use {list(TIPOS_EVENTO)}.")
+        definicao = {"rotulo": nome, **TIPOS_EVENTO.get(nome, {}), **definicoes.get(nome, {})}
+        faltando = [campo for campo in CAMPOS_DEFINICAO if campo not in definicao]
+        if faltando:
+            raise ValueError(f"Faltam campos na definição do evento '{nome}': {faltando}.")
+        if definicao["operador"] not in OPERADORES:
+            raise ValueError(f"Operador inválido no evento '{nome}': '{definicao['operador']}'. "
+                             f"Use {list(OPERADORES)}.")
+        resolvidas[nome] = definicao
+    return resolvidas
+
+
+def sequencias(ordinais, condicao):
+    """
+    Codificação por comprimento de sequência: as sequências máximas de dias
+    consecutivos que atendem a condição.
+
+    Args:
+        ordinais (np.ndarray): Os dias (inteiros, em ordem crescente e sem repetição).
+        condicao (np.ndarray): Booleano por dia.
+
+    Returns:
+        tuple: (inicios, fins), as posições do primeiro e do último dia de cada sequência.
+    """
+    condicao = np.asarray(condicao, dtype=bool)
+    # continua[i]: o dia i estende a sequência do dia i - 1
+    continua = np.zeros(len(condicao), dtype=bool)
+    continua[1:] = condicao[1:] & condicao[:-1] & (np.diff(ordinais) == 1)
+    termina = condicao.copy()
+    termina[:-1] &= ~continua[1:]
+    return np.flatnonzero(condicao & ~continua), np.flatnonzero(termina)
+
+
+def detectar_eventos(diario, tipos=None, definicoes=None):
+    """
+    Detecta os eventos nos agregados diários.
+
+    Args:
+        diario (pd.DataFrame): Uma linha por dia, com a data e as colunas
+            "<coluna>_<estatistica>" e "<coluna>_contagem" (como em
+            `AnalisadorClimatico.gerar_analise_periodica("diario")`). Dias sem
+            leituras (contagem zero) nunca atendem a condição.
+        tipos (list, optional): Os tipos de evento (ver `resolver_definicoes`).
+        definicoes (dict, optional): Ajustes das definições (ver `resolver_definicoes`).
+
+    Returns:
+        pd.DataFrame: Um evento por linha, ordenado pelo início, com o tipo, a
+        coluna, o primeiro e o último dia, a duração em dias, o pico (o valor
+        diário mais extremo no sentido da condição), o dia do pico e a média
+        diária no evento.
+    """
+    definicoes = resolver_definicoes(tipos, definicoes)
+    if diario.empty:
+        return pd.DataFrame(columns=COLUNAS_EVENTOS)
+    datas = diario[const.COL_DATA].to_numpy()
+    ordinais = datas.astype("datetime64[D]").astype(np.int64)
+    dias = ordinais.astype("datetime64[D]").astype(datas.dtype)
+    tabelas = []
+    for nome, definicao in definicoes.items():
+        coluna, estatistica = definicao["coluna"], definicao["estatistica"]
+        if f"{coluna}_{estatistica}" not in diario.columns:
+            continue
+        valores = diario[f"{coluna}_{estatistica}"].to_numpy(dtype=np.float64)
+        with np.errstate(invalid="ignore"):
+            condicao = OPERADORES[definicao["operador"]](valores, definicao["limiar"])
+        condicao &= diario[f"{coluna}_contagem"].to_numpy() > 0
+        inicios, fins = sequencias(ordinais, condicao)
+        duracoes = fins - inicios + 1
+        longas = duracoes >= definicao["duracao_minima"]
+        inicios, fins, duracoes = inicios[longas], fins[longas], duracoes[longas]
+        if len(inicios) == 0:
+            continue
+
+        # Fora das sequências os valores são neutralizados, então cada trecho
+        # [inicio de uma sequência, inicio da seguinte) reduz só a sequência
+        maiores = definicao["operador"].startswith(">")
+        neutro = -np.inf if maiores else np.inf
+        dentro = np.zeros(len(valores) + 1, dtype=np.int64)
+        dentro[inicios] += 1
+        dentro[fins + 1] -= 1
+        dentro = np.cumsum(dentro[:-1]) > 0
+        mascarados = np.where(dentro, valores, neutro)
+        picos = (np.maximum if maiores else np.minimum).reduceat(mascarados, inicios)
+        # O dia do pico: a primeira posição de cada sequência com o valor do pico
+        pico_do_trecho = np.full(len(valores), np.nan)
+        pico_do_trecho[inicios[0]:] = np.repeat(picos, np.diff(np.append(inicios, len(valores))))
+        posicoes = np.where(mascarados == pico_do_trecho, np.arange(len(valores)), len(valores))
+        dias_pico = np.minimum.reduceat(posicoes, inicios)
+        medias = np.add.reduceat(np.where(dentro, valores, 0.0), inicios) / duracoes
+        tabelas.append(pd.DataFrame({
+            "tipo": nome,
+            "coluna": coluna,
+            "inicio": dias[inicios],
+            "fim": dias[fins],
+            "duracao_dias": duracoes,
+            "pico": picos,
+            "data_pico": dias[dias_pico],
+            "media": medias,
+        }))
+    if not tabelas:
+        return pd.DataFrame(columns=COLUNAS_EVENTOS)
+    eventos = pd.concat(tabelas, ignore_index=True)
+    return eventos.sort_values(["inicio", "tipo"], kind="stable", ignore_index=True)
@@ -0,0 +1,100 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from eventos import COLUNAS_EVENTOS, detectar_eventos, resolver_definicoes, sequencias
+import constantes as const
+
+
+def agregados_diarios(horario):
+    """Os agregados diários de `detectar_eventos`, com o resample do pandas (dias vazios têm contagem zero)."""
+    reamostrado = horario.set_index(const.COL_DATA).resample("D")
+    diario = pd.DataFrame(index=reamostrado.count().index)
+    for coluna in const.COLUNAS_NUMERICAS:
+        diario[f"{coluna}_contagem"] = reamostrado[coluna].count()
+        diario[f"{coluna}_soma"] = reamostrado[coluna].sum()
+        diario[f"{coluna}_media"] = reamostrado[coluna].mean()
+        diario[f"{coluna}_minimo"] = reamostrado[coluna].min()
+        diario[f"{coluna}_maximo"] = reamostrado[coluna].max()
+    return diario.rename_axis(const.COL_DATA).reset_index()
+
+
+def eventos_com_pandas(diario, nome, definicao):
+    """Os eventos de um tipo, por agrupamento de dias consecutivos que atendem a condição."""
+    coluna, estatistica = definicao["coluna"], definicao["estatistica"]
+    valores = diario[f"{coluna}_{estatistica}"]
+    operadores = {">": valores.gt, ">=": valores.ge, "<": valores.lt, "<=": valores.le}
+    condicao = operadores[definicao["operador"]](definicao["limiar"]) & (diario[f"{coluna}_contagem"] > 0)
+    grupos = (condicao != condicao.shift()).cumsum()
+    linhas = []
+    for _, dias in diario[condicao].groupby(grupos[condicao]):
+        serie = dias.set_index(const.COL_DATA)[f"{coluna}_{estatistica}"]
+        if len(serie) < definicao["duracao_minima"]:
+            continue
+        maiores = definicao["operador"].startswith(">")
+        linhas.append({
+            "tipo": nome, "coluna": coluna, "inicio": serie.index[0], "fim": serie.index[-1],
+            "duracao_dias": len(serie), "pico": serie.max() if maiores else serie.min(),
+            "data_pico": serie.idxmax() if maiores else serie.idxmin(), "media": serie.mean(),
+        })
+    return pd.DataFrame(linhas, columns=COLUNAS_EVENTOS)
+
+
+class TestSequencias(unittest.TestCase):
+    def test_dias_faltando_interrompem_a_sequencia(self):
+        ordinais = np.array([1, 2, 3, 5, 6, 7, 8, 10])
+        condicao = np.array([True, True, False, True, True, True, True, True])
+        inicios, fins = sequencias(ordinais, condicao)
+        np.testing.assert_array_equal(inicios, [0, 3, 7])
+        np.testing.assert_array_equal(fins, [1, 6, 7])
+
+    def test_sem_dias(self):
+        inicios, fins = sequencias(np.array([], dtype=np.int64), np.array([], dtype=bool))
+        self.assertEqual((len(inicios), len(fins)), (0, 0))
+
+
+class TestDetectarEventos(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        datas = pd.date_range("2024-01-01", periods=24 * 200, freq="h")
+        n = len(datas)
+        dias = np.arange(n) / 24
+        horario = pd.DataFrame({
+            const.COL_DATA: datas,
+            const.COL_TEMP: 27 + 4 * np.sin(dias / 6) + 3 * np.sin(np.arange(n) * 2 * np.pi / 24)
+                            + rng.standard_normal(n),
+            const.COL_UMIDADE: 70 + rng.standard_normal(n),
+            const.COL_VENTO: rng.gamma(2.0, 6.0, n),
+            const.COL_PRECIP: np.where(rng.random(n) < 0.03, rng.exponential(3.0, n), 0.0),
+        })
+        # Dois dias sem leituras no meio dos dados
+        horario = horario[(datas < "2024-03-10") | (datas >= "2024-03-12")]
+        self.diario = agregados_diarios(horario)
+
+    def test_eventos_iguais_ao_pandas(self):
+        eventos = detectar_eventos(self.diario)
+        for nome, definicao in resolver_definicoes().items():
+            obtido = eventos[eventos["tipo"] == nome].reset_index(drop=True)
+            esperado = eventos_com_pandas(self.diario, nome, definicao)
+            with self.subTest(tipo=nome):
+                self.assertGreater(len(esperado), 0)
+                pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False)
+
+    def test_eventos_ordenados_pelo_inicio(self):
+        eventos = detectar_eventos(self.diario)
+        self.assertEqual(list(eventos.columns), COLUNAS_EVENTOS)
+        self.assertTrue(eventos["inicio"].is_monotonic_increasing)
+
+    def test_definicao_ajustada(self):
+        eventos = detectar_eventos(self.diario, ["onda_de_calor"], {"onda_de_calor": {"duracao_minima": 10}})
+        self.assertTrue((eventos["duracao_dias"] >= 10).all())
+
+    def test_sem_dados(self):
+        eventos = detectar_eventos(self.diario.iloc[:0])
+        self.assertTrue(eventos.empty)
+        self.assertEqual(list(eventos.columns), COLUNAS_EVENTOS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+"""
+Exportação de recortes dos dados em blocos, em vários formatos: CSV (também
+comprimido com gzip ou, se o pacote `zstandard` estiver instalado, zstd),
+Parquet e Feather (com `pyarrow`) e NumPy `.npz`.
+
+Os dados nunca são convertidos de uma só vez: cada bloco de linhas é escrito e
+descartado antes do próximo, e o progresso e o cancelamento são verificados
+entre os blocos (ver `tarefas.Tarefa`). O arquivo é escrito em um temporário na
+mesma pasta e só substitui o destino no final (rename atômico), de modo que uma
+exportação interrompida nunca deixa um arquivo incompleto.
+"""
+import gzip
+import io
+import os
+import zipfile
+from concurrent.futures import CancelledError
+
+import numpy as np
+import pandas as pd
+
+from perfil import medir
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+LINHAS_POR_BLOCO_EXPORTACAO = 250_000
+# Níveis de compressão: priorizam a velocidade, como convém a arquivos grandes
+NIVEL_GZIP = 3
+NIVEL_ZSTD = 3
+
+# Formato -> (extensão, descrição)
+FORMATOS = {
+    "csv": (".csv", "CSV"),
+    "csv.gz": (".csv.gz", "CSV comprimido (gzip)"),
+    "csv.zst": (".csv.zst", "CSV comprimido (zstd)"),
+    "parquet": (".parquet", "Parquet"),
+    "feather": (".feather", "Feather (Arrow)"),
+    "npz": (".npz", "NumPy (.npz)"),
+}
+
+
+def formatos_disponiveis():
+    """Os formatos cujas dependências opcionais estão instaladas, na ordem de `FORMATOS`."""
+    indisponiveis = set()
+    if zstandard is None:
+        indisponiveis.add("csv.zst")
+    if pa is None:
+        indisponiveis.update({"parquet", "feather"})
+    return [formato for formato in FORMATOS if formato not in indisponiveis]
+
+
+def formato_do_caminho(caminho):
+    """Deduz o formato pela extensão do arquivo (a mais longa que coincidir)."""
+    nome = caminho.lower()
+    candidatos = [formato for formato, (extensao, _) in FORMATOS.items() if nome.endswith(extensao)]
+    if not candidatos:
+        raise ValueError(f"Extensão não reconhecida em '{caminho}'. Use uma de: "
+                         + ", ".join(extensao for extensao, _ in FORMATOS.values()))
+    return max(candidatos, key=lambda formato: len(FORMATOS[formato][0]))
+
+
+def _blocos(dados, linhas_por_bloco, tarefa):
+    """Percorre os blocos de linhas, informando o progresso e interrompendo se a tarefa for cancelada."""
+    n = len(dados)
+    for inicio in range(0, max(n, 1), linhas_por_bloco):
+        if tarefa is not None and tarefa.cancelada:
+            raise CancelledError()
+        yield inicio, dados.iloc[inicio:inicio + linhas_por_bloco]
+        if tarefa is not None:
+            tarefa.informar_progresso(min(inicio + linhas_por_bloco, n) / max(n, 1))
+
+
+def _escrever_csv(dados, arquivo, linhas_por_bloco, tarefa):
+    with io.TextIOWrapper(arquivo, encoding="utf-8", newline="") as texto:
+        for inicio, bloco in _blocos(dados, linhas_por_bloco, tarefa):
+            bloco.to_csv(texto, index=False, header=inicio == 0)
+
+
+def _densificar(bloco):
+    """
+    Converte as colunas esparsas (a precipitação do modo compacto) no seu tipo
+    denso, que o Arrow aceita; as demais colunas não são copiadas.
+    """
+    esparsas = [coluna for coluna, tipo in bloco.dtypes.items() if isinstance(tipo, pd.SparseDtype)]
+    if not esparsas:
+        return bloco
+    return bloco.assign(**{coluna: bloco[coluna].sparse.to_dense() for coluna in esparsas})
+
+
+def _escrever_arrow(dados, caminho, formato, linhas_por_bloco, tarefa):
+    esquema = pa.Schema.from_pandas(_densificar(dados.iloc[:0]), preserve_index=False)
+    if formato == "parquet":
+        escritor = pq.ParquetWriter(caminho, esquema)
+    else:
+        # Feather v2 é o formato de arquivo IPC do Arrow
+        escritor = pa.ipc.new_file(caminho, esquema)
+    with escritor:
+        for _, bloco in _blocos(dados, linhas_por_bloco, tarefa):
+            escritor.write_table(pa.Table.from_pandas(_densificar(bloco), schema=esquema, preserve_index=False))
+
+
+def _tipo_npz(serie):
+    """O dtype com que a coluna é gravada no .npz, sem pickle (texto vira unicode de largura fixa)."""
+    tipo = serie.dtype
+    if isinstance(tipo, pd.SparseDtype):
+        tipo = tipo.subtype
+    if isinstance(tipo, np.dtype) and tipo != object:
+        return tipo
+    if pd.api.types.is_numeric_dtype(tipo) or pd.api.types.is_bool_dtype(tipo):
+        return np.dtype("float64")
+    largura = int(serie.astype(str).str.len().max()) if len(serie) else 1
+    return np.dtype(f"<U{max(largura, 1)}")
+
+
+def _escrever_npz(dados, arquivo, linhas_por_bloco, tarefa):
+    """
+    Grava um .npz (um .npy por coluna dentro de um zip) escrevendo cada coluna em
+    blocos, como `np.savez` faria com os arrays inteiros.
+    """
+    n = len(dados)
+    colunas = list(dados.columns)
+    tipos = {coluna: _tipo_npz(dados[coluna]) for coluna in colunas}
+    with zipfile.ZipFile(arquivo, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as zipado:
+        for i, coluna in enumerate(colunas):
+            with zipado.open(f"{coluna}.npy", mode="w", force_zip64=True) as destino:
+                np.lib.format.write_array_header_2_0(destino, {
+                    "descr": np.lib.format.dtype_to_descr(tipos[coluna]),
+                    "fortran_order": False,
+                    "shape": (n,),
+                })
+                serie = dados[coluna]
+                for _, bloco in _blocos(serie, linhas_por_bloco, None):
+                    if tarefa is not None and tarefa.cancelada:
+                        raise CancelledError()
+                    valores = bloco.to_numpy(dtype=tipos[coluna], na_value=np.nan) \
+                        if tipos[coluna].kind == "f" else bloco.to_numpy().astype(tipos[coluna])
+                    destino.write(np.ascontiguousarray(valores).tobytes())
+            if tarefa is not None:
+                tarefa.informar_progresso((i + 1) / len(colunas))
+
+
+@medir()
+def exportar(dados, caminho, formato=None, linhas_por_bloco=LINHAS_POR_BLOCO_EXPORTACAO, tarefa=None):
+    """
+    Exporta um DataFrame (por exemplo, o recorte do período) em blocos, com
+    escrita atômica.
+
+    Args:
+        dados (pd.DataFrame): Os dados a exportar.
+        caminho (str): O arquivo de destino.
+        formato (str, optional): Uma das chaves de `FORMATOS`. Deduzido da extensão se omitido.
+        linhas_por_bloco (int, optional): Linhas convertidas e escritas por vez.
+        tarefa (tarefas.Tarefa, optional): Recebe o progresso; se for cancelada,
+            a exportação para e o destino não é alterado.
+
+    Returns:
+        str: O caminho do arquivo gravado.
+
+    Raises:
+        ValueError: Se o formato não existir ou sua dependência opcional não estiver instalada.
+    """
+    formato = formato or formato_do_caminho(caminho)
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: '{formato}'.")
+    if formato not in formatos_disponiveis():
+        pacote = "zstandard" if formato == "csv.zst" else "pyarrow"
+        raise ValueError(f"O formato '{formato}' requer o pacote '{pacote}', que não está instalado.")
+
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        if formato in ("parquet", "feather"):
+            _escrever_arrow(dados, temporario, formato, linhas_por_bloco, tarefa)
+        else:
+            with open(temporario, "wb") as bruto:
+                if formato == "csv.gz":
+                    with gzip.GzipFile(fileobj=bruto, mode="wb", compresslevel=NIVEL_GZIP) as arquivo:
+                        _escrever_csv(dados, arquivo, linhas_por_bloco, tarefa)
+                elif formato == "csv.zst":
+                    compressor = zstandard.ZstdCompressor(level=NIVEL_ZSTD)
+                    with compressor.stream_writer(bruto, closefd=False) as arquivo:
+                        _escrever_csv(dados, arquivo, linhas_por_bloco, tarefa)
+                elif formato == "npz":
+                    _escrever_npz(dados, bruto, linhas_por_bloco, tarefa)
+                else:
+                    _escrever_csv(dados, bruto, linhas_por_bloco, tarefa)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return caminho
@@ -0,0 +1,277 @@
+import csv
+import io
+import unicodedata
+
+import pandas as pd
+
+import constantes as const
+from perfil import medir
+
+LIMITE_MEMORIA_PADRAO_MB = 256
+LINHAS_AMOSTRA = 200
+LINHAS_MINIMAS_POR_BLOCO = 1_000
+# Fator aproximado entre o tamanho do texto de uma linha e a memória usada ao analisá-la
+FATOR_MEMORIA_TEXTO = 4
+
+
+def normalizar_nome_coluna(nome_coluna):
+    """
+    Normaliza uma string para um formato de nome de coluna Pythonico.
+    - Remove acentos e caracteres especiais.
+    - Converte para minúsculas.
+    - Substitui espaços e outros caracteres por underscores.
+    """
+    nome_coluna = nome_coluna.strip().lower()
+    nome_coluna = unicodedata.normalize('NFKD', nome_coluna).encode('ASCII', 'ignore').decode('utf-8')
+    return nome_coluna.replace(" ", "_").replace("(", "").replace(")", "").replace("/", "_")
+
+
+def detectar_formato_data(amostras):
+    """
+    Descobre, entre os formatos de `constantes.FORMATOS_DATA`, o primeiro que
+    interpreta todas as amostras não vazias.
+
+    Args:
+        amostras (iterable): Valores de data em texto.
+
+    Returns:
+        str | None: O formato detectado ou None se nenhum servir.
+    """
+    amostras = pd.Series(list(amostras), dtype=object).dropna()
+    amostras = amostras[amostras.astype(str).str.strip() != ""]
+    if amostras.empty:
+        return None
+    for formato in const.FORMATOS_DATA:
+        try:
+            pd.to_datetime(amostras, format=formato)
+        except (ValueError, TypeError):
+            continue
+        return formato
+    return None
+
+
+def converter_datas(serie, formato=None):
+    """Converte uma série de textos em datas, usando o formato quando conhecido."""
+    if formato is None:
+        return pd.to_datetime(serie, errors="coerce")
+    return pd.to_datetime(serie, format=formato, errors="coerce")
+
+
+def _ler_amostra(caminho_csv):
+    """Lê o cabeçalho e algumas linhas iniciais do CSV, sem carregar o arquivo todo."""
+    with open(caminho_csv, newline="", encoding="utf-8-sig") as arquivo:
+        leitor = csv.reader(arquivo)
+        cabecalho = next(leitor)
+        linhas = []
+        bytes_lidos = len(",".join(cabecalho)) + 1
+        for linha in leitor:
+            linhas.append(linha)
+            bytes_lidos += len(",".join(linha)) + 1
+            if len(linhas) >= LINHAS_AMOSTRA:
+                break
+    bytes_por_linha = bytes_lidos / max(len(linhas) + 1, 1)
+    return cabecalho, linhas, bytes_por_linha
+
+
+def calcular_linhas_por_bloco(bytes_por_linha, n_colunas, limite_memoria_mb=LIMITE_MEMORIA_PADRAO_MB):
+    """
+    Estima quantas linhas cabem em um bloco sem ultrapassar o orçamento de memória.
+
+    Args:
+        bytes_por_linha (float): Tamanho médio de uma linha no arquivo.
+        n_colunas (int): Número de colunas do arquivo.
+        limite_memoria_mb (float, optional): Orçamento de memória para cada bloco.
+
+    Returns:
+        int: O número de linhas por bloco.
+    """
+    custo_linha = bytes_por_linha * FATOR_MEMORIA_TEXTO + n_colunas * 8
+    linhas = int(limite_memoria_mb * 1024 * 1024 // max(custo_linha, 1))
+    return max(linhas, LINHAS_MINIMAS_POR_BLOCO)
+
+
+def detectar_formato_csv(caminho_csv):
+    """
+    Detecta o formato da coluna de data (ver `detectar_formato_data`) nas
+    primeiras linhas do CSV, sem carregar o arquivo todo.
+
+    Returns:
+        str | None: O formato detectado ou None se não houver coluna de data ou nenhum formato servir.
+    """
+    cabecalho, amostra, _ = _ler_amostra(caminho_csv)
+    return _formato_da_amostra([normalizar_nome_coluna(col) for col in cabecalho], amostra)
+
+
+def _formato_da_amostra(colunas, amostra):
+    if const.COL_DATA not in colunas:
+        return None
+    indice_data = colunas.index(const.COL_DATA)
+    return detectar_formato_data(linha[indice_data] for linha in amostra if len(linha) > indice_data)
+
+
+class LeituraEmBlocos:
+    """
+    Leitura de um CSV em blocos, com os nomes de colunas normalizados uma única
+    vez e as medições convertidas para os tipos de `constantes.TIPOS_COLUNAS`
+    (float32). Percorrer o objeto produz os blocos, um DataFrame por vez.
+
+    O formato da data é detectado nas primeiras linhas (`formato_data`); as
+    datas preenchidas que não seguem esse formato viram NaT e são contadas em
+    `datas_invalidas` à medida que os blocos são lidos. Valores de medição que
+    não são números (um texto perdido no meio do arquivo) viram NaN.
+    """
+    def __init__(self, caminho_csv, limite_memoria_mb=LIMITE_MEMORIA_PADRAO_MB, formato_data=None):
+        """
+        Args:
+            caminho_csv (str): O caminho do arquivo CSV.
+            limite_memoria_mb (float, optional): Orçamento de memória para cada bloco.
+            formato_data (str, optional): Formato da coluna de data. Detectado se omitido.
+        """
+        self.caminho_csv = caminho_csv
+        cabecalho, amostra, bytes_por_linha = _ler_amostra(caminho_csv)
+        self.colunas = [normalizar_nome_coluna(col) for col in cabecalho]
+        self.formato_data = formato_data or _formato_da_amostra(self.colunas, amostra)
+        self.datas_invalidas = 0
+        self.linhas_por_bloco = calcular_linhas_por_bloco(bytes_por_linha, len(self.colunas), limite_memoria_mb)
+
+    def __iter__(self):
+        tipos = {col: tipo for col, tipo in const.TIPOS_COLUNAS.items() if col in self.colunas}
+        # As medições são lidas com o tipo que o leitor inferir (float64, ou texto
+        # se houver um valor inválido no bloco) e só então convertidas
+        leitor = pd.read_csv(
+            self.caminho_csv,
+            header=0,
+            names=self.colunas,
+            dtype={const.COL_DATA: object} if const.COL_DATA in self.colunas else None,
+            chunksize=self.linhas_por_bloco,
+        )
+        with leitor:
+            for bloco in leitor:
+                for coluna, tipo in tipos.items():
+                    bloco[coluna] = pd.to_numeric(bloco[coluna], errors="coerce").astype(tipo)
+                if const.COL_DATA in bloco.columns:
+                    textos = bloco[const.COL_DATA]
+                    datas = converter_datas(textos, self.formato_data)
+                    self.datas_invalidas += int((datas.isna() & textos.notna()).sum())
+                    bloco[const.COL_DATA] = datas
+                yield bloco
+
+
+def ler_em_blocos(caminho_csv, limite_memoria_mb=LIMITE_MEMORIA_PADRAO_MB, formato_data=None):
+    """
+    Lê um CSV em blocos (ver `LeituraEmBlocos`).
+
+    Args:
+        caminho_csv (str): O caminho do arquivo CSV.
+        limite_memoria_mb (float, optional): Orçamento de memória para cada bloco.
+        formato_data (str, optional): Formato da coluna de data. Detectado se omitido.
+
+    Returns:
+        LeituraEmBlocos: Iterável com os blocos já normalizados e com as datas
+        convertidas; depois de percorrido, informa o formato da data e as datas inválidas.
+    """
+    return LeituraEmBlocos(caminho_csv, limite_memoria_mb, formato_data)
+
+
+@medir()
+def carregar_em_blocos(caminho_csv, limite_memoria_mb=LIMITE_MEMORIA_PADRAO_MB, formato_data=None):
+    """
+    Carrega um CSV inteiro por meio de `ler_em_blocos`, juntando os blocos no final.
+
+    O limite de memória vale para a análise do texto de cada bloco, não para o
+    resultado: o DataFrame completo fica em memória (cerca de 4 bytes por
+    medição e 8 pela data, por linha) e, enquanto os blocos são juntados, eles e
+    o resultado coexistem, de modo que o pico é de cerca do dobro do DataFrame
+    final. Para arquivos que não cabem em memória, use o armazém colunar
+    (`armazem.criar_armazem`), que grava cada bloco em disco.
+
+    Returns:
+        tuple: (DataFrame completo com as medições em float32, formato da data
+        detectado, quantidade de datas preenchidas que não puderam ser interpretadas).
+    """
+    leitura = ler_em_blocos(caminho_csv, limite_memoria_mb, formato_data)
+    blocos = list(leitura)
+    if not blocos:
+        return pd.DataFrame(columns=leitura.colunas), leitura.formato_data, 0
+    return pd.concat(blocos, ignore_index=True), leitura.formato_data, leitura.datas_invalidas
+
+
+def ler_cabecalho(caminho_csv):
+    """Retorna os nomes normalizados das colunas do CSV, lendo apenas a primeira linha."""
+    cabecalho, _, _ = _ler_amostra(caminho_csv)
+    return [normalizar_nome_coluna(col) for col in cabecalho]
+
+
+def fim_ultima_linha(caminho_csv, tamanho):
+    """
+    Posição logo após a última quebra de linha nos primeiros `tamanho` bytes do
+    arquivo: o ponto a partir do qual linhas acrescentadas devem ser lidas.
+    """
+    passo = 1 << 16
+    with open(caminho_csv, "rb") as arquivo:
+        fim = tamanho
+        while fim > 0:
+            inicio = max(fim - passo, 0)
+            arquivo.seek(inicio)
+            bloco = arquivo.read(fim - inicio)
+            posicao = bloco.rfind(b"\n")
+            if posicao >= 0:
+                return inicio + posicao + 1
+            fim = inicio
+    return 0
+
+
+def ler_linhas_novas(caminho_csv, deslocamento, colunas, formato_data=None, ja_lidos=0):
+    """
+    Lê apenas as linhas completas acrescentadas ao CSV a partir do byte
+    `deslocamento`; uma última linha ainda sem quebra de linha fica para a próxima
+    leitura.
+
+    Args:
+        caminho_csv (str): O caminho do arquivo CSV.
+        deslocamento (int): Onde terminou a leitura anterior (início de uma linha).
+        colunas (list): Os nomes normalizados das colunas.
+        formato_data (str, optional): Formato da coluna de data. Detectado se omitido.
+        ja_lidos (int, optional): Bytes após `deslocamento` que já foram carregados:
+            uma última linha sem quebra de linha, que o pandas lê mesmo assim. Ela
+            é pulada quando a quebra chega, sem ser lida de novo.
+
+    Returns:
+        tuple: (DataFrame com as novas linhas, novo deslocamento).
+
+    Raises:
+        ValueError: Se o arquivo encolheu ou foi reescrito desde a leitura anterior.
+    """
+    with open(caminho_csv, "rb") as arquivo:
+        if deslocamento > 0:
+            arquivo.seek(deslocamento - 1)
+            if arquivo.read(1) != b"\n":
+                raise ValueError(f"O arquivo '{caminho_csv}' foi reescrito desde a última leitura.")
+        novos = arquivo.read()
+    if ja_lidos:
+        if len(novos) <= ja_lidos:
+            if len(novos) < ja_lidos:
+                raise ValueError(f"O arquivo '{caminho_csv}' foi reescrito desde a última leitura.")
+            return pd.DataFrame(columns=colunas), deslocamento
+        if novos[ja_lidos:ja_lidos + 1] not in (b"\n", b"\r"):
+            # A última linha, já carregada, foi estendida em vez de terminada
+            raise ValueError(f"O arquivo '{caminho_csv}' foi reescrito desde a última leitura.")
+        pulados = novos.find(b"\n", ja_lidos) + 1
+        if pulados == 0:
+            return pd.DataFrame(columns=colunas), deslocamento
+        novos = novos[pulados:]
+        deslocamento += pulados
+    fim = novos.rfind(b"\n") + 1
+    if fim == 0:
+        return pd.DataFrame(columns=colunas), deslocamento
+
+    tipos = {col: object for col in colunas}
+    bloco = pd.read_csv(io.BytesIO(novos[:fim]), header=None, names=colunas, dtype=tipos, encoding="utf-8")
+    for coluna in const.COLUNAS_NUMERICAS:
+        if coluna in bloco.columns:
+            bloco[coluna] = pd.to_numeric(bloco[coluna], errors="coerce")
+    if const.COL_DATA in bloco.columns:
+        if formato_data is None:
+            formato_data = detectar_formato_data(bloco[const.COL_DATA].head(LINHAS_AMOSTRA))
+        bloco[const.COL_DATA] = converter_datas(bloco[const.COL_DATA], formato_data)
+    return bloco, deslocamento + fim
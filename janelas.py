@@ -0,0 +1,202 @@
+"""
+Estatísticas em janelas móveis (média, soma, desvio padrão, mínimo e máximo)
+sobre uma série ordenada pela data, com janelas por quantidade de leituras
+(`24`) ou por tempo (`"24h"`, `"7D"`), no mesmo sentido de `DataFrame.rolling`:
+a janela de cada linha termina nela e, se for por tempo, cobre o intervalo
+(t - janela, t].
+
+Tudo é vetorizado:
+
+* média, soma e desvio padrão saem de somas acumuladas, calculadas uma única
+  vez para todas as janelas pedidas (como em `agregados.IndicePrefixo`);
+* mínimo e máximo em janelas de tamanho fixo usam o algoritmo de van Herk /
+  Gil-Werman (extremos acumulados dentro de blocos do tamanho da janela), em
+  O(n) para qualquer tamanho. Janelas por tempo sobre datas regulares também têm
+  tamanho fixo; com lacunas, uma tabela esparsa (extremos de trechos de 2^k
+  linhas) responde cada janela com duas consultas, montada em blocos de linhas
+  para limitar a memória e compartilhada entre as janelas.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+ESTATISTICAS_JANELA = ("media", "soma", "desvio_padrao", "minimo", "maximo")
+ROTULOS_ESTATISTICAS = {
+    "media": "Média", "soma": "Soma", "desvio_padrao": "Desvio padrão", "minimo": "Mínimo", "maximo": "Máximo",
+}
+# Linhas por bloco da tabela esparsa das janelas por tempo
+LINHAS_POR_BLOCO_JANELA = 1 << 18
+
+
+def eh_janela_temporal(janela):
+    """Indica se a janela é uma duração (texto como "24h" ou timedelta) e não uma quantidade de linhas."""
+    return isinstance(janela, (str, datetime.timedelta, np.timedelta64))
+
+
+def _duracao(janela):
+    duracao = pd.Timedelta(janela)
+    if duracao <= pd.Timedelta(0):
+        raise ValueError(f"A janela deve ser positiva: '{janela}'.")
+    return duracao.to_timedelta64()
+
+
+def inicios_janela(datas, janela):
+    """
+    A primeira linha da janela que termina em cada linha.
+
+    Args:
+        datas (np.ndarray): Datas (datetime64) em ordem crescente, sem NaT.
+        janela (int | str | timedelta): Quantidade de linhas ou duração.
+
+    Returns:
+        np.ndarray: Para cada linha i, a posição da primeira linha da sua janela.
+
+    Raises:
+        ValueError: Se a janela não for positiva.
+    """
+    if eh_janela_temporal(janela):
+        return np.searchsorted(datas, datas - _duracao(janela), side="right")
+    if int(janela) < 1:
+        raise ValueError(f"A janela deve ter ao menos uma linha: {janela}.")
+    return np.maximum(np.arange(len(datas)) - (int(janela) - 1), 0)
+
+
+def primeira_linha_janela(datas, janela, posicao):
+    """A primeira linha da janela que termina na linha `posicao` (ver `inicios_janela`)."""
+    if eh_janela_temporal(janela):
+        return int(np.searchsorted(datas, datas[posicao] - _duracao(janela), side="right"))
+    return max(posicao - (int(janela) - 1), 0)
+
+
+def _tamanho_fixo(inicios):
+    """Se toda janela tem o mesmo tamanho L (truncada só no começo da série), retorna L; senão None."""
+    n = len(inicios)
+    if n == 0:
+        return 1
+    tamanho = int(np.arange(n)[-1] - inicios[-1] + 1)
+    if np.array_equal(inicios, np.maximum(np.arange(n) - (tamanho - 1), 0)):
+        return tamanho
+    return None
+
+
+def _extremo_tamanho_fixo(valores, tamanho, funcao):
+    """
+    Extremo das janelas de `tamanho` linhas (van Herk / Gil-Werman): com os
+    extremos acumulados de cada bloco de `tamanho` linhas da esquerda para a
+    direita (g) e da direita para a esquerda (h), a janela [i - tamanho + 1, i]
+    é a união de um sufixo de um bloco com um prefixo do seguinte.
+    """
+    n = len(valores)
+    if tamanho == 1 or n == 0:
+        return valores.copy()
+    completos = np.full(-(-n // tamanho) * tamanho, np.nan)
+    completos[:n] = valores
+    blocos = completos.reshape(-1, tamanho)
+    g = funcao.accumulate(blocos, axis=1).ravel()[:n]
+    h = funcao.accumulate(blocos[:, ::-1], axis=1)[:, ::-1].ravel()
+    inicios = np.arange(n) - (tamanho - 1)
+    # No começo da série a janela está toda no primeiro bloco: basta g
+    return np.where(inicios >= 0, funcao(h[np.maximum(inicios, 0)], g), g)
+
+
+def _extremos_tabela_esparsa(valores, lista_inicios, funcao):
+    """
+    Extremo das janelas [inicios[i], i] de várias janelas de tamanho variável,
+    com uma tabela esparsa montada bloco a bloco e usada por todas elas.
+    """
+    n = len(valores)
+    resultados = [np.empty(n) for _ in lista_inicios]
+    for a in range(0, n, LINHAS_POR_BLOCO_JANELA):
+        b = min(a + LINHAS_POR_BLOCO_JANELA, n)
+        base = min(int(inicios[a]) for inicios in lista_inicios)
+        fins = np.arange(a, b) - base
+        comprimentos = [fins - (inicios[a:b] - base) + 1 for inicios in lista_inicios]
+        # niveis[k][j] = extremo de valores[base + j : base + j + 2^k]
+        niveis = [valores[base:b]]
+        maior = max(int(c.max()) for c in comprimentos)
+        while (1 << len(niveis)) <= maior:
+            anterior, meio = niveis[-1], 1 << (len(niveis) - 1)
+            niveis.append(funcao(anterior[:-meio], anterior[meio:]))
+        for resultado, inicios, comprimento in zip(resultados, lista_inicios, comprimentos):
+            # floor(log2(comprimento)), exato para inteiros
+            ordens = np.frexp(comprimento.astype(np.float64))[1] - 1
+            trecho = resultado[a:b]
+            for k in np.unique(ordens):
+                sel = ordens == k
+                esquerda = niveis[k][inicios[a:b][sel] - base]
+                direita = niveis[k][fins[sel] - (1 << int(k)) + 1]
+                trecho[sel] = funcao(esquerda, direita)
+    return resultados
+
+
+def calcular_janelas(datas, valores, janelas, estatisticas=("media",), minimo_observacoes=None):
+    """
+    Calcula várias estatísticas em várias janelas de uma vez.
+
+    Args:
+        datas (np.ndarray): Datas (datetime64) em ordem crescente, sem NaT. Só são
+            usadas nas janelas por tempo.
+        valores (np.ndarray): Os valores da série (float, NaN nos ausentes).
+        janelas (list): Quantidades de linhas (int) e/ou durações ("24h", "7D", timedelta).
+        estatisticas (list, optional): Entre `ESTATISTICAS_JANELA`. Padrão é só a média.
+        minimo_observacoes (int, optional): Valores não ausentes necessários para a
+            janela ter resultado. Como em `rolling`, o padrão é o tamanho da janela
+            nas janelas por quantidade e 1 nas janelas por tempo.
+
+    Returns:
+        pd.DataFrame: Uma coluna "<estatistica>_<janela>" por combinação, alinhada às linhas.
+
+    Raises:
+        ValueError: Se uma estatística for desconhecida ou uma janela não for positiva.
+    """
+    desconhecidas = [e for e in estatisticas if e not in ESTATISTICAS_JANELA]
+    if desconhecidas:
+        raise ValueError(f"Estatísticas desconhecidas: {desconhecidas}. Use {list(ESTATISTICAS_JANELA)}.")
+    valores = np.asarray(valores, dtype=np.float64)
+    n = len(valores)
+    lista_inicios = [inicios_janela(datas, janela) for janela in janelas]
+    posicoes = np.arange(n) + 1
+
+    # Somas acumuladas (com zero à frente) dos valores deslocados pela média
+    nulos = np.isnan(valores)
+    deslocamento = float(np.nanmean(valores)) if not nulos.all() else 0.0
+    centrados = np.where(nulos, 0.0, valores - deslocamento)
+    contagens = np.concatenate(([0], np.cumsum(~nulos)))
+    somas = np.concatenate(([0.0], np.cumsum(centrados)))
+    quadrados = np.concatenate(([0.0], np.cumsum(centrados * centrados)))
+
+    extremos = {}
+    for estatistica, funcao in (("minimo", np.fmin), ("maximo", np.fmax)):
+        if estatistica not in estatisticas:
+            continue
+        tamanhos = [_tamanho_fixo(inicios) for inicios in lista_inicios]
+        variaveis = [i for i, tamanho in enumerate(tamanhos) if tamanho is None]
+        por_janela = dict(zip(variaveis, _extremos_tabela_esparsa(
+            valores, [lista_inicios[i] for i in variaveis], funcao))) if variaveis else {}
+        for i, tamanho in enumerate(tamanhos):
+            if tamanho is not None:
+                por_janela[i] = _extremo_tamanho_fixo(valores, tamanho, funcao)
+        extremos[estatistica] = por_janela
+
+    resultado = {}
+    for i, (janela, inicios) in enumerate(zip(janelas, lista_inicios)):
+        minimo = minimo_observacoes
+        if minimo is None:
+            minimo = 1 if eh_janela_temporal(janela) else int(janela)
+        contagem = contagens[posicoes] - contagens[inicios]
+        soma_centrada = somas[posicoes] - somas[inicios]
+        suficiente = contagem >= max(minimo, 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media_centrada = soma_centrada / contagem
+            variancia = (quadrados[posicoes] - quadrados[inicios] - soma_centrada * media_centrada) / (contagem - 1)
+        calculos = {
+            "media": lambda: media_centrada + deslocamento,
+            "soma": lambda: soma_centrada + contagem * deslocamento,
+            "desvio_padrao": lambda: np.where(contagem > 1, np.sqrt(np.maximum(variancia, 0.0)), np.nan),
+            "minimo": lambda: extremos["minimo"][i],
+            "maximo": lambda: extremos["maximo"][i],
+        }
+        for estatistica in estatisticas:
+            resultado[f"{estatistica}_{janela}"] = np.where(suficiente, calculos[estatistica](), np.nan)
+    return pd.DataFrame(resultado)
@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from janelas import calcular_janelas
+
+ROLLING = {"media": "mean", "soma": "sum", "desvio_padrao": "std", "minimo": "min", "maximo": "max"}
+
+
+def serie_com_lacunas(n=3000, semente=0):
+    """Leituras a cada 10 minutos, com valores ausentes e lacunas de algumas horas."""
+    rng = np.random.default_rng(semente)
+    passos = np.where(rng.random(n) < 0.01, rng.integers(2, 40, n), 1)
+    datas = pd.Timestamp("2025-01-01") + pd.to_timedelta(np.cumsum(passos) * 10, unit="min")
+    valores = 20 + 5 * np.sin(np.arange(n) / 50) + rng.standard_normal(n)
+    valores[rng.random(n) < 0.05] = np.nan
+    return pd.Series(valores, index=pd.DatetimeIndex(datas))
+
+
+class TestCalcularJanelas(unittest.TestCase):
+    def setUp(self):
+        self.serie = serie_com_lacunas()
+        self.datas = self.serie.index.to_numpy()
+        self.valores = self.serie.to_numpy()
+
+    def conferir(self, janelas, minimo_observacoes=None):
+        obtido = calcular_janelas(self.datas, self.valores, janelas, list(ROLLING), minimo_observacoes)
+        for janela in janelas:
+            rolagem = self.serie.rolling(janela, min_periods=minimo_observacoes)
+            for estatistica, metodo in ROLLING.items():
+                with self.subTest(janela=janela, estatistica=estatistica):
+                    esperado = getattr(rolagem, metodo)().to_numpy()
+                    np.testing.assert_allclose(obtido[f"{estatistica}_{janela}"], esperado, rtol=1e-9, atol=1e-9)
+
+    def test_janelas_por_quantidade_iguais_ao_rolling(self):
+        self.conferir([1, 6, 144])
+
+    def test_janelas_por_tempo_iguais_ao_rolling(self):
+        self.conferir(["1h", "24h", "7D"])
+
+    def test_minimo_de_observacoes(self):
+        self.conferir([12, "2h"], minimo_observacoes=3)
+
+    def test_estatistica_desconhecida(self):
+        with self.assertRaises(ValueError):
+            calcular_janelas(self.datas, self.valores, [3], ["mediana"])
+
+
+if __name__ == "__main__":
+    unittest.main()
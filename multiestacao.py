@@ -0,0 +1,301 @@
+import glob
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analisador import AnalisadorClimatico, formatar_analise_mensal
+from covariancia import CoMomentos
+from eventos import COLUNAS_EVENTOS
+from quantis import EsbocoQuantis
+import constantes as const
+
+# Analisadores já carregados em cada processo de trabalho, para que chamadas
+# seguintes sobre a mesma estação não releiam o arquivo. Guarda só os usados
+# mais recentemente: cada um mantém a estação inteira em memória.
+MAX_ANALISADORES_POR_PROCESSO = 4
+_ANALISADORES_DO_PROCESSO = OrderedDict()
+
+
+def listar_estacoes(origem):
+    """
+    Resolve a origem dos dados em uma lista ordenada de arquivos CSV.
+
+    Args:
+        origem (str | list): Um diretório (todos os *.csv dele), um padrão glob
+            ou uma lista de caminhos.
+
+    Returns:
+        list: Os caminhos dos arquivos CSV encontrados.
+    """
+    if isinstance(origem, (list, tuple)):
+        return list(origem)
+    if os.path.isdir(origem):
+        return sorted(glob.glob(os.path.join(origem, "*.csv")))
+    return sorted(glob.glob(origem))
+
+
+def nome_estacao(caminho_csv):
+    """Nome da estação: o nome do arquivo, sem a extensão."""
+    return os.path.splitext(os.path.basename(caminho_csv))[0]
+
+
+def nomes_estacoes(caminhos):
+    """
+    Nomes únicos das estações: o nome do arquivo (ver `nome_estacao`) ou, para
+    arquivos de mesmo nome em pastas diferentes, o caminho relativo à pasta
+    comum a eles, sem a extensão (por exemplo, "sul/e0" e "norte/e0").
+
+    Returns:
+        dict: caminho -> nome.
+
+    Raises:
+        ValueError: Se o mesmo arquivo aparecer mais de uma vez.
+    """
+    absolutos = [os.path.abspath(caminho) for caminho in caminhos]
+    if len(set(absolutos)) != len(absolutos):
+        repetidos = sorted({c for c in absolutos if absolutos.count(c) > 1})
+        raise ValueError(f"Arquivos de estação repetidos: {repetidos}.")
+    por_nome = {}
+    for caminho, absoluto in zip(caminhos, absolutos):
+        por_nome.setdefault(nome_estacao(caminho), []).append((caminho, absoluto))
+    nomes = {}
+    for nome, grupo in por_nome.items():
+        if len(grupo) == 1:
+            nomes[grupo[0][0]] = nome
+            continue
+        base = os.path.commonpath([os.path.dirname(absoluto) for _, absoluto in grupo])
+        for caminho, absoluto in grupo:
+            relativo = os.path.splitext(os.path.relpath(absoluto, base))[0]
+            nomes[caminho] = relativo.replace(os.sep, "/")
+    return nomes
+
+
+def obter_analisador(caminho_csv):
+    """
+    Retorna o analisador da estação, reaproveitando-o se o arquivo não mudou.
+    Se o arquivo apenas cresceu, o analisador anterior incorpora as linhas novas
+    (ver `AnalisadorClimatico.atualizar`) em vez de ser recriado. Cada processo
+    guarda no máximo MAX_ANALISADORES_POR_PROCESSO analisadores, descartando o
+    usado há mais tempo.
+    """
+    info = os.stat(caminho_csv)
+    chave = (caminho_csv, info.st_size, info.st_mtime_ns)
+    if chave not in _ANALISADORES_DO_PROCESSO:
+        analisador = None
+        for antiga in [c for c in _ANALISADORES_DO_PROCESSO if c[0] == caminho_csv]:
+            anterior = _ANALISADORES_DO_PROCESSO.pop(antiga)
+            if antiga[1] < info.st_size:
+                try:
+                    anterior.atualizar()
+                    analisador = anterior
+                except ValueError:
+                    pass
+        _ANALISADORES_DO_PROCESSO[chave] = analisador or AnalisadorClimatico(caminho_csv)
+        while len(_ANALISADORES_DO_PROCESSO) > MAX_ANALISADORES_POR_PROCESSO:
+            _ANALISADORES_DO_PROCESSO.popitem(last=False)
+    _ANALISADORES_DO_PROCESSO.move_to_end(chave)
+    return _ANALISADORES_DO_PROCESSO[chave]
+
+
+def _tarefa_estatisticas(caminho_csv, data_inicio, data_fim):
+    """Estatísticas de uma estação e os resumos parciais necessários para combiná-las."""
+    analisador = obter_analisador(caminho_csv)
+    estatisticas, _ = analisador.gerar_estatisticas(data_inicio, data_fim)
+    esboco = analisador.gerar_esboco_quantis(const.COL_TEMP, data_inicio, data_fim)
+    return estatisticas, analisador.gerar_momentos(data_inicio, data_fim), esboco
+
+
+def _tarefa_analise_mensal(caminho_csv, data_inicio, data_fim):
+    """Agregação mensal (contagens, somas, mínimos e máximos) de uma estação."""
+    return obter_analisador(caminho_csv).gerar_analise_periodica("mensal", data_inicio, data_fim)
+
+
+def _tarefa_maiores_indices(caminho_csv, coluna, n, data_inicio, data_fim):
+    """Os N maiores valores de uma coluna em uma estação, no período."""
+    return obter_analisador(caminho_csv).buscar_maiores_indices(coluna, n, data_inicio, data_fim)
+
+
+def _tarefa_comomentos(caminho_csv, data_inicio, data_fim):
+    """Co-momentos das colunas numéricas de uma estação no período."""
+    return obter_analisador(caminho_csv).gerar_comomentos(data_inicio, data_fim)
+
+
+def _tarefa_eventos(caminho_csv, tipos, data_inicio, data_fim, definicoes):
+    """Eventos de dias consecutivos de uma estação no período."""
+    return obter_analisador(caminho_csv).gerar_eventos(tipos, data_inicio, data_fim, definicoes)
+
+
+def _combinar_momentos(momentos):
+    """
+    Combina contagem, média e desvio padrão de várias estações (fórmula de Chan)
+    no total, média e desvio padrão do conjunto.
+    """
+    momentos = [m for m in momentos if m["contagem"] > 0]
+    if not momentos:
+        return {"contagem": 0, "soma": 0.0, "media": np.nan, "desvio_padrao": np.nan}
+    contagem = sum(m["contagem"] for m in momentos)
+    soma = sum(m["soma"] for m in momentos)
+    media = soma / contagem
+    desvios_quadrados = sum(
+        m["desvio_padrao"] ** 2 * m["contagem"] + m["contagem"] * (m["media"] - media) ** 2
+        for m in momentos
+    )
+    return {
+        "contagem": contagem,
+        "soma": soma,
+        "media": media,
+        "desvio_padrao": float(np.sqrt(desvios_quadrados / contagem)),
+    }
+
+
+class AnalisadorMultiEstacao:
+    """
+    Analisa várias estações (um CSV por estação) em paralelo, com um pool de
+    processos. Cada processo carrega e analisa suas estações e devolve apenas
+    resumos pequenos (estatísticas, agregados mensais, esboços de quantis, os N
+    maiores valores e os eventos), que são combinados no processo principal.
+    """
+    def __init__(self, origem, max_processos=None):
+        """
+        Args:
+            origem (str | list): Diretório, padrão glob ou lista de arquivos CSV.
+            max_processos (int, optional): Tamanho do pool. Padrão é o número de núcleos.
+        """
+        self.caminhos = listar_estacoes(origem)
+        if not self.caminhos:
+            raise FileNotFoundError(f"Nenhum arquivo CSV encontrado em '{origem}'.")
+        self.nomes = nomes_estacoes(self.caminhos)
+        self.max_processos = max_processos
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def fechar(self):
+        """Encerra o pool de processos."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _executar(self, tarefa, *args):
+        """Executa a tarefa para todas as estações em paralelo e retorna nome -> resultado."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_processos)
+        futuros = {
+            self.nomes[caminho]: self._executor.submit(tarefa, caminho, *args)
+            for caminho in self.caminhos
+        }
+        return {nome: futuro.result() for nome, futuro in futuros.items()}
+
+    def gerar_estatisticas(self, data_inicio=None, data_fim=None):
+        """
+        Calcula as estatísticas do período em cada estação e no conjunto.
+
+        As médias, o total e o desvio padrão combinados são exatos; os percentis
+        combinados vêm da fusão dos esboços de quantis das estações.
+
+        Returns:
+            tuple: (estatísticas combinadas, dicionário estação -> estatísticas).
+        """
+        resultados = self._executar(_tarefa_estatisticas, data_inicio, data_fim)
+        por_estacao = {nome: estatisticas for nome, (estatisticas, _, _) in resultados.items()}
+        if not any(por_estacao.values()):
+            return {}, por_estacao
+
+        def combinado(coluna):
+            return _combinar_momentos([momentos[coluna] for _, momentos, _ in resultados.values()])
+
+        esboco = EsbocoQuantis.combinar([esboco for _, _, esboco in resultados.values()])
+        percentil_25, percentil_75 = esboco.percentil([25, 75])
+        estatisticas = {
+            "Temperatura Média (°C)": combinado(const.COL_TEMP)["media"],
+            "Umidade Média (%)": combinado(const.COL_UMIDADE)["media"],
+            "Velocidade Média do Vento (km/h)": combinado(const.COL_VENTO)["media"],
+            "Precipitação Total (mm)": combinado(const.COL_PRECIP)["soma"],
+            "Desvio Padrão Temp. (°C)": combinado(const.COL_TEMP)["desvio_padrao"],
+            "Temperatura (Percentil 25)": percentil_25,
+            "Temperatura (Percentil 75)": percentil_75,
+        }
+        return estatisticas, por_estacao
+
+    def gerar_analise_mensal(self, data_inicio=None, data_fim=None):
+        """
+        Gera a análise mensal do período em cada estação e no conjunto (médias
+        ponderadas pelo número de medições de cada estação).
+
+        Returns:
+            tuple: (análise combinada, dicionário estação -> análise mensal).
+        """
+        resultados = self._executar(_tarefa_analise_mensal, data_inicio, data_fim)
+        por_estacao = {nome: formatar_analise_mensal(analise) for nome, analise in resultados.items()}
+        agregados = [analise for analise in resultados.values() if not analise.empty]
+        if not agregados:
+            return pd.DataFrame(), por_estacao
+
+        juntos = pd.concat(agregados, ignore_index=True)
+        regras = {
+            col: ("sum" if col.endswith(("_contagem", "_soma")) else "min" if col.endswith("_minimo") else "max")
+            for col in juntos.columns
+            if col.endswith(("_contagem", "_soma", "_minimo", "_maximo"))
+        }
+        combinado = juntos.groupby(const.COL_DATA, as_index=False).agg(regras)
+        for coluna in const.COLUNAS_NUMERICAS:
+            if f"{coluna}_soma" in combinado.columns:
+                contagem = combinado[f"{coluna}_contagem"]
+                combinado[f"{coluna}_media"] = (combinado[f"{coluna}_soma"] / contagem).where(contagem > 0)
+        return formatar_analise_mensal(combinado), por_estacao
+
+    def gerar_matriz_correlacao(self, data_inicio=None, data_fim=None):
+        """
+        Calcula a matriz de correlação do período em cada estação e no conjunto
+        (todas as leituras das estações juntas), combinando os co-momentos de
+        cada estação (ver `covariancia`) sem reunir as linhas.
+
+        Returns:
+            tuple: (matriz combinada, dicionário estação -> matriz).
+        """
+        resultados = self._executar(_tarefa_comomentos, data_inicio, data_fim)
+        por_estacao = {nome: comomentos.correlacao() for nome, comomentos in resultados.items()}
+        if not resultados:
+            return pd.DataFrame(), por_estacao
+        colunas = next(iter(resultados.values())).colunas
+        combinado = CoMomentos.combinar([c for c in resultados.values() if c.colunas == colunas])
+        return combinado.correlacao(), por_estacao
+
+    def gerar_eventos(self, tipos=None, data_inicio=None, data_fim=None, definicoes=None):
+        """
+        Detecta os eventos de dias consecutivos (ondas de calor, períodos secos
+        etc., ver `eventos`) do período em cada estação, em paralelo.
+
+        Returns:
+            tuple: (todos os eventos, com a coluna "estacao", ordenados pelo início;
+            dicionário estação -> eventos da estação).
+        """
+        por_estacao = self._executar(_tarefa_eventos, tipos, data_inicio, data_fim, definicoes)
+        encontrados = [df.assign(estacao=nome) for nome, df in por_estacao.items() if not df.empty]
+        if not encontrados:
+            return pd.DataFrame(columns=COLUNAS_EVENTOS + ["estacao"]), por_estacao
+        combinado = pd.concat(encontrados, ignore_index=True)
+        return combinado.sort_values(["inicio", "estacao"], kind="stable", ignore_index=True), por_estacao
+
+    def buscar_maiores_indices(self, coluna, n=5, data_inicio=None, data_fim=None):
+        """
+        Busca os N maiores valores de uma coluna em cada estação e no conjunto,
+        no período ou em todos os dados.
+
+        Returns:
+            tuple: (os N maiores do conjunto, com a coluna "estacao";
+            dicionário estação -> os N maiores da estação).
+        """
+        por_estacao = self._executar(_tarefa_maiores_indices, coluna, n, data_inicio, data_fim)
+        candidatos = [df.assign(estacao=nome) for nome, df in por_estacao.items() if not df.empty]
+        if not candidatos:
+            return pd.DataFrame(columns=[const.COL_DATA, coluna, "estacao"]), por_estacao
+        combinado = pd.concat(candidatos, ignore_index=True).nlargest(n, coluna).reset_index(drop=True)
+        return combinado, por_estacao
@@ -0,0 +1,209 @@
+"""
+Instrumentação opcional dos caminhos mais custosos (carga, análises, gráficos e
+desenho dos canvas), ativada pela variável de ambiente CLIMA_PERFIL:
+
+    CLIMA_PERFIL=1          intervalos de tempo aninhados e variação do RSS
+    CLIMA_PERFIL=memoria    idem, com a variação de memória medida pelo tracemalloc
+    CLIMA_PERFIL=cprofile   idem, e cada intervalo externo roda sob o cProfile
+
+Desativada (o padrão), `medir` devolve a própria função decorada e `intervalo`
+não faz nada, sem custo nos caminhos instrumentados.
+"""
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+MODO = os.environ.get("CLIMA_PERFIL", "").strip().lower()
+ATIVO = MODO not in ("", "0", "nao", "não", "false")
+COM_CPROFILE = MODO == "cprofile"
+MAXIMO_INTERVALOS = 100_000
+
+if ATIVO and MODO == "memoria":
+    tracemalloc.start()
+
+_PAGINA_BYTES = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _memoria_atual():
+    """Bytes em uso: alocados pelo Python (com tracemalloc) ou o RSS do processo."""
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGINA_BYTES
+    except OSError:
+        return 0
+
+
+class Intervalo:
+    """Um trecho medido: nome, início, duração, tempo próprio e variação de memória."""
+    __slots__ = ("nome", "thread", "profundidade", "inicio_ns", "duracao_ns", "filhos_ns", "memoria_delta", "atributos")
+
+    def __init__(self, nome, thread, profundidade, atributos):
+        self.nome = nome
+        self.thread = thread
+        self.profundidade = profundidade
+        self.atributos = atributos
+        self.inicio_ns = 0
+        self.duracao_ns = 0
+        self.filhos_ns = 0
+        self.memoria_delta = 0
+
+    @property
+    def proprio_ns(self):
+        """Duração sem a dos intervalos aninhados."""
+        return self.duracao_ns - self.filhos_ns
+
+
+class Perfilador:
+    """Registra intervalos aninhados por thread e acumula os perfis do cProfile."""
+    def __init__(self, maximo_intervalos=MAXIMO_INTERVALOS):
+        self.intervalos = deque(maxlen=maximo_intervalos)
+        self._perfis = []
+        self._trava = threading.Lock()
+        self._local = threading.local()
+        self._origem_ns = time.perf_counter_ns()
+
+    def _pilha(self):
+        if not hasattr(self._local, "pilha"):
+            self._local.pilha = []
+        return self._local.pilha
+
+    @contextlib.contextmanager
+    def intervalo(self, nome, **atributos):
+        """Mede o bloco `with` como um intervalo, aninhado no intervalo aberto da thread."""
+        pilha = self._pilha()
+        registro = Intervalo(nome, threading.get_ident(), len(pilha), atributos)
+        perfil = None
+        if COM_CPROFILE and not pilha:
+            perfil = cProfile.Profile()
+            try:
+                perfil.enable()
+            except ValueError:
+                # Outro perfilador já está ativo (por exemplo, em outra thread)
+                perfil = None
+        pilha.append(registro)
+        memoria_antes = _memoria_atual()
+        registro.inicio_ns = time.perf_counter_ns()
+        try:
+            yield registro
+        finally:
+            registro.duracao_ns = time.perf_counter_ns() - registro.inicio_ns
+            registro.memoria_delta = _memoria_atual() - memoria_antes
+            pilha.pop()
+            if pilha:
+                pilha[-1].filhos_ns += registro.duracao_ns
+            if perfil is not None:
+                perfil.disable()
+            with self._trava:
+                self.intervalos.append(registro)
+                if perfil is not None:
+                    self._perfis.append(perfil)
+
+    def limpar(self):
+        with self._trava:
+            self.intervalos.clear()
+            self._perfis.clear()
+
+    def resumo(self):
+        """
+        Agrega os intervalos por nome.
+
+        Returns:
+            list: Dicionários com nome, chamadas, total, média, máximo e tempo próprio
+            (em ms) e a maior variação de memória (em MB), do maior total ao menor.
+        """
+        with self._trava:
+            intervalos = list(self.intervalos)
+        por_nome = {}
+        for registro in intervalos:
+            item = por_nome.setdefault(registro.nome, {
+                "nome": registro.nome, "chamadas": 0, "total_ms": 0.0, "maximo_ms": 0.0,
+                "proprio_ms": 0.0, "memoria_max_mb": 0.0,
+            })
+            duracao_ms = registro.duracao_ns / 1e6
+            item["chamadas"] += 1
+            item["total_ms"] += duracao_ms
+            item["proprio_ms"] += registro.proprio_ns / 1e6
+            item["maximo_ms"] = max(item["maximo_ms"], duracao_ms)
+            item["memoria_max_mb"] = max(item["memoria_max_mb"], registro.memoria_delta / 2**20)
+        for item in por_nome.values():
+            item["media_ms"] = item["total_ms"] / item["chamadas"]
+        return sorted(por_nome.values(), key=lambda item: item["total_ms"], reverse=True)
+
+    def exportar_chrome_trace(self, caminho):
+        """Grava os intervalos no formato Trace Event (chrome://tracing, Perfetto)."""
+        with self._trava:
+            intervalos = list(self.intervalos)
+        eventos = [
+            {
+                "name": registro.nome,
+                "cat": "clima",
+                "ph": "X",
+                "ts": (registro.inicio_ns - self._origem_ns) / 1e3,
+                "dur": registro.duracao_ns / 1e3,
+                "pid": os.getpid(),
+                "tid": registro.thread,
+                "args": {"memoria_delta_mb": registro.memoria_delta / 2**20,
+                         **{chave: str(valor) for chave, valor in registro.atributos.items()}},
+            }
+            for registro in intervalos
+        ]
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump({"traceEvents": eventos, "displayTimeUnit": "ms"}, arquivo)
+
+    def exportar_cprofile(self, caminho):
+        """
+        Junta os perfis do cProfile dos intervalos externos em um arquivo de
+        estatísticas (`pstats`, snakeviz). Só há perfis com CLIMA_PERFIL=cprofile.
+
+        Returns:
+            bool: Se havia algum perfil para gravar.
+        """
+        with self._trava:
+            perfis = list(self._perfis)
+        if not perfis:
+            return False
+        estatisticas = pstats.Stats(perfis[0])
+        for perfil in perfis[1:]:
+            estatisticas.add(perfil)
+        estatisticas.dump_stats(caminho)
+        return True
+
+
+PERFILADOR = Perfilador()
+
+
+def intervalo(nome, **atributos):
+    """Context manager que mede um bloco (não faz nada se o perfil estiver desativado)."""
+    if not ATIVO:
+        return contextlib.nullcontext()
+    return PERFILADOR.intervalo(nome, **atributos)
+
+
+def medir(nome=None):
+    """
+    Decorador que mede cada chamada da função como um intervalo (por padrão com o
+    nome qualificado, como "AnalisadorClimatico.gerar_estatisticas"). Com o
+    perfil desativado, a função é devolvida sem alteração.
+    """
+    def decorador(funcao):
+        if not ATIVO:
+            return funcao
+        rotulo = nome or funcao.__qualname__
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            with PERFILADOR.intervalo(rotulo):
+                return funcao(*args, **kwargs)
+
+        return envoltorio
+
+    return decorador
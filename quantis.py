@@ -0,0 +1,248 @@
+import numpy as np
+
+# Com compressão δ, cada centróide cobre no máximo ~π·sqrt(q(1-q))·2/δ da
+# distribuição em torno do quantil q; interpolando entre centróides, o erro de
+# posição (rank) fica abaixo de ~π·sqrt(q(1-q))/δ: ≈0,8% na mediana e bem menos
+# nas caudas (P1/P99 ≈ 0,16%) com o padrão δ = 200.
+COMPRESSAO_PADRAO = 200
+
+
+def _indices_escala(quantis_esquerda, compressao):
+    """Função de escala k1 do t-digest, deslocada para começar em zero."""
+    k = compressao / (2 * np.pi) * np.arcsin(np.clip(2 * quantis_esquerda - 1, -1, 1))
+    return np.floor(k + compressao / 4).astype(np.int64)
+
+
+def comprimir(medias, pesos, compressao=COMPRESSAO_PADRAO, grupos=None):
+    """
+    Agrupa centróides ordenados (por grupo e por média) em no máximo ~δ/2
+    centróides por grupo, de forma vetorizada. Grupos com até δ centróides são
+    mantidos como estão.
+
+    Args:
+        medias (np.ndarray): Médias dos centróides, ordenadas dentro de cada grupo.
+        pesos (np.ndarray): Pesos (quantidade de valores) de cada centróide.
+        compressao (float, optional): O parâmetro δ do t-digest.
+        grupos (np.ndarray, optional): Grupo (balde) de cada centróide, em ordem
+            não decrescente. Sem grupos, tudo é comprimido junto.
+
+    Returns:
+        tuple: (medias, pesos, grupos) dos centróides comprimidos.
+    """
+    if grupos is None:
+        grupos = np.zeros(len(medias), dtype=np.int64)
+    if len(medias) == 0:
+        return medias.astype(np.float64), pesos.astype(np.float64), grupos
+
+    inicios = np.concatenate(([0], np.flatnonzero(np.diff(grupos)) + 1))
+    tamanhos = np.diff(np.append(inicios, len(pesos)))
+    acumulado = np.cumsum(pesos)
+    base = np.repeat(np.concatenate(([0.0], acumulado[inicios[1:] - 1])), tamanhos)
+    totais = np.repeat(np.add.reduceat(pesos, inicios), tamanhos)
+    quantis_esquerda = (acumulado - pesos - base) / totais
+
+    # Grupos com até δ centróides não são comprimidos (continuam exatos)
+    posicao_no_grupo = np.arange(len(pesos)) - np.repeat(inicios, tamanhos)
+    indices = np.where(
+        np.repeat(tamanhos, tamanhos) <= compressao,
+        posicao_no_grupo,
+        _indices_escala(quantis_esquerda, compressao),
+    )
+    # Um novo centróide começa sempre que o grupo ou o índice muda
+    chaves = grupos * (int(compressao) + 2) + indices
+    cortes = np.concatenate(([0], np.flatnonzero(np.diff(chaves)) + 1))
+    novos_pesos = np.add.reduceat(pesos, cortes).astype(np.float64)
+    novas_medias = np.add.reduceat(medias * pesos, cortes) / novos_pesos
+    return novas_medias, novos_pesos, grupos[cortes]
+
+
+class EsbocoQuantis:
+    """
+    Esboço de quantis mesclável (t-digest): um conjunto pequeno de centróides
+    (média, peso) que aproxima a distribuição de uma coluna, além do mínimo e do
+    máximo exatos. Enquanto não há compressão (até δ valores), os quantis são
+    exatamente os de `np.percentile` (interpolação linear).
+    """
+    def __init__(self, medias, pesos, minimo=np.nan, maximo=np.nan, compressao=COMPRESSAO_PADRAO):
+        ordem = np.argsort(medias, kind="stable")
+        self.medias = np.asarray(medias, dtype=np.float64)[ordem]
+        self.pesos = np.asarray(pesos, dtype=np.float64)[ordem]
+        self.minimo = float(minimo)
+        self.maximo = float(maximo)
+        self.compressao = compressao
+
+    @classmethod
+    def de_valores(cls, valores, compressao=COMPRESSAO_PADRAO):
+        """Constrói o esboço de um array de valores (os NaN são ignorados)."""
+        valores = np.sort(np.asarray(valores, dtype=np.float64))
+        valores = valores[~np.isnan(valores)]
+        if valores.size == 0:
+            return cls(valores, valores, compressao=compressao)
+        medias, pesos, _ = comprimir(valores, np.ones_like(valores), compressao)
+        return cls(medias, pesos, valores[0], valores[-1], compressao)
+
+    @classmethod
+    def combinar(cls, esbocos, compressao=COMPRESSAO_PADRAO):
+        """Mescla vários esboços em um só, recomprimindo os centróides."""
+        esbocos = [e for e in esbocos if e.total > 0]
+        if not esbocos:
+            return cls(np.array([]), np.array([]), compressao=compressao)
+        medias = np.concatenate([e.medias for e in esbocos])
+        pesos = np.concatenate([e.pesos for e in esbocos])
+        ordem = np.argsort(medias, kind="stable")
+        medias, pesos, _ = comprimir(medias[ordem], pesos[ordem], compressao)
+        minimo = min(e.minimo for e in esbocos)
+        maximo = max(e.maximo for e in esbocos)
+        return cls(medias, pesos, minimo, maximo, compressao)
+
+    @property
+    def total(self):
+        """Quantidade de valores representados pelo esboço."""
+        return float(self.pesos.sum())
+
+    def __len__(self):
+        return len(self.medias)
+
+    def quantil(self, q):
+        """
+        Estima o(s) quantil(is) q (entre 0 e 1).
+
+        Cada centróide é posicionado no índice médio dos valores que representa;
+        o quantil é interpolado linearmente entre essas posições, como em
+        `np.percentile`.
+        """
+        total = self.total
+        if total == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        posicoes = np.cumsum(self.pesos) - (self.pesos + 1) / 2
+        medias = self.medias
+        if posicoes[0] > 0:
+            posicoes = np.concatenate(([0.0], posicoes))
+            medias = np.concatenate(([self.minimo], medias))
+        if posicoes[-1] < total - 1:
+            posicoes = np.append(posicoes, total - 1)
+            medias = np.append(medias, self.maximo)
+        return np.interp(np.asarray(q, dtype=np.float64) * (total - 1), posicoes, medias)
+
+    def percentil(self, p):
+        """Estima o(s) percentil(is) p (entre 0 e 100)."""
+        return self.quantil(np.asarray(p, dtype=np.float64) / 100)
+
+
+class EsbocosPorBalde:
+    """
+    Esboços de quantis de uma coluna, um por balde de tempo (por exemplo, os
+    meses da pirâmide de agregados), guardados em arrays contíguos: os centróides
+    dos baldes [a, b) formam uma única fatia, sem cópia.
+    """
+    def __init__(self, valores, linha_ini, linha_fim, compressao=COMPRESSAO_PADRAO):
+        """
+        Constrói, de uma vez e de forma vetorizada, os esboços de todos os baldes.
+
+        Args:
+            valores (np.ndarray): Valores da coluna (float, NaN para ausentes).
+            linha_ini (np.ndarray): Primeira linha de cada balde.
+            linha_fim (np.ndarray): Linha logo após o fim de cada balde.
+            compressao (float, optional): O parâmetro δ do t-digest.
+        """
+        self.compressao = compressao
+        n_baldes = len(linha_ini)
+        grupos = np.repeat(np.arange(n_baldes), linha_fim - linha_ini)
+        valores = valores[:len(grupos)]
+        validos = ~np.isnan(valores)
+        valores, grupos = valores[validos], grupos[validos]
+        ordem = np.lexsort((valores, grupos))
+        medias, pesos, grupos_centroides = comprimir(valores[ordem], np.ones(len(ordem)), compressao, grupos[ordem])
+        inicios = np.searchsorted(grupos, np.arange(n_baldes), side="left")
+        com_valores = inicios < np.append(inicios[1:], len(grupos))
+        self.minimos = np.full(n_baldes, np.nan)
+        self.maximos = np.full(n_baldes, np.nan)
+        if com_valores.any():
+            self.minimos[com_valores] = np.fmin.reduceat(valores, inicios[com_valores])
+            self.maximos[com_valores] = np.fmax.reduceat(valores, inicios[com_valores])
+        self.medias = medias
+        self.pesos = pesos
+        self.deslocamentos = np.searchsorted(grupos_centroides, np.arange(n_baldes + 1), side="left")
+
+    def esboco(self, a, b, valores_extras=None):
+        """
+        Esboço que combina os baldes [a, b) e, opcionalmente, valores brutos extras
+        (as bordas incompletas de um período).
+        """
+        ini, fim = self.deslocamentos[a], self.deslocamentos[b]
+        medias, pesos = self.medias[ini:fim], self.pesos[ini:fim]
+        with np.errstate(invalid="ignore"):
+            minimo = np.fmin.reduce(self.minimos[a:b], initial=np.nan)
+            maximo = np.fmax.reduce(self.maximos[a:b], initial=np.nan)
+        if valores_extras is not None:
+            extras = valores_extras[~np.isnan(valores_extras)]
+            if extras.size:
+                medias = np.concatenate((medias, extras))
+                pesos = np.concatenate((pesos, np.ones(len(extras))))
+                minimo = np.fmin(minimo, extras.min())
+                maximo = np.fmax(maximo, extras.max())
+        return EsbocoQuantis(medias, pesos, minimo, maximo, self.compressao)
+
+    def anexar(self, valores, linha_ini, linha_fim, balde):
+        """
+        Retorna os esboços atualizados depois que linhas novas entraram no final:
+        os baldes anteriores a `balde` são mantidos e os demais (o último balde
+        antigo, se ele cresceu, e os novos) são construídos de novo.
+
+        Args:
+            valores (np.ndarray): Valores da coluna a partir da linha `linha_ini[balde]`.
+            linha_ini (np.ndarray): Primeira linha de cada balde (todos, já atualizados).
+            linha_fim (np.ndarray): Linha logo após o fim de cada balde.
+            balde (int): O primeiro balde a reconstruir.
+        """
+        inicio = linha_ini[balde]
+        parcial = EsbocosPorBalde(valores, linha_ini[balde:] - inicio, linha_fim[balde:] - inicio, self.compressao)
+        return EsbocosPorBalde.concatenar([self._primeiros(balde), parcial])
+
+    def _primeiros(self, n_baldes):
+        """Os esboços dos primeiros `n_baldes` baldes (fatias, sem cópia)."""
+        corte = self.deslocamentos[n_baldes]
+        return EsbocosPorBalde.de_arrays({
+            "medias": self.medias[:corte],
+            "pesos": self.pesos[:corte],
+            "deslocamentos": self.deslocamentos[:n_baldes + 1],
+            "minimos": self.minimos[:n_baldes],
+            "maximos": self.maximos[:n_baldes],
+        }, self.compressao)
+
+    @classmethod
+    def concatenar(cls, partes, compressao=COMPRESSAO_PADRAO):
+        """Junta, na ordem, esboços de baldes consecutivos construídos separadamente."""
+        if not partes:
+            vazio = np.array([], dtype=np.float64)
+            return cls(vazio, np.array([], dtype=np.int64), np.array([], dtype=np.int64), compressao)
+        deslocamentos, total = [np.zeros(1, dtype=np.int64)], 0
+        for parte in partes:
+            deslocamentos.append(parte.deslocamentos[1:] - parte.deslocamentos[0] + total)
+            total += parte.deslocamentos[-1] - parte.deslocamentos[0]
+        return cls.de_arrays({
+            "medias": np.concatenate([parte.medias for parte in partes]),
+            "pesos": np.concatenate([parte.pesos for parte in partes]),
+            "deslocamentos": np.concatenate(deslocamentos),
+            "minimos": np.concatenate([parte.minimos for parte in partes]),
+            "maximos": np.concatenate([parte.maximos for parte in partes]),
+        }, partes[0].compressao)
+
+    def para_arrays(self):
+        """Os arrays dos esboços, para gravação (ver `de_arrays`)."""
+        return {
+            "medias": self.medias,
+            "pesos": self.pesos,
+            "deslocamentos": self.deslocamentos,
+            "minimos": self.minimos,
+            "maximos": self.maximos,
+        }
+
+    @classmethod
+    def de_arrays(cls, arrays, compressao=COMPRESSAO_PADRAO):
+        """Operação inversa de `para_arrays`."""
+        esbocos = cls.__new__(cls)
+        esbocos.compressao = compressao
+        for nome in ("medias", "pesos", "deslocamentos", "minimos", "maximos"):
+            setattr(esbocos, nome, arrays[nome])
+        return esbocos
@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+from quantis import COMPRESSAO_PADRAO, EsbocoQuantis, EsbocosPorBalde
+
+QUANTIS = np.array([0.001, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 0.999])
+
+
+def erro_de_posicao(valores, estimativas, quantis):
+    """Distância, em fração das linhas, entre a posição de cada estimativa e o quantil pedido."""
+    ordenados = np.sort(valores)
+    abaixo = np.searchsorted(ordenados, estimativas, side="left") / len(ordenados)
+    ate = np.searchsorted(ordenados, estimativas, side="right") / len(ordenados)
+    return np.where(quantis < abaixo, abaixo - quantis, np.where(quantis > ate, quantis - ate, 0.0))
+
+
+def limite_de_erro(quantis, compressao=COMPRESSAO_PADRAO):
+    """O limite do erro de posição documentado em `quantis`: π·sqrt(q(1-q))/δ."""
+    return np.pi * np.sqrt(quantis * (1 - quantis)) / compressao
+
+
+class TestEsbocoQuantis(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.valores = np.concatenate((rng.normal(25, 5, 60_000), rng.exponential(3.0, 40_000)))
+        rng.shuffle(self.valores)
+
+    def test_exato_ate_a_compressao(self):
+        valores = self.valores[:COMPRESSAO_PADRAO]
+        esboco = EsbocoQuantis.de_valores(valores)
+        np.testing.assert_allclose(esboco.percentil(QUANTIS * 100), np.percentile(valores, QUANTIS * 100))
+
+    def test_erro_dentro_do_limite(self):
+        esboco = EsbocoQuantis.de_valores(self.valores)
+        erro = erro_de_posicao(self.valores, esboco.quantil(QUANTIS), QUANTIS)
+        self.assertTrue(np.all(erro <= limite_de_erro(QUANTIS) + 1 / len(self.valores)), erro)
+
+    def test_combinar_mantem_o_limite(self):
+        partes = np.array_split(self.valores, 37)
+        esboco = EsbocoQuantis.combinar([EsbocoQuantis.de_valores(parte) for parte in partes])
+        self.assertEqual(esboco.total, len(self.valores))
+        self.assertEqual((esboco.minimo, esboco.maximo), (self.valores.min(), self.valores.max()))
+        erro = erro_de_posicao(self.valores, esboco.quantil(QUANTIS), QUANTIS)
+        self.assertTrue(np.all(erro <= limite_de_erro(QUANTIS) + 1 / len(self.valores)), erro)
+
+    def test_ignora_nan(self):
+        valores = self.valores[:1000].copy()
+        valores[::10] = np.nan
+        esboco = EsbocoQuantis.de_valores(valores)
+        self.assertEqual(esboco.total, np.count_nonzero(~np.isnan(valores)))
+        self.assertTrue(np.isnan(EsbocoQuantis.de_valores(np.full(5, np.nan)).quantil(0.5)))
+
+
+class TestEsbocosPorBalde(unittest.TestCase):
+    def test_baldes_com_bordas_iguais_ao_percentil(self):
+        rng = np.random.default_rng(1)
+        valores = rng.gamma(2.0, 5.0, 30_000)
+        valores[rng.random(len(valores)) < 0.02] = np.nan
+        limites = np.arange(0, len(valores) + 1, 3000)
+        baldes = EsbocosPorBalde(valores, limites[:-1], limites[1:])
+        extras = valores[29_000:29_500]
+        esboco = baldes.esboco(2, 7, extras)
+        referencia = np.concatenate((valores[6000:21_000], extras))
+        referencia = referencia[~np.isnan(referencia)]
+        self.assertEqual(esboco.total, len(referencia))
+        erro = erro_de_posicao(referencia, esboco.quantil(QUANTIS), QUANTIS)
+        self.assertTrue(np.all(erro <= limite_de_erro(QUANTIS) + 1 / len(referencia)), erro)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,278 @@
+"""
+Geração de relatórios em lote, sem interface gráfica.
+
+Exemplo:
+    python relatorio.py dados/*.csv --periodo 2025-06-01:2025-06-30 --periodo 2025-07-01: \
+        --formatos png pdf --saida relatorios --zip --tempo-limite 1800
+"""
+import argparse
+import html
+import multiprocessing
+import os
+import sys
+import time
+import urllib.parse
+import zipfile
+
+import matplotlib
+matplotlib.use("Agg")
+
+import pandas as pd
+
+from multiestacao import listar_estacoes, nome_estacao, nomes_estacoes, obter_analisador
+from visualizador import VisualizadorClimatico
+import constantes as const
+
+FORMATOS_SUPORTADOS = ("png", "svg", "pdf")
+ARQUIVO_INDICE = "index.html"
+
+
+def interpretar_periodo(texto):
+    """
+    Converte "AAAA-MM-DD:AAAA-MM-DD" em (início, fim); um lado vazio significa
+    sem limite e "todo" significa todos os dados.
+
+    Returns:
+        tuple: (pd.Timestamp | None, pd.Timestamp | None).
+    """
+    if texto in ("", "todo"):
+        return None, None
+    inicio, separador, fim = texto.partition(":")
+    if not separador:
+        raise argparse.ArgumentTypeError(f"Período inválido '{texto}'. Use AAAA-MM-DD:AAAA-MM-DD.")
+    try:
+        return (pd.Timestamp(inicio) if inicio else None), (pd.Timestamp(fim) if fim else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Período inválido '{texto}'. Use AAAA-MM-DD:AAAA-MM-DD.")
+
+
+def nome_periodo(data_inicio, data_fim):
+    """Nome da pasta de um período, por exemplo "2025-06-01_2025-06-30"."""
+    inicio = data_inicio.strftime('%Y-%m-%d') if data_inicio is not None else "inicio"
+    fim = data_fim.strftime('%Y-%m-%d') if data_fim is not None else "fim"
+    return f"{inicio}_{fim}"
+
+
+def _figuras_do_periodo(analisador, data_inicio, data_fim, style):
+    """Gera, uma a uma, as figuras (nome, figura) de todos os `plotar_*` para o período."""
+    dados = analisador.get_dados_filtrados_para_plot(data_inicio, data_fim)
+    visualizador = VisualizadorClimatico(dados)
+
+    estatisticas, _ = analisador.gerar_estatisticas(data_inicio, data_fim)
+    if estatisticas:
+        yield "dashboard", visualizador.plotar_dashboard_hibrido(estatisticas)
+        yield "estatisticas", visualizador.plotar_estatisticas(estatisticas, style=style)
+    if not dados.empty:
+        nomes = ["temperatura", "umidade", "vento", "precipitacao"]
+        eventos = analisador.gerar_eventos(None, data_inicio, data_fim)
+        for nome, fabrica in zip(nomes, visualizador.fabricas_graficos(style, eventos=eventos)):
+            yield nome, fabrica()
+        yield "distribuicao_temperatura", visualizador.plotar_distribuicao(const.COL_TEMP, 'Temperatura', style=style)
+        janelas_moveis = analisador.gerar_janelas_moveis(const.COL_TEMP, ("24h", "7D"), ("media",), data_inicio, data_fim)
+        if not janelas_moveis.empty:
+            yield "janelas_moveis_temperatura", visualizador.plotar_janelas_moveis(
+                janelas_moveis, const.COL_TEMP, "Temperatura e Médias Móveis", "Temperatura (°C)", style=style)
+    dados_mensais = analisador.gerar_analise_mensal(data_inicio, data_fim)
+    if not dados_mensais.empty:
+        yield "analise_mensal", visualizador.plotar_analise_mensal(dados_mensais, style=style)
+
+    for metrica_nome, (coluna, unidade, paleta_maior, paleta_menor) in const.METRICAS_EXTREMOS.items():
+        for tipo, df_extremos, paleta in (
+            ("Maiores", analisador.buscar_maiores_indices(coluna, 5, data_inicio, data_fim), paleta_maior),
+            ("Menores", analisador.buscar_menores_indices(coluna, 5, data_inicio, data_fim), paleta_menor),
+        ):
+            if not df_extremos.empty:
+                titulo = f"Top 5 Dias com {tipo} Índices de {metrica_nome}"
+                yield (f"extremos_{tipo.lower()}_{coluna}",
+                       visualizador.plotar_dias_extremos(df_extremos, coluna, titulo, paleta, unidade))
+    matriz_corr = analisador.gerar_matriz_correlacao(data_inicio, data_fim)
+    # Sem dados no período, a matriz é toda NaN e o heatmap ficaria vazio
+    if not dados.empty and not matriz_corr.isna().all(axis=None):
+        yield "correlacao", visualizador.plotar_heatmap_correlacao(matriz_corr, style=style)
+
+
+def gerar_relatorio_periodo(caminho_csv, data_inicio, data_fim, pasta_saida, formatos, style='whitegrid',
+                            estacao=None):
+    """
+    Roda as análises de uma estação em um período e salva todas as figuras.
+
+    Args:
+        caminho_csv (str): O arquivo CSV da estação.
+        data_inicio, data_fim: Os limites do período (None para o início ou o fim dos dados).
+        pasta_saida (str): Pasta base do relatório.
+        formatos (list): Formatos das figuras ("png", "svg", "pdf").
+        style (str, optional): Estilo do seaborn.
+        estacao (str, optional): Nome da estação (e da sua pasta). Padrão é `nome_estacao`.
+
+    Returns:
+        dict: Estação, período, estatísticas, resumo e arquivos gerados (caminhos
+        relativos a `pasta_saida`).
+    """
+    inicio_execucao = time.perf_counter()
+    analisador = obter_analisador(caminho_csv)
+    datas = analisador.get_dados_completos()[const.COL_DATA]
+    data_inicio = datas.min() if data_inicio is None else data_inicio
+    data_fim = datas.max() if data_fim is None else data_fim
+    estacao = nome_estacao(caminho_csv) if estacao is None else estacao
+    periodo = nome_periodo(data_inicio, data_fim)
+    pasta = os.path.join(pasta_saida, estacao, periodo)
+    os.makedirs(pasta, exist_ok=True)
+
+    arquivos = []
+    for nome, figura in _figuras_do_periodo(analisador, data_inicio, data_fim, style):
+        for formato in formatos:
+            caminho = os.path.join(pasta, f"{nome}.{formato}")
+            figura.savefig(caminho, format=formato)
+            arquivos.append(os.path.relpath(caminho, pasta_saida))
+    eventos = analisador.gerar_eventos(None, data_inicio, data_fim)
+    if not eventos.empty:
+        caminho = os.path.join(pasta, "eventos.csv")
+        eventos.to_csv(caminho, index=False)
+        arquivos.append(os.path.relpath(caminho, pasta_saida))
+
+    estatisticas, _ = analisador.gerar_estatisticas(data_inicio, data_fim)
+    return {
+        "estacao": estacao,
+        "periodo": periodo,
+        "estatisticas": estatisticas,
+        "resumo": analisador.gerar_resumo_inteligente(data_inicio, data_fim),
+        "arquivos": arquivos,
+        "duracao_s": time.perf_counter() - inicio_execucao,
+    }
+
+
+def escrever_indice_html(pasta_saida, resultados, pendentes):
+    """
+    Escreve o índice HTML do relatório: para cada estação e período, as
+    estatísticas, o resumo e as figuras (PNG/SVG embutidas, PDF como link).
+
+    Returns:
+        str: O caminho do arquivo escrito.
+    """
+    partes = [
+        "<!DOCTYPE html><html lang='pt-BR'><head><meta charset='utf-8'>",
+        "<title>Relatório Climático</title></head><body>",
+        "<h1>Relatório Climático</h1>",
+    ]
+    for resultado in sorted(resultados, key=lambda r: (r["estacao"], r["periodo"])):
+        partes.append(f"<h2>{html.escape(resultado['estacao'])} — {html.escape(resultado['periodo'])}</h2>")
+        partes.append(f"<p><small>Gerado em {resultado['duracao_s']:.1f} s</small></p>")
+        if resultado["estatisticas"]:
+            partes.append("<table border='1' cellpadding='4'>")
+            for rotulo, valor in resultado["estatisticas"].items():
+                partes.append(f"<tr><td>{html.escape(rotulo)}</td><td>{valor:,.2f}</td></tr>")
+            partes.append("</table>")
+        partes.append(f"<pre>{html.escape(resultado['resumo'])}</pre>")
+        for arquivo in resultado["arquivos"]:
+            relativo = arquivo.replace(os.sep, "/")
+            # Nomes com %, # ou ? precisam ser codificados na URL; o texto visível só é escapado
+            url = html.escape(urllib.parse.quote(relativo))
+            if arquivo.endswith((".png", ".svg")):
+                partes.append(f"<p><img src='{url}' style='max-width:100%'></p>")
+            else:
+                partes.append(f"<p><a href='{url}'>{html.escape(relativo)}</a></p>")
+    if pendentes:
+        partes.append("<h2>Não concluídos</h2><ul>")
+        for estacao, periodo, motivo in pendentes:
+            partes.append(f"<li>{html.escape(estacao)} — {html.escape(periodo)}: {html.escape(motivo)}</li>")
+        partes.append("</ul>")
+    partes.append("</body></html>")
+
+    caminho = os.path.join(pasta_saida, ARQUIVO_INDICE)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write("\n".join(partes))
+    return caminho
+
+
+def compactar_relatorio(pasta_saida, resultados):
+    """Junta o índice e todas as figuras geradas em um único arquivo zip."""
+    caminho_zip = os.path.join(pasta_saida, "relatorio.zip")
+    with zipfile.ZipFile(caminho_zip, "w", compression=zipfile.ZIP_DEFLATED) as pacote:
+        pacote.write(os.path.join(pasta_saida, ARQUIVO_INDICE), ARQUIVO_INDICE)
+        for resultado in resultados:
+            for arquivo in resultado["arquivos"]:
+                pacote.write(os.path.join(pasta_saida, arquivo), arquivo)
+    return caminho_zip
+
+
+def gerar_relatorios(caminhos, periodos, pasta_saida, formatos=("png",), max_processos=None,
+                     tempo_limite=None, style='whitegrid'):
+    """
+    Gera os relatórios de todas as combinações (estação, período) em um pool de
+    processos. Ao atingir o tempo limite, os trabalhos restantes são interrompidos
+    e listados como não concluídos, assim como os que falharem.
+
+    Args:
+        caminhos (list): Arquivos CSV das estações.
+        periodos (list): Lista de (início, fim).
+        pasta_saida (str): Pasta onde o relatório é gravado.
+        formatos (tuple, optional): Formatos das figuras.
+        max_processos (int, optional): Tamanho do pool. Padrão é o número de núcleos.
+        tempo_limite (float, optional): Tempo máximo total, em segundos.
+        style (str, optional): Estilo do seaborn.
+
+    Returns:
+        tuple: (resultados concluídos, lista de (estação, período, motivo) não concluídos).
+    """
+    os.makedirs(pasta_saida, exist_ok=True)
+    prazo = None if tempo_limite is None else time.monotonic() + tempo_limite
+    # Arquivos de mesmo nome em pastas diferentes não podem dividir a pasta do relatório
+    nomes = nomes_estacoes(caminhos)
+    trabalhos = [(caminho, inicio, fim) for caminho in caminhos for inicio, fim in periodos]
+
+    resultados, pendentes = [], []
+    # Um Pool (e não um ProcessPoolExecutor) para poder encerrar os processos no prazo
+    pool = multiprocessing.Pool(processes=max_processos)
+    try:
+        assincronos = [
+            (trabalho, pool.apply_async(gerar_relatorio_periodo,
+                                        (*trabalho, pasta_saida, list(formatos), style, nomes[trabalho[0]])))
+            for trabalho in trabalhos
+        ]
+        for (caminho, inicio, fim), assincrono in assincronos:
+            restante = None if prazo is None else max(prazo - time.monotonic(), 0)
+            try:
+                resultados.append(assincrono.get(timeout=restante))
+            except multiprocessing.TimeoutError:
+                pendentes.append((nomes[caminho], nome_periodo(inicio, fim), "tempo limite atingido"))
+            except Exception as erro:
+                pendentes.append((nomes[caminho], nome_periodo(inicio, fim), f"erro: {erro}"))
+    finally:
+        pool.terminate()
+        pool.join()
+    return resultados, pendentes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera relatórios climáticos (figuras e índice HTML) sem interface gráfica.")
+    parser.add_argument("origens", nargs="+", help="Arquivos CSV, diretórios ou padrões glob das estações.")
+    parser.add_argument("--periodo", action="append", type=interpretar_periodo, dest="periodos",
+                        help="Período AAAA-MM-DD:AAAA-MM-DD (um lado pode ficar vazio). Pode ser repetido. Padrão: todos os dados.")
+    parser.add_argument("--formatos", nargs="+", choices=FORMATOS_SUPORTADOS, default=["png"])
+    parser.add_argument("--saida", default="relatorios", help="Pasta de saída (padrão: relatorios).")
+    parser.add_argument("--processos", type=int, default=None, help="Tamanho do pool de processos.")
+    parser.add_argument("--tempo-limite", type=float, default=None, help="Tempo máximo total, em segundos.")
+    parser.add_argument("--estilo", default="whitegrid", help="Estilo do seaborn.")
+    parser.add_argument("--zip", action="store_true", help="Também junta o relatório em relatorio.zip.")
+    args = parser.parse_args(argv)
+
+    caminhos = [caminho for origem in args.origens for caminho in listar_estacoes(origem)]
+    if not caminhos:
+        parser.error("Nenhum arquivo CSV encontrado.")
+    periodos = args.periodos or [(None, None)]
+
+    resultados, pendentes = gerar_relatorios(caminhos, periodos, args.saida, args.formatos,
+                                             args.processos, args.tempo_limite, args.estilo)
+    indice = escrever_indice_html(args.saida, resultados, pendentes)
+    print(f"{len(resultados)} relatório(s) gerado(s) em {indice}")
+    if args.zip:
+        print(f"Pacote: {compactar_relatorio(args.saida, resultados)}")
+    if pendentes:
+        for estacao, periodo, motivo in pendentes:
+            print(f"Não concluído: {estacao} {periodo} ({motivo})", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
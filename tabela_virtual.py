@@ -0,0 +1,198 @@
+from tkinter import ttk, messagebox
+
+import customtkinter as ctk
+import numpy as np
+import pandas as pd
+
+import constantes as const
+
+ALTURA_LINHA_PX = 22
+
+
+class TabelaVirtual(ctk.CTkFrame):
+    """
+    Tabela com rolagem virtual: apenas as linhas visíveis existem como itens do
+    Treeview e só elas são formatadas, a cada rolagem. Abrir, rolar, ordenar pela
+    data ou saltar para uma data custa o mesmo para qualquer tamanho de dados.
+
+    A ordenação por outras colunas calcula (uma vez por coluna) a permutação
+    ordenada dos valores; a ordem pela data é a própria ordem dos dados, que já
+    chegam ordenados, e o salto para uma data usa busca binária.
+    """
+    def __init__(self, master, dados, **kwargs):
+        """
+        Args:
+            master: O widget pai.
+            dados (pd.DataFrame): Os dados a exibir, ordenados pela data.
+        """
+        super().__init__(master, **kwargs)
+        self.dados = dados
+        self.colunas = list(dados.columns)
+        self._valores = {col: dados[col].to_numpy() for col in self.colunas}
+        # As linhas sem data ficam no final dos dados e continuam no final nas duas ordens
+        self._n_datas = len(dados) - int(pd.isna(self._valores[const.COL_DATA]).sum()) \
+            if const.COL_DATA in self._valores else len(dados)
+        self._permutacoes = {}
+        self._ordem = None
+        self._coluna_ordem = const.COL_DATA
+        self._decrescente = False
+        self._inicio = 0
+        self._itens = []
+
+        barra = ctk.CTkFrame(self, fg_color="transparent")
+        barra.pack(side="top", fill="x", padx=5, pady=(5, 0))
+        ctk.CTkLabel(barra, text=f"{len(dados):,} linhas".replace(",", ".")).pack(side="left", padx=5)
+        ctk.CTkButton(barra, text="Ir", width=40, command=self._ir_para_data_digitada).pack(side="right", padx=5)
+        self.data_entry = ctk.CTkEntry(barra, placeholder_text="AAAA-MM-DD", width=120)
+        self.data_entry.pack(side="right")
+        self.data_entry.bind("<Return>", lambda _: self._ir_para_data_digitada())
+        ctk.CTkLabel(barra, text="Ir para a data:").pack(side="right", padx=5)
+
+        corpo = ctk.CTkFrame(self, fg_color="transparent")
+        corpo.pack(side="top", fill="both", expand=True, padx=5, pady=5)
+        self._configurar_estilo()
+        self.arvore = ttk.Treeview(corpo, columns=self.colunas, show="headings", selectmode="browse",
+                                   style="TabelaVirtual.Treeview")
+        for coluna in self.colunas:
+            self.arvore.heading(coluna, text=coluna, command=lambda c=coluna: self.ordenar_por(c))
+            self.arvore.column(coluna, width=150, anchor="e" if coluna != const.COL_DATA else "w", stretch=True)
+        self.barra_rolagem = ctk.CTkScrollbar(corpo, command=self._rolar)
+        self.barra_rolagem.pack(side="right", fill="y")
+        self.arvore.pack(side="left", fill="both", expand=True)
+
+        self.arvore.bind("<Configure>", lambda _: self._ajustar_linhas_visiveis())
+        self.arvore.bind("<MouseWheel>", self._rolar_roda)
+        self.arvore.bind("<Button-4>", lambda _: self._mover(-3))
+        self.arvore.bind("<Button-5>", lambda _: self._mover(3))
+        self.arvore.bind("<Up>", lambda _: self._mover(-1))
+        self.arvore.bind("<Down>", lambda _: self._mover(1))
+        self.arvore.bind("<Prior>", lambda _: self._mover(-len(self._itens)))
+        self.arvore.bind("<Next>", lambda _: self._mover(len(self._itens)))
+        self.arvore.bind("<Home>", lambda _: self._ir_para(0))
+        self.arvore.bind("<End>", lambda _: self._ir_para(len(self.dados)))
+        self._atualizar_cabecalhos()
+
+    def _configurar_estilo(self):
+        is_dark = ctk.get_appearance_mode() == "Dark"
+        estilo = ttk.Style(self)
+        estilo.configure(
+            "TabelaVirtual.Treeview",
+            rowheight=ALTURA_LINHA_PX,
+            background="#2b2b2b" if is_dark else "#ffffff",
+            fieldbackground="#2b2b2b" if is_dark else "#ffffff",
+            foreground="#DCE4EE" if is_dark else "#1a1a1a",
+        )
+
+    # --- Janela de linhas visíveis ---
+
+    def _ajustar_linhas_visiveis(self):
+        """Cria ou remove itens do Treeview para ocupar exatamente a altura disponível."""
+        n_visiveis = max(1, self.arvore.winfo_height() // ALTURA_LINHA_PX - 1)
+        n_visiveis = min(n_visiveis, len(self.dados))
+        while len(self._itens) < n_visiveis:
+            self._itens.append(self.arvore.insert("", "end", values=()))
+        while len(self._itens) > n_visiveis:
+            self.arvore.delete(self._itens.pop())
+        self._ir_para(self._inicio)
+
+    def _linhas_da_janela(self):
+        """Posições (nos dados) das linhas atualmente visíveis, na ordem de exibição."""
+        fim = min(self._inicio + len(self._itens), len(self.dados))
+        if self._ordem is not None:
+            return self._ordem[self._inicio:fim]
+        posicoes = np.arange(self._inicio, fim)
+        if self._decrescente:
+            com_data = posicoes < self._n_datas
+            posicoes[com_data] = self._n_datas - 1 - posicoes[com_data]
+        return posicoes
+
+    def _formatar(self, coluna, valor):
+        if pd.isna(valor):
+            return ""
+        if isinstance(valor, (np.datetime64, pd.Timestamp)):
+            data = pd.Timestamp(valor)
+            return data.strftime('%Y-%m-%d') if data == data.normalize() else data.strftime('%Y-%m-%d %H:%M')
+        if isinstance(valor, (float, np.floating)):
+            return f"{valor:,.2f}"
+        return str(valor)
+
+    def _renderizar(self):
+        """Formata e exibe somente as linhas da janela visível."""
+        linhas = self._linhas_da_janela()
+        for item, linha in zip(self._itens, linhas):
+            self.arvore.item(item, values=[self._formatar(col, self._valores[col][linha]) for col in self.colunas])
+        for item in self._itens[len(linhas):]:
+            self.arvore.item(item, values=())
+        n = max(len(self.dados), 1)
+        self.barra_rolagem.set(self._inicio / n, min((self._inicio + len(self._itens)) / n, 1.0))
+
+    def _ir_para(self, inicio):
+        maximo = max(len(self.dados) - len(self._itens), 0)
+        self._inicio = int(min(max(inicio, 0), maximo))
+        self._renderizar()
+
+    def _mover(self, linhas):
+        self._ir_para(self._inicio + linhas)
+        return "break"
+
+    def _rolar(self, acao, valor, unidade=None):
+        """Comando da barra de rolagem ('moveto' ou 'scroll')."""
+        if acao == "moveto":
+            self._ir_para(float(valor) * len(self.dados))
+        elif acao == "scroll":
+            passo = len(self._itens) if unidade == "pages" else 1
+            self._mover(int(valor) * passo)
+
+    def _rolar_roda(self, evento):
+        return self._mover(-3 if evento.delta > 0 else 3)
+
+    # --- Ordenação e busca ---
+
+    def ordenar_por(self, coluna, decrescente=None):
+        """
+        Ordena por uma coluna, com os valores ausentes sempre no final.
+
+        Args:
+            coluna (str): A coluna.
+            decrescente (bool, optional): A direção. Padrão é a do clique no
+                cabeçalho: crescente, ou a inversa da atual se a coluna já for a da ordem.
+        """
+        if decrescente is None:
+            decrescente = not self._decrescente if coluna == self._coluna_ordem else False
+        self._decrescente = decrescente
+        self._coluna_ordem = coluna
+        if coluna == const.COL_DATA:
+            self._ordem = None
+        else:
+            if coluna not in self._permutacoes:
+                valores = self._valores[coluna]
+                permutacao = np.argsort(valores, kind="stable")
+                # argsort deixa NaN/NaT no final; quantos são, para mantê-los lá na ordem inversa
+                self._permutacoes[coluna] = (permutacao, len(valores) - int(pd.isna(valores).sum()))
+            permutacao, n_validos = self._permutacoes[coluna]
+            if self._decrescente:
+                permutacao = np.concatenate((permutacao[:n_validos][::-1], permutacao[n_validos:]))
+            self._ordem = permutacao
+        self._atualizar_cabecalhos()
+        self._ir_para(0)
+
+    def _atualizar_cabecalhos(self):
+        for coluna in self.colunas:
+            seta = (" ▼" if self._decrescente else " ▲") if coluna == self._coluna_ordem else ""
+            self.arvore.heading(coluna, text=f"{coluna}{seta}")
+
+    def ir_para_data(self, data):
+        """Posiciona a tabela (na ordem crescente de data) na primeira linha a partir da data."""
+        if self._coluna_ordem != const.COL_DATA or self._decrescente:
+            self.ordenar_por(const.COL_DATA, decrescente=False)
+        datas = self._valores[const.COL_DATA][:self._n_datas]
+        self._ir_para(np.searchsorted(datas, pd.Timestamp(data).to_datetime64(), side="left"))
+
+    def _ir_para_data_digitada(self):
+        texto = self.data_entry.get().strip()
+        if not texto:
+            return
+        try:
+            self.ir_para_data(pd.to_datetime(texto))
+        except ValueError:
+            messagebox.showerror("Formato Inválido", "Formato de data inválido. Use AAAA-MM-DD.", parent=self)
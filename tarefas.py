@@ -0,0 +1,143 @@
+import queue
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+INTERVALO_VERIFICACAO_MS = 50
+
+
+class Tarefa:
+    """
+    Uma tarefa em execução fora da thread da interface. A função executada pode
+    receber a própria tarefa para informar o progresso e verificar o cancelamento.
+    """
+    def __init__(self, chave, descricao=""):
+        self.chave = chave
+        self.descricao = descricao
+        self.progresso = None
+        self._cancelada = threading.Event()
+
+    def informar_progresso(self, fracao):
+        """Informa o progresso (de 0 a 1); pode ser chamado de qualquer thread."""
+        self.progresso = min(max(float(fracao), 0.0), 1.0)
+
+    def cancelar(self):
+        self._cancelada.set()
+
+    @property
+    def cancelada(self):
+        return self._cancelada.is_set()
+
+
+class GerenciadorTarefas:
+    """
+    Executa análises e gráficos em um pool de threads, sem travar a interface.
+
+    Os resultados são entregues na thread do Tk: os callbacks `ao_concluir` e
+    `ao_falhar` são chamados a partir de um `after()` que verifica periodicamente
+    uma fila de tarefas terminadas. Cliques repetidos são ignorados enquanto
+    houver uma tarefa com a mesma chave em andamento; uma tarefa cancelada tem
+    seu resultado descartado (e, se ainda não começou, nem chega a rodar).
+    """
+    def __init__(self, raiz, max_threads=2, ao_mudar=None):
+        """
+        Args:
+            raiz: O widget Tk usado para agendar as verificações com `after()`.
+            max_threads (int, optional): Número de threads de trabalho.
+            ao_mudar (callable, optional): Chamado na thread do Tk sempre que a lista
+                de tarefas ou o progresso muda, com a lista de tarefas ativas.
+        """
+        self.raiz = raiz
+        self.ao_mudar = ao_mudar
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="tarefa")
+        self._ativas = {}
+        self._concluidas = queue.Queue()
+        self._verificacao_agendada = None
+
+    def executar(self, chave, funcao, *args, ao_concluir=None, ao_falhar=None,
+                 descricao="", com_tarefa=False, **kwargs):
+        """
+        Agenda `funcao(*args, **kwargs)` em uma thread de trabalho.
+
+        Args:
+            chave (str): Identifica a ação; uma nova chamada com a mesma chave é
+                ignorada enquanto a anterior não terminar.
+            funcao (callable): A função a executar.
+            ao_concluir (callable, optional): Recebe o resultado, na thread do Tk.
+            ao_falhar (callable, optional): Recebe a exceção, na thread do Tk.
+            descricao (str, optional): Texto exibido enquanto a tarefa roda.
+            com_tarefa (bool, optional): Passa a `Tarefa` à função no argumento `tarefa`.
+
+        Returns:
+            Tarefa | None: A tarefa criada ou None se já havia uma igual em andamento.
+        """
+        if chave in self._ativas:
+            return None
+        tarefa = Tarefa(chave, descricao)
+        if com_tarefa:
+            kwargs["tarefa"] = tarefa
+        futuro = self._executor.submit(funcao, *args, **kwargs)
+        self._ativas[chave] = (tarefa, futuro, ao_concluir, ao_falhar)
+        futuro.add_done_callback(lambda f: self._concluidas.put((tarefa, f)))
+        self._notificar()
+        self._agendar_verificacao()
+        return tarefa
+
+    def cancelar(self, chave=None):
+        """Cancela a tarefa com a chave informada ou, sem chave, todas as tarefas ativas."""
+        chaves = list(self._ativas) if chave is None else [chave]
+        for c in chaves:
+            if c in self._ativas:
+                tarefa, futuro, _, _ = self._ativas.pop(c)
+                tarefa.cancelar()
+                futuro.cancel()
+        self._notificar()
+
+    def em_andamento(self):
+        """Retorna a lista de tarefas ativas."""
+        return [registro[0] for registro in self._ativas.values()]
+
+    def fechar(self):
+        """
+        Cancela tudo e libera o pool sem esperar as threads em execução.
+
+        Uma função já em execução não é interrompida: ela só para antes se
+        verificar `Tarefa.cancelada` (ver `executar(com_tarefa=True)`). Como as
+        threads do pool não são daemon, o processo só termina depois dela.
+        """
+        self.cancelar()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _notificar(self):
+        if self.ao_mudar is not None:
+            self.ao_mudar(self.em_andamento())
+
+    def _agendar_verificacao(self):
+        if self._verificacao_agendada is None:
+            self._verificacao_agendada = self.raiz.after(INTERVALO_VERIFICACAO_MS, self._verificar)
+
+    def _verificar(self):
+        """Entrega, na thread do Tk, os resultados das tarefas que terminaram."""
+        self._verificacao_agendada = None
+        while True:
+            try:
+                tarefa, futuro = self._concluidas.get_nowait()
+            except queue.Empty:
+                break
+            registro = self._ativas.get(tarefa.chave)
+            if registro is None or registro[0] is not tarefa or tarefa.cancelada:
+                continue
+            del self._ativas[tarefa.chave]
+            _, _, ao_concluir, ao_falhar = registro
+            try:
+                resultado = futuro.result()
+            except CancelledError:
+                continue
+            except Exception as erro:
+                if ao_falhar is not None:
+                    ao_falhar(erro)
+                continue
+            if ao_concluir is not None:
+                ao_concluir(resultado)
+        self._notificar()
+        if self._ativas:
+            self._agendar_verificacao()
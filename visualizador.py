@@ -1,15 +1,47 @@
-import matplotlib.pyplot as plt
+import contextlib
+import functools
 import seaborn as sns
+from matplotlib.figure import Figure
 import constantes as const
-from matplotlib.patches import Patch
+from decimacao import LinhaDecimada, METODO_PADRAO
+from janelas import ROTULOS_ESTATISTICAS
+from eventos import TIPOS_EVENTO
+from perfil import medir
+from matplotlib.patches import Patch, Polygon
+import matplotlib.dates as mdates
 import matplotlib.gridspec as gridspec
 import numpy as np
+import pandas as pd
+
+# Da mais fina à mais grossa: a primeira que cabe na largura do eixo é usada.
+FREQUENCIAS_PRECIPITACAO = [("D", "Dia"), ("W", "Semana"), ("M", "Mês")]
+
+# Cores das faixas de cada tipo de evento (ver `eventos.TIPOS_EVENTO`); os demais usam cinza
+CORES_EVENTOS = {
+    "onda_de_calor": "tab:red",
+    "periodo_seco": "tab:orange",
+    "sequencia_chuvosa": "tab:blue",
+    "sequencia_de_vento": "tab:purple",
+}
+
+
+@contextlib.contextmanager
+def _tema(style):
+    """
+    Aplica o tema do seaborn (como `sns.set_theme(style=style)`) só enquanto a
+    figura é criada; na saída, o rcParams global volta ao que era.
+    """
+    with sns.plotting_context("notebook"), sns.axes_style(style), sns.color_palette("deep"):
+        yield
 
 
 class VisualizadorClimatico:
     """
     Classe responsável por criar diversas visualizações gráficas
     a partir de dados climáticos.
+
+    As figuras são criadas diretamente com `matplotlib.figure.Figure`, sem o
+    pyplot, para que possam ser geradas fora da thread da interface.
     """
     def __init__(self, dados_para_plotar):
         """
@@ -30,77 +62,164 @@ class VisualizadorClimatico:
         Returns:
             tuple: Uma tupla contendo a figura e o eixo (fig, ax).
         """
-        fig, ax = plt.subplots(figsize=figsize)
+        fig = Figure(figsize=figsize)
+        ax = fig.subplots()
         return fig, ax
 
-    def plotar_graficos(self, style='whitegrid'):
+    @medir()
+    def plotar_graficos(self, style='whitegrid', metodo_decimacao=METODO_PADRAO, eventos=None):
         """
         Plota gráficos de linha para temperatura, umidade e vento, e um gráfico de barras para precipitação.
+
+        As linhas são desenhadas a partir de uma versão reduzida das séries (ver
+        `decimacao.LinhaDecimada`), com cerca de dois pontos por pixel, que é
+        recalculada ao aproximar o gráfico.
+
+        Args:
+            style (str, optional): Estilo do seaborn.
+            metodo_decimacao (str, optional): "minmax" (preserva picos e vales) ou "lttb".
+            eventos (pd.DataFrame, optional): Eventos de `AnalisadorClimatico.gerar_eventos`,
+                sombreados no gráfico da coluna de cada um.
+        """
+        return [fabrica() for fabrica in self.fabricas_graficos(style, metodo_decimacao, eventos)]
+
+    def fabricas_graficos(self, style='whitegrid', metodo_decimacao=METODO_PADRAO, eventos=None):
+        """
+        Retorna, sem desenhar nada, as funções que criam cada figura de
+        `plotar_graficos`, para que cada gráfico seja criado apenas quando for exibido.
+
+        Returns:
+            list: Funções sem argumentos; cada uma cria e retorna uma figura.
         """
-        sns.set_theme(style=style)
-        figures = []
         metricas = [
             (const.COL_TEMP, "Temperatura (°C)", "Temperatura ao Longo do Tempo"),
             (const.COL_UMIDADE, "Umidade (%)", "Umidade ao Longo do Tempo"),
             (const.COL_VENTO, "Velocidade do Vento (km/h)", "Velocidade do Vento ao Longo do Tempo")
         ]
+        fabricas = [
+            functools.partial(self._plotar_serie, metrica, ylabel, title, style, metodo_decimacao, eventos)
+            for metrica, ylabel, title in metricas
+        ]
+        fabricas.append(functools.partial(self._plotar_precipitacao, style, eventos))
+        return fabricas
 
-        for metrica, ylabel, title in metricas:
+    @medir()
+    def _plotar_serie(self, metrica, ylabel, title, style, metodo_decimacao, eventos=None):
+        with _tema(style):
             fig, ax = self._criar_figura_e_eixo()
-            sns.lineplot(x=const.COL_DATA, y=metrica, data=self.dados, ax=ax)
+            LinhaDecimada(ax, self.dados[const.COL_DATA], self.dados[metrica], metodo=metodo_decimacao)
+            self._sombrear_eventos(ax, eventos, metrica)
             ax.set_title(title)
             ax.set_xlabel("Data")
             ax.set_ylabel(ylabel)
             fig.tight_layout()
-            figures.append(fig)
-
-        fig4, ax4 = self._criar_figura_e_eixo(figsize=(12, 6))
-        sns.barplot(
-            x=const.COL_DATA,
-            y=const.COL_PRECIP,
-            data=self.dados,
-            hue=const.COL_DATA,
-            palette="Blues_d",
-            legend=False,
-            ax=ax4
-        )
-        ax4.set_title("Precipitação por Dia")
-        ax4.set_xlabel("Data")
-        ax4.set_ylabel("Precipitação (mm)")
-        ax4.tick_params(axis='x', rotation=90)
-        fig4.tight_layout()
-        figures.append(fig4)
-
-        return figures
+        return fig
+
+    @medir()
+    def _plotar_precipitacao(self, style, eventos=None):
+        with _tema(style):
+            fig, ax = self._criar_figura_e_eixo(figsize=(12, 6))
+            self._desenhar_precipitacao(ax)
+            self._sombrear_eventos(ax, eventos, const.COL_PRECIP)
+            ax.set_xlabel("Data")
+            ax.set_ylabel("Precipitação (mm)")
+            ax.tick_params(axis='x', rotation=90)
+            fig.tight_layout()
+        return fig
+
+    def _sombrear_eventos(self, ax, eventos, coluna):
+        """
+        Sombreia, em toda a altura do eixo, os dias dos eventos da coluna (do
+        início ao fim do último dia), com uma cor por tipo de evento e legenda.
+        Os eventos de cada tipo viram um único polígono, ligado pela base do
+        eixo, que é desenhado de uma vez mesmo com milhares de eventos.
 
+        Args:
+            ax: O eixo do Matplotlib, já com a série desenhada.
+            eventos (pd.DataFrame | None): Eventos de `AnalisadorClimatico.gerar_eventos`.
+            coluna (str): A coluna do gráfico.
+        """
+        if eventos is None or eventos.empty:
+            return
+        da_coluna = eventos[eventos["coluna"] == coluna]
+        if da_coluna.empty:
+            return
+        for tipo, grupo in da_coluna.groupby("tipo", sort=False):
+            grupo = grupo.sort_values("inicio")
+            inicios = mdates.date2num(pd.to_datetime(grupo["inicio"]))
+            fins = mdates.date2num(pd.to_datetime(grupo["fim"]) + pd.Timedelta(days=1))
+            # (início, 0), (início, 1), (fim, 1), (fim, 0) de cada evento, em sequência
+            x = np.column_stack((inicios, inicios, fins, fins)).ravel()
+            y = np.tile([0.0, 1.0, 1.0, 0.0], len(grupo))
+            rotulo = TIPOS_EVENTO.get(tipo, {}).get("rotulo", tipo)
+            # add_artist, e não add_patch: as faixas ficam dentro do período da
+            # série e percorrer os vértices para ajustar os limites seria o mais caro
+            ax.add_artist(Polygon(np.column_stack((x, y)), closed=True, transform=ax.get_xaxis_transform(),
+                                 facecolor=CORES_EVENTOS.get(tipo, "gray"), edgecolor="none", alpha=0.2,
+                                 zorder=0, label=f"{rotulo} ({len(grupo)})"))
+        ax.legend(loc="upper right")
+
+    def _desenhar_precipitacao(self, ax):
+        """
+        Desenha a precipitação acumulada por dia como um único degrau preenchido
+        (`ax.stairs`) sobre uma grade regular de datas. Se houver mais dias do que
+        pixels de largura no eixo, os valores são somados por semana ou por mês.
+
+        Args:
+            ax: O eixo do Matplotlib.
+        """
+        datas = self.dados[const.COL_DATA]
+        validas = datas.notna().to_numpy()
+        datas = datas[validas]
+        if datas.empty:
+            ax.set_title("Precipitação por Dia")
+            return
+        precipitacao = np.nan_to_num(self.dados[const.COL_PRECIP].to_numpy(dtype=np.float64)[validas])
+        largura = max(int(ax.get_window_extent().width), 1)
+
+        for frequencia, nome in FREQUENCIAS_PRECIPITACAO:
+            periodos = datas.dt.to_period(frequencia)
+            primeiro, ultimo = periodos.min(), periodos.max()
+            n_barras = (ultimo - primeiro).n + 1
+            if n_barras <= largura:
+                break
+        codigos = periodos.array.asi8 - primeiro.ordinal
+        totais = np.bincount(codigos, weights=precipitacao, minlength=n_barras)
+        bordas = pd.period_range(primeiro, ultimo + 1, freq=frequencia).start_time.to_numpy()
+        ax.stairs(totais, bordas, fill=True, color=sns.color_palette("Blues_d")[2])
+        ax.set_title(f"Precipitação por {nome}")
+
+    @medir()
     def plotar_estatisticas(self, estatisticas_dict, style='whitegrid'):
         """
         Plota um painel com gráficos de barra para diversas estatísticas resumidas.
         (Versão original com barras simples).
         """
-        sns.set_theme(style=style)
-        fig, axs = plt.subplots(4, 2, figsize=(12, 18))
-        axs = axs.flatten()
-        fig.suptitle("Estatísticas Climáticas do Período", fontsize=18, weight='bold')
-
-        cores = sns.color_palette("viridis", len(estatisticas_dict))
-
-        for i, (label, value) in enumerate(estatisticas_dict.items()):
-            if i < len(axs):
-                ax = axs[i]
-                sns.barplot(x=[label], y=[value], hue=[label], ax=ax, palette=[cores[i]], legend=False)
-                ax.set_title(label, fontsize=12)
-                ax.set_ylabel("Valor")
-                ax.set_xticklabels([])
-                ax.text(0, value, f'{value:.2f}', ha='center', va='bottom', fontsize=11, weight='bold')
-                ax.set_ylim(0, value * 1.2 if value > 0 else 1)
-
-        for i in range(len(estatisticas_dict), len(axs)):
-            axs[i].set_visible(False)
-
-        fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+        with _tema(style):
+            fig = Figure(figsize=(12, 18))
+            axs = fig.subplots(4, 2)
+            axs = axs.flatten()
+            fig.suptitle("Estatísticas Climáticas do Período", fontsize=18, weight='bold')
+
+            cores = sns.color_palette("viridis", len(estatisticas_dict))
+
+            for i, (label, value) in enumerate(estatisticas_dict.items()):
+                if i < len(axs):
+                    ax = axs[i]
+                    sns.barplot(x=[label], y=[value], hue=[label], ax=ax, palette=[cores[i]], legend=False)
+                    ax.set_title(label, fontsize=12)
+                    ax.set_ylabel("Valor")
+                    ax.set_xticklabels([])
+                    ax.text(0, value, f'{value:.2f}', ha='center', va='bottom', fontsize=11, weight='bold')
+                    ax.set_ylim(0, value * 1.2 if value > 0 else 1)
+
+            for i in range(len(estatisticas_dict), len(axs)):
+                axs[i].set_visible(False)
+
+            fig.tight_layout(rect=[0, 0.03, 1, 0.95])
         return fig
 
+    @medir()
     def plotar_dashboard_hibrido(self, estatisticas_dict):
         """
         Cria um dashboard com 4 cartões de indicadores (KPIs) para as
@@ -113,7 +232,7 @@ class VisualizadorClimatico:
         precipitacao = estatisticas_dict.get("Precipitação Total (mm)", 0)
 
         # --- Criação do Gráfico ---
-        fig = plt.figure(figsize=(10, 8), constrained_layout=True)
+        fig = Figure(figsize=(10, 8), constrained_layout=True)
         fig.suptitle('Dashboard Climático do Período', fontsize=20, weight='bold')
         gs = gridspec.GridSpec(2, 2, figure=fig, hspace=0.3, wspace=0.3)
 
@@ -147,135 +266,171 @@ class VisualizadorClimatico:
 
         return fig
 
+    @medir()
     def plotar_dias_extremos(self, df_extremos, coluna_y, titulo, paleta_cores, unidade):
         """
         Plota os dias com valores extremos (máximos ou mínimos) para uma dada métrica.
         """
-        sns.set_theme(style="whitegrid")
-        fig, ax = self._criar_figura_e_eixo()
-
-        ascending = "Menores" in titulo
-        df_sorted = df_extremos.sort_values(by=coluna_y, ascending=ascending)
-
-        cores = sns.color_palette(paleta_cores, n_colors=len(df_sorted))
-        if not ascending:
-            cores.reverse()
-
-        sns.barplot(
-            x=const.COL_DATA,
-            y=coluna_y,
-            data=df_sorted,
-            hue=const.COL_DATA,
-            palette=cores,
-            dodge=False,
-            ax=ax,
-            legend=False
-        )
-
-        for i, row in enumerate(df_sorted.itertuples()):
-            valor = row[2]
-            ax.text(i, valor, f"{valor:.1f}{unidade}", color='black', ha="center", va='bottom', fontweight='bold')
-
-        ax.set_title(titulo, fontsize=16)
-        ax.set_xlabel("Data")
-        ax.set_ylabel(coluna_y.replace('_', ' ').replace('%', '(%)').capitalize())
-        ax.set_xticks(range(len(df_sorted)))
-        ax.set_xticklabels([d.strftime('%Y-%m-%d') for d in df_sorted[const.COL_DATA]], rotation=45, ha='right')
-
-        if not df_sorted.empty:
-            min_val, max_val = df_sorted[coluna_y].min(), df_sorted[coluna_y].max()
-            range_val = max_val - min_val
-            if range_val == 0:
-                range_val = abs(max_val * 0.2) if max_val != 0 else 1
-            ax.set_ylim(min_val - range_val * 0.1, max_val + range_val * 0.1)
-
-        fig.tight_layout()
+        with _tema("whitegrid"):
+            fig, ax = self._criar_figura_e_eixo()
+
+            ascending = "Menores" in titulo
+            df_sorted = df_extremos.sort_values(by=coluna_y, ascending=ascending)
+
+            cores = sns.color_palette(paleta_cores, n_colors=len(df_sorted))
+            if not ascending:
+                cores.reverse()
+
+            sns.barplot(
+                x=const.COL_DATA,
+                y=coluna_y,
+                data=df_sorted,
+                hue=const.COL_DATA,
+                palette=cores,
+                dodge=False,
+                ax=ax,
+                legend=False
+            )
+
+            for i, row in enumerate(df_sorted.itertuples()):
+                valor = row[2]
+                ax.text(i, valor, f"{valor:.1f}{unidade}", color='black', ha="center", va='bottom', fontweight='bold')
+
+            ax.set_title(titulo, fontsize=16)
+            ax.set_xlabel("Data")
+            ax.set_ylabel(coluna_y.replace('_', ' ').replace('%', '(%)').capitalize())
+            ax.set_xticks(range(len(df_sorted)))
+            ax.set_xticklabels([d.strftime('%Y-%m-%d') for d in df_sorted[const.COL_DATA]], rotation=45, ha='right')
+
+            if not df_sorted.empty:
+                min_val, max_val = df_sorted[coluna_y].min(), df_sorted[coluna_y].max()
+                range_val = max_val - min_val
+                if range_val == 0:
+                    range_val = abs(max_val * 0.2) if max_val != 0 else 1
+                ax.set_ylim(min_val - range_val * 0.1, max_val + range_val * 0.1)
+
+            fig.tight_layout()
         return fig
 
+    @medir()
+    def plotar_janelas_moveis(self, janelas_moveis, coluna, titulo, unidade="", style='whitegrid',
+                              metodo_decimacao=METODO_PADRAO):
+        """
+        Plota a série de uma coluna (ao fundo) com as estatísticas móveis
+        calculadas por `AnalisadorClimatico.gerar_janelas_moveis`, todas como
+        linhas decimadas (ver `decimacao.LinhaDecimada`).
+
+        Args:
+            janelas_moveis (pd.DataFrame): A data e as colunas "<estatistica>_<janela>".
+            coluna (str): A coluna original, lida de `self.dados`.
+            titulo (str): O título do gráfico.
+            unidade (str, optional): A unidade, para o eixo y.
+        """
+        with _tema(style):
+            fig, ax = self._criar_figura_e_eixo(figsize=(12, 6))
+            dados = self.dados[self.dados[const.COL_DATA].notna()]
+            LinhaDecimada(ax, dados[const.COL_DATA], dados[coluna], metodo=metodo_decimacao,
+                          color='lightgray', linewidth=0.8, label='Leituras')
+            cores = sns.color_palette("tab10")
+            for i, nome in enumerate(c for c in janelas_moveis.columns if c != const.COL_DATA):
+                estatistica, janela = nome.rsplit("_", 1)
+                LinhaDecimada(ax, janelas_moveis[const.COL_DATA], janelas_moveis[nome], metodo=metodo_decimacao,
+                              color=cores[i % len(cores)], linewidth=1.5,
+                              label=f"{ROTULOS_ESTATISTICAS[estatistica]} ({janela})")
+            ax.set_title(titulo)
+            ax.set_xlabel("Data")
+            ax.set_ylabel(unidade.strip())
+            ax.legend()
+            fig.tight_layout()
+        return fig
+
+    @medir()
     def plotar_heatmap_correlacao(self, matriz_correlacao, style='whitegrid'):
         """
         Plota um mapa de calor para visualizar a correlação entre variáveis.
         """
-        sns.set_theme(style=style)
-        fig, ax = self._criar_figura_e_eixo(figsize=(8, 6))
-        sns.heatmap(matriz_correlacao, annot=True, fmt=".2f", cmap="coolwarm", ax=ax)
-        ax.set_title("Mapa de Calor de Correlação entre Variáveis")
-        fig.tight_layout()
+        with _tema(style):
+            fig, ax = self._criar_figura_e_eixo(figsize=(8, 6))
+            sns.heatmap(matriz_correlacao, annot=True, fmt=".2f", cmap="coolwarm", ax=ax)
+            ax.set_title("Mapa de Calor de Correlação entre Variáveis")
+            fig.tight_layout()
         return fig
 
 
+    @medir()
     def plotar_distribuicao(self, coluna, titulo, style='whitegrid'):
         """
         Plota um histograma com títulos e rótulos mais informativos.
         """
-        sns.set_theme(style=style)
-        fig, ax = self._criar_figura_e_eixo()
+        with _tema(style):
+            fig, ax = self._criar_figura_e_eixo()
 
-        sns.histplot(self.dados[coluna], kde=True, ax=ax, edgecolor='black', alpha=0.7, color='skyblue')
+            sns.histplot(self.dados[coluna], kde=True, ax=ax, edgecolor='black', alpha=0.7, color='skyblue')
 
-        ax.set_title(f"Histograma das Temperaturas Diárias", fontsize=16)
-        ax.set_xlabel(f"{titulo} (°C)", fontsize=12)
-        ax.set_ylabel("Número de Dias (Frequência)", fontsize=12)
+            ax.set_title(f"Histograma das Temperaturas Diárias", fontsize=16)
+            ax.set_xlabel(f"{titulo} (°C)", fontsize=12)
+            ax.set_ylabel("Número de Dias (Frequência)", fontsize=12)
 
-        ax.tick_params(axis='both', which='major', labelsize=10)
-        fig.tight_layout()
+            ax.tick_params(axis='both', which='major', labelsize=10)
+            fig.tight_layout()
         return fig
+    @medir()
     def plotar_analise_mensal(self, dados_mensais, style='whitegrid'):
         """
         Plota um gráfico de análise sazonal aprimorado, com rótulos de dados
         e estilo visual refinado.
         """
-        sns.set_theme(style=style)
-        fig, ax1 = self._criar_figura_e_eixo(figsize=(12, 8))
-        fig.suptitle('Análise Mensal: Temperatura vs. Precipitação', fontsize=16, weight='bold')
+        with _tema(style):
+            fig, ax1 = self._criar_figura_e_eixo(figsize=(12, 8))
+            fig.suptitle('Análise Mensal: Temperatura vs. Precipitação', fontsize=16, weight='bold')
         
-        bar_plot = sns.barplot(
-            x=const.COL_DATA,
-            y='precipitacao_total',
-            data=dados_mensais,
-            ax=ax1,
-            color='lightblue',
-            alpha=0.8,
-            edgecolor='black'
-        )
-        ax1.set_ylabel('Precipitação Acumulada (mm)', color='blue', fontsize=12)
-        ax1.tick_params(axis='y', labelcolor='blue')
-        ax1.set_xlabel('Mês / Ano', fontsize=12)
-
-        for p in bar_plot.patches:
-            ax1.annotate(f'{p.get_height():.1f}',
-                         (p.get_x() + p.get_width() / 2., p.get_height()),
-                         ha='center', va='center',
-                         xytext=(0, 9),
-                         textcoords='offset points',
-                         fontweight='bold')
-
-        # --- Linha de Temperatura (eixo secundário) ---
-        ax2 = ax1.twinx()
-        dados_resetados = dados_mensais.reset_index()
-        line_plot = ax2.plot(
-            dados_resetados.index,
-            dados_resetados['temperatura_media'],
-            color='red',
-            marker='o',
-            label='Temperatura Média Mensal'
-        )
-        ax2.set_ylabel('Temperatura Média (°C)', color='red', fontsize=12)
-        ax2.tick_params(axis='y', labelcolor='red')
-
-        for i, txt in enumerate(dados_resetados['temperatura_media']):
-            ax2.annotate(f'{txt:.1f}°C', (dados_resetados.index[i], dados_resetados['temperatura_media'][i]),
-                         textcoords="offset points",
-                         xytext=(0,10),
-                         ha='center',
-                         fontweight='bold')
-
-        # --- Configurações Finais ---
-        ax1.set_xticks(range(len(dados_mensais)))
-        ax1.set_xticklabels([d.strftime('%m/%Y') for d in dados_mensais[const.COL_DATA]], rotation=45, ha='right')
+            bar_plot = sns.barplot(
+                x=const.COL_DATA,
+                y='precipitacao_total',
+                data=dados_mensais,
+                ax=ax1,
+                color='lightblue',
+                alpha=0.8,
+                edgecolor='black'
+            )
+            ax1.set_ylabel('Precipitação Acumulada (mm)', color='blue', fontsize=12)
+            ax1.tick_params(axis='y', labelcolor='blue')
+            ax1.set_xlabel('Mês / Ano', fontsize=12)
+
+            for p in bar_plot.patches:
+                ax1.annotate(f'{p.get_height():.1f}',
+                             (p.get_x() + p.get_width() / 2., p.get_height()),
+                             ha='center', va='center',
+                             xytext=(0, 9),
+                             textcoords='offset points',
+                             fontweight='bold')
+
+            # --- Linha de Temperatura (eixo secundário) ---
+            ax2 = ax1.twinx()
+            dados_resetados = dados_mensais.reset_index()
+            line_plot = ax2.plot(
+                dados_resetados.index,
+                dados_resetados['temperatura_media'],
+                color='red',
+                marker='o',
+                label='Temperatura Média Mensal'
+            )
+            ax2.set_ylabel('Temperatura Média (°C)', color='red', fontsize=12)
+            ax2.tick_params(axis='y', labelcolor='red')
+
+            for i, txt in enumerate(dados_resetados['temperatura_media']):
+                ax2.annotate(f'{txt:.1f}°C', (dados_resetados.index[i], dados_resetados['temperatura_media'][i]),
+                             textcoords="offset points",
+                             xytext=(0,10),
+                             ha='center',
+                             fontweight='bold')
+
+            # --- Configurações Finais ---
+            ax1.set_xticks(range(len(dados_mensais)))
+            ax1.set_xticklabels([d.strftime('%m/%Y') for d in dados_mensais[const.COL_DATA]], rotation=45, ha='right')
         
-        # Ocultar a legenda padrão, pois os rótulos já informam tudo
-        ax1.get_legend().remove() if ax1.get_legend() else None
+            # Ocultar a legenda padrão, pois os rótulos já informam tudo
+            ax1.get_legend().remove() if ax1.get_legend() else None
 
-        fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+            fig.tight_layout(rect=[0, 0.03, 1, 0.95])
         return fig